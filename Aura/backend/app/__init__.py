@@ -2,34 +2,66 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from .models import db  # Import db instance from models.py
+from .cache import cache  # Redis-backed response cache
+from .broadcast import broadcaster  # Redis pub/sub for live alerts
+from .metrics import metrics  # Prometheus request, task and SQL metrics
+from .event_stream import event_stream  # Redis stream buffering live events
+from .event_archive import event_archive  # Parquet cold tier for old events
+from .rules import rule_engine  # Anomaly rules evaluated on written events
+from .database import db_router  # Per-role pool settings and read replica routing
 from config import Config
 
 # Initialize extensions but do not attach them to an app yet
 migrate = Migrate()
 
-def create_app(config_class=Config):
+def create_app(config_class=Config, role=None):
     """
     Creates and configures an instance of the Flask application.
     This pattern is known as the 'Application Factory'.
+
+    `role` ('api', 'worker' or 'beat') overrides PROCESS_ROLE, which selects
+    the database connection pool settings.
     """
     app = Flask(__name__)
 
     # --- 1. Load Configuration ---
     # Load configuration from the 'config.py' file/class
     app.config.from_object(config_class)
+    if role is not None:
+        app.config['PROCESS_ROLE'] = role
 
     # --- 2. Initialize Extensions ---
+    # Size the connection pools for this process role and add the read replica bind.
+    # Must come before SQLAlchemy, which creates the engines.
+    db_router.init_app(app)
     # Initialize SQLAlchemy with the app
     db.init_app(app)
     # Initialize Flask-Migrate for database migrations
     migrate.init_app(app, db)
+    # Initialize the response cache (Redis, or in-process when no URL is configured)
+    cache.init_app(app)
+    # Initialize the live alert broadcaster (Redis pub/sub, or in-process when no URL is configured)
+    broadcaster.init_app(app)
+    # Initialize performance instrumentation (request hooks and the /metrics endpoint)
+    metrics.init_app(app)
+    # Initialize the live event buffer (Redis stream, or in-process when no URL is configured)
+    event_stream.init_app(app)
+    # Initialize the event archive (Parquet files under EVENT_ARCHIVE_PATH)
+    event_archive.init_app(app)
+    # Initialize the alert rule engine with the rules enabled in ALERT_RULES
+    rule_engine.init_app(app)
 
     # --- 3. Register Blueprints ---
     # Blueprints help in organizing a large application into smaller, manageable parts.
     from .api import api_bp  # Import the API blueprint
     app.register_blueprint(api_bp, url_prefix='/api')
 
-    # --- 4. Shell Context for easy debugging ---
+    # --- 4. Register CLI Commands ---
+    # Adds custom commands such as 'flask ingest' for bulk data loading.
+    from .commands import register_commands
+    register_commands(app)
+
+    # --- 5. Shell Context for easy debugging ---
     # This makes 'db' and your models available in the 'flask shell' command
     # without needing to import them manually.
     @app.shell_context_processor
@@ -2,7 +2,7 @@ from flask import Blueprint
 from flask_restx import Api
 
 # Import DTOs to access their namespaces
-from .dto import EntityDto, EventDto, AlertDto
+from .dto import EntityDto, EventDto, AlertDto, IngestDto, OccupancyDto
 
 # Create a Blueprint for the API
 api_bp = Blueprint('api', __name__)
@@ -22,7 +22,9 @@ api = Api(
 api.add_namespace(EntityDto.api)
 api.add_namespace(EventDto.api)
 api.add_namespace(AlertDto.api)
+api.add_namespace(IngestDto.api)
+api.add_namespace(OccupancyDto.api)
 
 # Import the resource files to ensure their routes are registered with the namespaces.
 # This is a common pattern in Flask to ensure views/resources are connected.
-from .resources import entity, timeline, alert
\ No newline at end of file
+from .resources import entity, timeline, alert, events, occupancy
\ No newline at end of file
@@ -1,4 +1,20 @@
-from flask_restx import Namespace, fields
+from datetime import timezone
+
+from flask_restx import Namespace, fields, inputs, reqparse
+
+
+def utc_datetime(value):
+    """
+    Request argument type: parses an ISO 8601 timestamp into a naive UTC datetime,
+    matching how timestamps are stored in the database.
+    """
+    parsed = inputs.datetime_from_iso8601(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+utc_datetime.__schema__ = {'type': 'string', 'format': 'date-time'}
+
 
 class EntityDto:
     """
@@ -15,6 +31,122 @@ class EntityDto:
         'primary_email': fields.String(description='The primary email address of the entity'),
     })
 
+    # Define the tombstone of an entity merged into another, reported by delta sync
+    merged_entity = api.model('MergedEntity', {
+        'id': fields.Integer(description='The unique identifier of the merged entity, which no longer exists'),
+        'survivor_id': fields.Integer(description='The entity it was merged into'),
+    })
+
+    # Define the envelope returned by the entity list endpoint
+    entity_list = api.model('EntityList', {
+        'entities': fields.List(fields.Nested(entity)),
+        'merged': fields.List(fields.Nested(merged_entity),
+                              description='Entities merged into others since changed_since; only sent with it'),
+        'watermark': fields.String(description='Pass back as changed_since to fetch only rows changed after this response'),
+    })
+
+    # Query string arguments accepted by the entity list endpoint
+    list_args = reqparse.RequestParser()
+    list_args.add_argument('changed_since', type=utc_datetime, location='args',
+                           help='Only return entities created or changed at or after this watermark')
+
+    # Define the models used by the batch identifier resolution endpoint
+    identifier = api.model('IdentifierRef', {
+        'identifier_type': fields.String(required=True, description='The kind of identifier (e.g., card_id, email, device_hash)'),
+        'value': fields.String(required=True, description='The identifier value as it appears in the source system'),
+    })
+
+    resolve_request = api.model('ResolveRequest', {
+        'identifiers': fields.List(fields.Nested(identifier), required=True, description='Identifiers to resolve'),
+    })
+
+    resolution = api.inherit('Resolution', identifier, {
+        'entity_id': fields.Integer(description='The resolved entity, or null if the identifier is unknown'),
+    })
+
+    resolve_response = api.model('ResolveResponse', {
+        'results': fields.List(fields.Nested(resolution), description='One result per requested identifier, in request order'),
+    })
+
+    # Define the models returned by the typeahead search endpoint
+    match = api.inherit('EntityMatch', entity, {
+        'score': fields.Float(description='Relevance: exact matches first, then prefix matches, then similarity'),
+    })
+
+    match_list = api.model('EntityMatchList', {
+        'results': fields.List(fields.Nested(match), description='Matches, most relevant first'),
+    })
+
+    search_args = reqparse.RequestParser()
+    search_args.add_argument('q', required=True, location='args',
+                             help='Text to match against names, emails and identifiers (e.g. card IDs)')
+    search_args.add_argument('limit', type=inputs.positive, location='args',
+                             help='Maximum matches to return; defaults to SEARCH_DEFAULT_LIMIT')
+
+    # Define the models returned by the co-location endpoint
+    contact = api.model('Contact', {
+        'entity_id': fields.Integer(description='The entity seen near the subject'),
+        'name': fields.String(description='The name of the entity'),
+        'entity_type': fields.String(description='The type of the entity'),
+        'encounters': fields.Integer(description="The entity's events within the window of one of the subject's events"),
+        'locations': fields.List(fields.String, description='Locations where they were seen together'),
+        'first_contact': fields.DateTime(description='First encounter (UTC)', dt_format='iso8601'),
+        'last_contact': fields.DateTime(description='Last encounter (UTC)', dt_format='iso8601'),
+        'closest_seconds': fields.Float(description='Smallest time gap to one of the subject\'s events, in seconds'),
+    })
+
+    contact_list = api.model('ContactList', {
+        'entity_id': fields.Integer(description='The subject entity'),
+        'window_minutes': fields.Integer(description='The co-location window that was applied'),
+        'contacts': fields.List(fields.Nested(contact), description='Contacts ranked by encounters, then closeness'),
+        'truncated': fields.Boolean(description='True if more contacts were found than were returned'),
+    })
+
+    # Query string arguments accepted by the co-location endpoint
+    colocation_args = reqparse.RequestParser()
+    colocation_args.add_argument('since', type=utc_datetime, location='args',
+                                 help="Start of the subject's events to consider (ISO 8601); "
+                                      'defaults to COLOCATION_DEFAULT_DAYS before until')
+    colocation_args.add_argument('until', type=utc_datetime, location='args',
+                                 help="End of the subject's events to consider (ISO 8601, exclusive); defaults to now")
+    colocation_args.add_argument('window', type=inputs.positive, location='args',
+                                 help='Minutes between two events for them to count as together; '
+                                      'defaults to COLOCATION_DEFAULT_WINDOW_MINUTES')
+    colocation_args.add_argument('limit', type=inputs.positive, location='args',
+                                 help='Maximum contacts to return; defaults to API_PAGE_SIZE')
+
+    # Define the models returned by the entity summary endpoint
+    summary = api.model('EntitySummary', {
+        'entity_id': fields.Integer(description='The entity'),
+        'name': fields.String(description='The name of the entity'),
+        'entity_type': fields.String(description='The type of the entity'),
+        'last_event_at': fields.DateTime(description='Time of the latest event (UTC)', dt_format='iso8601'),
+        'last_location': fields.String(description='Location of the latest event'),
+        'last_source_type': fields.String(description='Source of the latest event (e.g., swipe, wifi)'),
+        'events_today': fields.Integer(description='Events so far today (UTC)'),
+        'events_window': fields.Integer(description='Events in the last ENTITY_SUMMARY_WINDOW_DAYS days, today included'),
+        'sources_today': fields.Raw(description='Events so far today per source, e.g. {"swipe": 3}'),
+        'sources_window': fields.Raw(description='Events in the window per source'),
+        'open_alerts': fields.Integer(description='Unacknowledged alerts'),
+    })
+
+    summary_page = api.model('EntitySummaryPage', {
+        'summaries': fields.List(fields.Nested(summary)),
+        'next_cursor': fields.String(description='Pass back as cursor to fetch the next page; null on the last page'),
+        'window_days': fields.Integer(description='Length of the rolling window, in days'),
+    })
+
+    # Query string arguments accepted by the entity summary endpoint
+    summary_args = reqparse.RequestParser()
+    summary_args.add_argument('sort', choices=('last_event_at', 'events_today', 'events_window', 'open_alerts'),
+                              default='last_event_at', location='args', help='Column to sort by')
+    summary_args.add_argument('order', choices=('desc', 'asc'), default='desc', location='args',
+                              help='Sort direction; entities never seen come last either way')
+    summary_args.add_argument('limit', type=inputs.positive, location='args',
+                              help='Maximum number of summaries per page')
+    summary_args.add_argument('cursor', type=str, location='args',
+                              help='The next_cursor value returned by the previous page')
+
 class EventDto:
     """
     Data Transfer Objects for the Event models.
@@ -31,6 +163,51 @@ class EventDto:
         'description': fields.String(required=True, description='A human-readable description of the event'),
     })
 
+    # Define the model for one page of an entity's timeline
+    event_page = api.model('EventPage', {
+        'events': fields.List(fields.Nested(event), description='Events on this page, newest first'),
+        'next_cursor': fields.String(description='Opaque cursor for the next page; null on the last page'),
+        'watermark': fields.String(description='Pass back as changed_since to fetch only rows changed after this response'),
+    })
+
+    # Query string arguments accepted by the timeline endpoint
+    timeline_args = reqparse.RequestParser()
+    timeline_args.add_argument('since', type=utc_datetime, location='args',
+                               help='Only return events at or after this ISO 8601 timestamp')
+    timeline_args.add_argument('until', type=utc_datetime, location='args',
+                               help='Only return events before this ISO 8601 timestamp')
+    timeline_args.add_argument('limit', type=inputs.positive, location='args',
+                               help='Maximum number of events per page')
+    timeline_args.add_argument('cursor', type=str, location='args',
+                               help='The next_cursor value returned by the previous page')
+    timeline_args.add_argument('changed_since', type=utc_datetime, location='args',
+                               help='Only return events written or changed at or after this watermark')
+
+    # Define the models returned by the batch timeline endpoint
+    entity_event = api.clone('EntityEvent', event, {
+        'entity_id': fields.Integer(description='The entity the event belongs to'),
+    })
+
+    entity_event_page = api.model('EntityEventPage', {
+        'events': fields.List(fields.Nested(entity_event), description='Events of all requested entities, newest first'),
+        'next_cursor': fields.String(description='Opaque cursor for the next page; null on the last page'),
+        'watermark': fields.String(description='Pass back as changed_since to fetch only rows changed after this response'),
+    })
+
+    # Query string arguments accepted by the batch timeline endpoint
+    batch_args = timeline_args.copy()
+    batch_args.add_argument('entity_id', type=int, action='append', required=True, location='args',
+                            help='An entity whose events to include; repeat for each entity')
+
+    # Query string arguments accepted by the timeline export endpoint
+    export_args = reqparse.RequestParser()
+    export_args.add_argument('format', choices=('ndjson', 'csv'), default='ndjson', location='args',
+                             help='Export format: ndjson or csv')
+    export_args.add_argument('since', type=utc_datetime, location='args',
+                             help='Only export events at or after this ISO 8601 timestamp')
+    export_args.add_argument('until', type=utc_datetime, location='args',
+                             help='Only export events before this ISO 8601 timestamp')
+
 class AlertDto:
     """
     Data Transfer Objects for the Alert model.
@@ -48,3 +225,126 @@ class AlertDto:
         'entity_name': fields.String(attribute='entity.name', description='Name of the associated entity'),
     })
 
+    # Define the model for one page of the alert feed
+    alert_page = api.model('AlertPage', {
+        'alerts': fields.List(fields.Nested(alert), description='Alerts on this page, newest first'),
+        'next_cursor': fields.String(description='Opaque cursor for the next page; null on the last page'),
+        'watermark': fields.String(description='Pass back as changed_since to fetch only rows changed after this response'),
+    })
+
+    # Query string arguments accepted by the alert feed
+    feed_args = reqparse.RequestParser()
+    feed_args.add_argument('severity', action='append', location='args',
+                           help='Only return alerts with this severity; repeat to accept several')
+    feed_args.add_argument('is_acknowledged', type=inputs.boolean, location='args',
+                           help='Filter on acknowledgement state')
+    feed_args.add_argument('entity_id', type=int, location='args',
+                           help='Only return alerts raised for this entity')
+    feed_args.add_argument('since', type=utc_datetime, location='args',
+                           help='Only return alerts raised at or after this ISO 8601 timestamp')
+    feed_args.add_argument('until', type=utc_datetime, location='args',
+                           help='Only return alerts raised before this ISO 8601 timestamp')
+    feed_args.add_argument('limit', type=inputs.positive, location='args',
+                           help='Maximum number of alerts per page')
+    feed_args.add_argument('cursor', type=str, location='args',
+                           help='The next_cursor value returned by the previous page')
+    feed_args.add_argument('changed_since', type=utc_datetime, location='args',
+                           help='Only return alerts raised or changed at or after this watermark')
+
+    # Query string arguments accepted by the live alert stream
+    stream_args = reqparse.RequestParser()
+    stream_args.add_argument('last_id', type=int, location='args',
+                             help='Resume after this alert ID (the Last-Event-ID header takes precedence)')
+
+    # Define the models used to acknowledge alerts in bulk
+    bulk_ack = api.model('AlertBulkAcknowledge', {
+        'ids': fields.List(fields.Integer, required=True, description='IDs of the alerts to update'),
+        'is_acknowledged': fields.Boolean(default=True, description='New acknowledgement state (defaults to true)'),
+    })
+
+    bulk_ack_result = api.model('AlertBulkAcknowledgeResult', {
+        'updated': fields.Integer(description='Number of alerts whose acknowledgement state changed'),
+    })
+
+    # Query string arguments accepted by the alert export endpoint
+    export_args = reqparse.RequestParser()
+    export_args.add_argument('format', choices=('ndjson', 'csv'), default='ndjson', location='args',
+                             help='Export format: ndjson or csv')
+
+
+class IngestDto:
+    """
+    Data Transfer Objects for live event ingestion.
+    """
+    # Create a namespace for pushing events from readers and controllers
+    api = Namespace('events', description='Live event ingestion')
+
+    # Define the model for one event as pushed by a card reader or Wi-Fi controller
+    live_event = api.model('LiveEvent', {
+        'identifier_type': fields.String(required=True, description='The kind of identifier (e.g., card_id, email, device_hash)'),
+        'identifier': fields.String(required=True, description='The identifier value, resolved to an entity on arrival'),
+        'timestamp': fields.DateTime(required=True, description='The time the event occurred (ISO 8601; naive values are UTC)', dt_format='iso8601'),
+        'location': fields.String(description='The location where the event took place'),
+        'source_type': fields.String(required=True, description='The source system of the event (e.g., swipe, wifi)'),
+        'description': fields.String(description='A human-readable description of the event'),
+        'idempotency_key': fields.String(description='Client key; retried posts with the same key are stored once'),
+    })
+
+    # Define the envelope for posting many events at once
+    live_event_batch = api.model('LiveEventBatch', {
+        'events': fields.List(fields.Nested(live_event), required=True, description='Events to ingest'),
+    })
+
+    # Define the per-event rejection and the response of the ingestion endpoint
+    rejection = api.model('LiveEventRejection', {
+        'index': fields.Integer(description='Position of the rejected event in the request (0 for a single event)'),
+        'error': fields.String(description='Why the event was not accepted'),
+    })
+
+    ingest_result = api.model('LiveEventResult', {
+        'accepted': fields.Integer(description='Number of events queued for writing'),
+        'rejected': fields.List(fields.Nested(rejection), description='Events that were not accepted'),
+    })
+
+    # Define the live ingestion backlog returned by the stats endpoint
+    stream_stats = api.model('EventStreamStats', {
+        'length': fields.Integer(description='Events waiting to be written'),
+        'pending': fields.Integer(description='Events read by a consumer but not yet written'),
+        'lag_seconds': fields.Float(description='Age of the oldest event waiting to be written'),
+    })
+
+class OccupancyDto:
+    """
+    Data Transfer Objects for the occupancy rollups.
+    """
+    # Create a namespace for occupancy heatmaps
+    api = Namespace('occupancy', description='Pre-aggregated location occupancy')
+
+    # Define the model for one rollup bucket
+    bucket = api.model('OccupancyBucket', {
+        'location': fields.String(description='The location'),
+        'source_type': fields.String(description='The source system the events came from (e.g., swipe, wifi)'),
+        'bucket': fields.DateTime(description='Start of the hour or day (UTC)', dt_format='iso8601'),
+        'entity_count': fields.Integer(description='Distinct entities seen in the bucket'),
+        'event_count': fields.Integer(description='Events recorded in the bucket'),
+    })
+
+    # Define the envelope returned by the occupancy endpoint
+    occupancy = api.model('Occupancy', {
+        'granularity': fields.String(description='hour or day'),
+        'buckets': fields.List(fields.Nested(bucket), description='Buckets ordered by time, location and source'),
+        'truncated': fields.Boolean(description='True if more buckets matched than were returned'),
+    })
+
+    # Query string arguments accepted by the occupancy endpoint
+    occupancy_args = reqparse.RequestParser()
+    occupancy_args.add_argument('granularity', choices=('hour', 'day'), default='hour', location='args',
+                                help='Bucket size: hour or day')
+    occupancy_args.add_argument('since', type=utc_datetime, location='args',
+                                help='Start of the window (ISO 8601); defaults to OCCUPANCY_DEFAULT_DAYS before until')
+    occupancy_args.add_argument('until', type=utc_datetime, location='args',
+                                help='End of the window (ISO 8601, exclusive); defaults to now')
+    occupancy_args.add_argument('location', action='append', location='args',
+                                help='Only return this location; repeat to accept several')
+    occupancy_args.add_argument('source_type', action='append', location='args',
+                                help='Only return this source; repeat to accept several')
@@ -1,7 +1,13 @@
+import json
+
+from flask import current_app, request, stream_with_context
 from flask_restx import Resource
-from sqlalchemy.orm import joinedload
 from ..dto import AlertDto
-from ...models import Alert
+from ..serializers import alert_serializer
+from ...cache import cache
+from ...services.alert_service import acknowledge_alerts, get_alert_feed, stream_alerts
+from ...services.export_service import ALERT_COLUMNS, export_response, iter_alert_rows
+from ...services.pagination import InvalidCursor, sync_watermark
 
 # Get the namespace from the DTO
 api = AlertDto.api
@@ -12,12 +18,106 @@ class AlertList(Resource):
     Resource for handling the collection of alerts.
     """
     @api.doc('list_alerts')
-    @api.marshal_list_with(AlertDto.alert, envelope='alerts')
+    @api.expect(AlertDto.feed_args)
+    @api.response(200, 'Success', AlertDto.alert_page)
+    @api.response(400, 'Invalid cursor')
+    @api.response(304, 'Not modified since the ETag sent in If-None-Match')
     def get(self):
         """
-        List all alerts, ordered by most recent.
+        List alerts, newest first, one page at a time.
+
+        Alerts can be filtered by severity, acknowledgement state, entity and
+        time range. Pass the returned next_cursor back as `cursor` to fetch the
+        following page, and the returned watermark back as `changed_since` to
+        fetch only alerts raised or changed since. Serialized pages are served
+        from the response cache, with an ETag, and rebuilt only when alerts or
+        entities have changed.
+        """
+        args = AlertDto.feed_args.parse_args()
+        args['limit'] = min(args['limit'] or current_app.config['API_PAGE_SIZE'], current_app.config['API_MAX_PAGE_SIZE'])
+
+        def build():
+            watermark = sync_watermark(current_app.config['SYNC_WATERMARK_OVERLAP_SECONDS'])
+            try:
+                page = get_alert_feed(**args, columns=alert_serializer.columns)
+            except InvalidCursor as exc:
+                api.abort(400, str(exc))
+            return alert_serializer.dumps(page.items, 'alerts', next_cursor=page.next_cursor, watermark=watermark)
 
-        Fetches all alerts from the database, eager loading the related entity
-        to avoid N+1 query problems.
+        return cache.json_response('alerts', json.dumps(args, sort_keys=True, default=str), build)
+
+
+@api.route('/bulk')
+class AlertBulk(Resource):
+    """
+    Resource for updating many alerts at once.
+    """
+    @api.doc('acknowledge_alerts')
+    @api.expect(AlertDto.bulk_ack, validate=True)
+    @api.response(413, 'Too many alert IDs in one request')
+    @api.marshal_with(AlertDto.bulk_ack_result)
+    def patch(self):
+        """
+        Acknowledge (or re-open) many alerts in a single UPDATE.
         """
-        return Alert.query.options(joinedload(Alert.entity)).order_by(Alert.timestamp.desc()).all()
\ No newline at end of file
+        ids = api.payload['ids']
+        if len(ids) > current_app.config['ALERT_BULK_MAX']:
+            api.abort(413, f"At most {current_app.config['ALERT_BULK_MAX']} alerts may be updated per request.")
+        updated = acknowledge_alerts(ids, api.payload.get('is_acknowledged', True))
+        return {'updated': updated}, 200
+
+
+@api.route('/export')
+class AlertExport(Resource):
+    """
+    Resource for exporting the full alert log.
+    """
+    @api.doc('export_alerts')
+    @api.expect(AlertDto.export_args)
+    @api.produces(['application/x-ndjson', 'text/csv'])
+    def get(self):
+        """
+        Stream every alert, newest first, as NDJSON or CSV.
+
+        Rows are read with a server-side cursor and written to the response as
+        they arrive instead of being marshalled into one document.
+        """
+        args = AlertDto.export_args.parse_args()
+        return export_response(iter_alert_rows(), ALERT_COLUMNS, args['format'], 'alerts')
+
+
+@api.route('/stream')
+class AlertStream(Resource):
+    """
+    Resource for receiving new alerts as they are raised.
+    """
+    @api.doc('stream_alerts')
+    @api.expect(AlertDto.stream_args)
+    @api.produces(['text/event-stream'])
+    def get(self):
+        """
+        Subscribe to newly created alerts as Server-Sent Events.
+
+        Each alert is sent as an `alert` event whose id is the alert ID, so
+        browsers resume automatically via Last-Event-ID after a reconnect.
+        Comment lines are sent as keep-alives during quiet periods.
+        """
+        args = AlertDto.stream_args.parse_args()
+        last_event_id = request.headers.get('Last-Event-ID')
+        last_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else args['last_id']
+        config = current_app.config
+
+        def events():
+            yield f"retry: {config['ALERT_STREAM_RETRY_MS']}\n\n"
+            for alert in stream_alerts(last_id, heartbeat=config['ALERT_STREAM_HEARTBEAT'],
+                                       max_seconds=config['ALERT_STREAM_MAX_SECONDS'],
+                                       replay_limit=config['ALERT_STREAM_REPLAY_LIMIT']):
+                if alert is None:
+                    yield ': keep-alive\n\n'
+                else:
+                    yield f"id: {alert['id']}\nevent: alert\ndata: {json.dumps(alert)}\n\n"
+
+        response = current_app.response_class(stream_with_context(events()), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
@@ -1,10 +1,21 @@
+from datetime import datetime, timedelta
+
+import orjson
+from flask import current_app
 from flask_restx import Resource
 
 from ..dto import EntityDto
-from ...services.resolution_service import get_all_entities
+from ..serializers import entity_serializer, json_response
+from ...cache import cache
+from ...models import db, Entity
+from ...services.colocation_service import find_colocated_entities
+from ...services.pagination import InvalidCursor, sync_watermark
+from ...services.resolution_service import get_all_entities, get_merged_entities, resolve_identifiers
+from ...services.search_service import search_entities
+from ...services.summary_service import get_entity_summaries
 
 # Get the namespace from the DTO for consistency
-ns = EntityDto.ns
+ns = EntityDto.api
 
 @ns.route("")
 class EntityList(Resource):
@@ -12,14 +23,153 @@ class EntityList(Resource):
     Handles operations related to the list of all entities.
     """
     @ns.doc('list_entities', description='Get a list of all campus entities (students, staff, and assets).')
-    @ns.marshal_list_with(EntityDto.entity, envelope='entities')
+    @ns.expect(EntityDto.list_args)
+    @ns.response(200, 'Success', EntityDto.entity_list)
+    @ns.response(304, 'Not modified since the ETag sent in If-None-Match')
     def get(self):
         """
         Returns the complete list of all entities.
 
-        This endpoint calls the resolution service to fetch all records from the
-        Entity table in the database and serializes the response using the EntityDto.
+        This endpoint calls the resolution service to fetch the EntityDto columns
+        of every entity and serializes them with the fast serializer. The
+        serialized response is cached and only rebuilt after entities have changed.
+        Its ETag follows the same version, so revalidating an unchanged list costs
+        a single cache lookup. Pass the returned watermark back as
+        `changed_since` to receive only the entities changed since, along with
+        the entities merged into others since, which no longer exist.
+        """
+        changed_since = EntityDto.list_args.parse_args()['changed_since']
+
+        def build():
+            watermark = sync_watermark(current_app.config['SYNC_WATERMARK_OVERLAP_SECONDS'])
+            entities = get_all_entities(columns=entity_serializer.columns, changed_since=changed_since)
+            if changed_since is None:
+                return entity_serializer.dumps(entities, 'entities', watermark=watermark)
+            return entity_serializer.dumps(entities, 'entities', merged=get_merged_entities(changed_since),
+                                           watermark=watermark)
+
+        # Call the service layer function on a cache miss
+        key = f'changed:{changed_since.isoformat()}' if changed_since else 'all'
+        return cache.json_response('entities', key, build)
+
+@ns.route("/search")
+class EntitySearch(Resource):
+    """
+    Typeahead search over entities.
+    """
+    @ns.doc('search_entities', description='Find entities by name, email or identifier prefix, or by similar spelling.')
+    @ns.expect(EntityDto.search_args)
+    @ns.marshal_with(EntityDto.match_list)
+    def get(self):
+        """
+        Returns the entities best matching the query.
+
+        Matches are answered from trigram indexes on PostgreSQL and from an
+        in-process prefix index elsewhere, so each keystroke of a typeahead
+        costs an index lookup rather than a download of every entity.
+        """
+        args = EntityDto.search_args.parse_args()
+        config = current_app.config
+        if len(args['q'].strip()) < config['SEARCH_MIN_QUERY_LENGTH']:
+            return {'results': []}, 200
+        limit = min(args['limit'] or config['SEARCH_DEFAULT_LIMIT'], config['SEARCH_MAX_LIMIT'])
+        return {'results': search_entities(args['q'], limit=limit)}, 200
+
+@ns.route("/summary")
+class EntitySummaryList(Resource):
+    """
+    Dashboard overview of every entity's recent activity.
+    """
+    @ns.doc('list_entity_summaries', description='Get one page of per-entity activity summaries: latest event, '
+                                                 'event counts per source for today and the rolling window, '
+                                                 'and open alerts.')
+    @ns.expect(EntityDto.summary_args)
+    @ns.response(200, 'Success', EntityDto.summary_page)
+    @ns.response(400, 'Invalid cursor')
+    def get(self):
         """
-        # Call the service layer function to get the data
-        entities = get_all_entities()
-        return entities, 200
\ No newline at end of file
+        Returns a page of entity summaries in the requested order.
+
+        Summaries are precomputed as events are written and alerts raised or
+        acknowledged, so a page is one range scan of the index for the chosen
+        sort column instead of a timeline and alert query per entity. Pass the
+        returned next_cursor back as `cursor` to fetch the following page.
+        """
+        args = EntityDto.summary_args.parse_args()
+        limit = min(args['limit'] or current_app.config['API_PAGE_SIZE'], current_app.config['API_MAX_PAGE_SIZE'])
+        try:
+            page = get_entity_summaries(sort=args['sort'], descending=args['order'] == 'desc', limit=limit,
+                                        cursor=args['cursor'])
+        except InvalidCursor as exc:
+            ns.abort(400, str(exc))
+        return json_response(orjson.dumps({
+            'summaries': page.items, 'next_cursor': page.next_cursor,
+            'window_days': current_app.config['ENTITY_SUMMARY_WINDOW_DAYS'],
+        }).decode())
+
+@ns.route("/resolve")
+class EntityResolve(Resource):
+    """
+    Resolves source-system identifiers to entities in bulk.
+    """
+    @ns.doc('resolve_identifiers', description='Resolve many (identifier_type, value) pairs to entity IDs in one round trip.')
+    @ns.expect(EntityDto.resolve_request, validate=True)
+    @ns.response(413, 'Too many identifiers in one request')
+    @ns.marshal_with(EntityDto.resolve_response)
+    def post(self):
+        """
+        Resolves a batch of identifiers to entity IDs.
+
+        Lookups are answered from the in-memory resolution index, falling back
+        to a single batched query for identifiers the index has not seen.
+        Unknown identifiers resolve to null.
+        """
+        identifiers = ns.payload['identifiers']
+        if len(identifiers) > current_app.config['RESOLVE_MAX_BATCH']:
+            ns.abort(413, f"At most {current_app.config['RESOLVE_MAX_BATCH']} identifiers may be resolved per request.")
+
+        pairs = [(item['identifier_type'], item['value']) for item in identifiers]
+        entity_ids = resolve_identifiers(pairs)
+        return {'results': [
+            {'identifier_type': identifier_type, 'value': value, 'entity_id': entity_id}
+            for (identifier_type, value), entity_id in zip(pairs, entity_ids)
+        ]}, 200
+
+@ns.route("/<int:entity_id>/colocated")
+@ns.param('entity_id', 'The unique identifier for the entity')
+class EntityColocation(Resource):
+    """
+    Finds who was near an entity, and when.
+    """
+    @ns.doc('get_colocated_entities', description='Rank the entities seen at the same locations as an entity '
+                                                   'within a time window of its events.')
+    @ns.expect(EntityDto.colocation_args)
+    @ns.response(400, 'Invalid window or range')
+    @ns.response(404, 'Entity not found')
+    @ns.marshal_with(EntityDto.contact_list)
+    def get(self, entity_id: int):
+        """
+        Returns the entity's contacts with their encounter counts.
+
+        The subject's events in [since, until) are expanded into time windows per
+        location, which are looked up with index range scans and matched back to
+        the subject's events with a sort-merge, so the cost follows the number of
+        events near the subject rather than the size of the events table.
+        """
+        args = EntityDto.colocation_args.parse_args()
+        config = current_app.config
+        window = args['window'] or config['COLOCATION_DEFAULT_WINDOW_MINUTES']
+        if window > config['COLOCATION_MAX_WINDOW_MINUTES']:
+            ns.abort(400, f"'window' may be at most {config['COLOCATION_MAX_WINDOW_MINUTES']} minutes.")
+        until = args['until'] or datetime.utcnow()
+        since = args['since'] or until - timedelta(days=config['COLOCATION_DEFAULT_DAYS'])
+        if since >= until:
+            ns.abort(400, "'since' must be before 'until'.")
+        if until - since > timedelta(days=config['COLOCATION_MAX_DAYS']):
+            ns.abort(400, f"The range may span at most {config['COLOCATION_MAX_DAYS']} days.")
+        if db.session.get(Entity, entity_id) is None:
+            ns.abort(404, f"Entity {entity_id} not found.")
+
+        limit = min(args['limit'] or config['API_PAGE_SIZE'], config['API_MAX_PAGE_SIZE'])
+        contacts, truncated = find_colocated_entities(entity_id, since, until, timedelta(minutes=window), limit=limit)
+        return {'entity_id': entity_id, 'window_minutes': window, 'contacts': contacts, 'truncated': truncated}, 200
@@ -0,0 +1,68 @@
+from flask import current_app, request
+from flask_restx import Resource
+from werkzeug.exceptions import ServiceUnavailable
+
+from ..dto import IngestDto
+from ...event_stream import event_stream
+from ...metrics import EVENTS_ACCEPTED, EVENTS_REJECTED, EVENTS_THROTTLED
+from ...services.ingestion_service import Backpressure, accept_live_events
+
+ns = IngestDto.api
+
+@ns.route("")
+class LiveEvents(Resource):
+    """
+    Accepts events pushed by card readers and Wi-Fi controllers.
+    """
+    @ns.doc('post_events', description='Ingest one event, or a batch as {"events": [...]}. '
+                                       'Events are queued and written asynchronously.')
+    @ns.expect(IngestDto.live_event_batch)
+    @ns.response(400, 'Malformed request body')
+    @ns.response(413, 'Too many events in one request')
+    @ns.response(503, 'Event backlog is full; retry after the Retry-After header')
+    @ns.marshal_with(IngestDto.ingest_result, code=202)
+    def post(self):
+        """
+        Validates, resolves and queues live events.
+
+        The body is either a single event or {"events": [...]}. For a single
+        event the Idempotency-Key header may be used instead of the
+        idempotency_key field. Each event is validated and its identifier
+        resolved to an entity; accepted events are appended to the event stream
+        and written by the stream consumer in micro-batches. Rejected events are
+        reported by position and do not fail the rest of the batch.
+        """
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict) and 'events' in payload:
+            events = payload['events']
+        elif isinstance(payload, dict):
+            events = [dict(payload, idempotency_key=payload.get('idempotency_key') or request.headers.get('Idempotency-Key'))]
+        else:
+            events = None
+        if not isinstance(events, list):
+            ns.abort(400, 'Expected a JSON event object or {"events": [...]}.')
+        if len(events) > current_app.config['EVENT_POST_MAX']:
+            ns.abort(413, f"At most {current_app.config['EVENT_POST_MAX']} events may be posted per request.")
+
+        try:
+            accepted, rejected = accept_live_events(events)
+        except Backpressure as exc:
+            EVENTS_THROTTLED.inc(len(events))
+            raise ServiceUnavailable(str(exc), retry_after=exc.retry_after)
+
+        EVENTS_ACCEPTED.inc(accepted)
+        EVENTS_REJECTED.inc(len(rejected))
+        return {'accepted': accepted, 'rejected': rejected}, 202
+
+@ns.route("/stats")
+class LiveEventStats(Resource):
+    """
+    Reports the live ingestion backlog.
+    """
+    @ns.doc('event_stream_stats')
+    @ns.marshal_with(IngestDto.stream_stats)
+    def get(self):
+        """
+        Returns how many live events are waiting to be written and how far behind the consumers are.
+        """
+        return event_stream.stats(), 200
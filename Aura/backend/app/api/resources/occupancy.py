@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_restx import Resource
+
+from ..dto import OccupancyDto
+from ..serializers import occupancy_serializers, json_response
+from ...services.occupancy_service import get_occupancy
+
+ns = OccupancyDto.api
+
+@ns.route("")
+class Occupancy(Resource):
+    """
+    Serves location occupancy heatmaps from the pre-aggregated rollups.
+    """
+    @ns.doc('get_occupancy')
+    @ns.expect(OccupancyDto.occupancy_args)
+    @ns.response(200, 'Success', OccupancyDto.occupancy)
+    @ns.response(400, 'Invalid window')
+    def get(self):
+        """
+        Returns distinct-entity and event counts per location, source and hour or day.
+
+        Reads the hourly or daily rollup tables, which are maintained as events
+        are written, so a week of hourly data for every location is a range
+        scan over a few thousand rows rather than an aggregation of raw events.
+        """
+        args = OccupancyDto.occupancy_args.parse_args()
+        until = args['until'] or datetime.utcnow()
+        since = args['since'] or until - timedelta(days=current_app.config['OCCUPANCY_DEFAULT_DAYS'])
+        if since >= until:
+            ns.abort(400, "'since' must be before 'until'.")
+
+        serializer = occupancy_serializers[args['granularity']]
+        limit = current_app.config['OCCUPANCY_MAX_BUCKETS']
+        rows = get_occupancy(args['granularity'], since, until, locations=args['location'],
+                             source_types=args['source_type'], limit=limit + 1, columns=serializer.columns)
+        return json_response(serializer.dumps(rows[:limit], 'buckets', granularity=args['granularity'],
+                                              truncated=len(rows) > limit))
@@ -1,10 +1,22 @@
+from flask import current_app
 from flask_restx import Resource
 
 from ..dto import EventDto
-from ...services.timeline_service import get_timeline_for_entity
+from ..serializers import entity_event_serializer, event_serializer, json_response
+from ...cache import make_etag, not_modified, with_etag
+from ...services.export_service import TIMELINE_COLUMNS, export_response, iter_timeline_rows
+from ...services.pagination import InvalidCursor, sync_watermark
+from ...services.timeline_service import get_timeline_for_entities, get_timeline_for_entity, timeline_version
+
+
+def timeline_etag(entity_ids, args):
+    """
+    ETag of a timeline page: the version of the entities' events plus the request arguments.
+    """
+    return make_etag('timeline', timeline_version(entity_ids), sorted(args.items()))
 
 # Get the namespace from the DTO for consistency
-ns = EventDto.ns
+ns = EventDto.api
 
 @ns.route("/<int:entity_id>")
 @ns.param('entity_id', 'The unique identifier for the entity')
@@ -12,16 +24,101 @@ class Timeline(Resource):
     """
     Handles operations related to the activity timeline of a specific entity.
     """
-    @ns.doc('get_entity_timeline', description='Get the chronological event timeline for a specific entity.')
-    @ns.marshal_list_with(EventDto.event, envelope='events')
+    @ns.doc('get_entity_timeline', description='Get one page of the chronological event timeline for a specific entity.')
+    @ns.expect(EventDto.timeline_args)
+    @ns.response(200, 'Success', EventDto.event_page)
+    @ns.response(400, 'Invalid cursor')
+    @ns.response(304, 'Not modified since the ETag sent in If-None-Match')
     def get(self, entity_id: int):
         """
-        Returns the event timeline for a single entity.
+        Returns a page of the event timeline for a single entity.
 
-        This endpoint calls the timeline service to fetch all event records
-        associated with the provided entity_id, sorts them by timestamp,
-        and serializes the response using the EventDto.
+        This endpoint calls the timeline service to fetch the newest events
+        associated with the provided entity_id, optionally restricted to a
+        since/until window. Only the EventDto columns are selected and the page
+        is encoded by the fast serializer. Pass the returned next_cursor back as
+        `cursor` to fetch the following page, and the returned watermark back
+        as `changed_since` to fetch only events written since. The ETag is
+        checked with a single index scan before the page is read.
         """
+        args = EventDto.timeline_args.parse_args()
+        etag = timeline_etag([entity_id], args)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        limit = min(args['limit'] or current_app.config['API_PAGE_SIZE'], current_app.config['API_MAX_PAGE_SIZE'])
+        watermark = sync_watermark(current_app.config['SYNC_WATERMARK_OVERLAP_SECONDS'])
+
         # Call the service layer function to get the data
-        timeline = get_timeline_for_entity(entity_id)
-        return timeline, 200
\ No newline at end of file
+        try:
+            page = get_timeline_for_entity(entity_id, since=args['since'], until=args['until'],
+                                           limit=limit, cursor=args['cursor'], changed_since=args['changed_since'],
+                                           columns=event_serializer.columns)
+        except InvalidCursor as exc:
+            ns.abort(400, str(exc))
+        return with_etag(json_response(event_serializer.dumps(
+            page.items, 'events', next_cursor=page.next_cursor, watermark=watermark)), etag)
+
+
+@ns.route("/batch")
+class BatchTimeline(Resource):
+    """
+    Handles the merged activity timeline of several entities.
+    """
+    @ns.doc('get_batch_timeline', description='Get one page of the merged chronological timeline of several entities.')
+    @ns.expect(EventDto.batch_args)
+    @ns.response(200, 'Success', EventDto.entity_event_page)
+    @ns.response(400, 'Invalid cursor or too many entities')
+    @ns.response(304, 'Not modified since the ETag sent in If-None-Match')
+    def get(self):
+        """
+        Returns a page of the events of all requested entities, newest first.
+
+        Every event carries the entity_id it belongs to. All timelines are read
+        by one query and merged on the server, so an investigation of N related
+        entities costs one round trip per page instead of N. Pagination, delta
+        sync and ETags work as for a single timeline.
+        """
+        args = EventDto.batch_args.parse_args()
+        max_entities = current_app.config['TIMELINE_BATCH_MAX_ENTITIES']
+        if len(set(args['entity_id'])) > max_entities:
+            ns.abort(400, f"At most {max_entities} entities can be requested at once.")
+        etag = timeline_etag(args['entity_id'], args)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+
+        limit = min(args['limit'] or current_app.config['API_PAGE_SIZE'], current_app.config['API_MAX_PAGE_SIZE'])
+        watermark = sync_watermark(current_app.config['SYNC_WATERMARK_OVERLAP_SECONDS'])
+
+        try:
+            page = get_timeline_for_entities(args['entity_id'], since=args['since'], until=args['until'],
+                                             limit=limit, cursor=args['cursor'], changed_since=args['changed_since'],
+                                             columns=entity_event_serializer.columns)
+        except InvalidCursor as exc:
+            ns.abort(400, str(exc))
+        return with_etag(json_response(entity_event_serializer.dumps(
+            page.items, 'events', next_cursor=page.next_cursor, watermark=watermark)), etag)
+
+
+@ns.route("/<int:entity_id>/export")
+@ns.param('entity_id', 'The unique identifier for the entity')
+class TimelineExport(Resource):
+    """
+    Streams the complete activity history of an entity as a downloadable file.
+    """
+    @ns.doc('export_entity_timeline', description='Stream the full event timeline for an entity as NDJSON or CSV.')
+    @ns.expect(EventDto.export_args)
+    @ns.produces(['application/x-ndjson', 'text/csv'])
+    def get(self, entity_id: int):
+        """
+        Streams every event of an entity, newest first.
+
+        Rows are read from the database with a server-side cursor and written to
+        the response as they arrive, so memory use stays constant however long
+        the history is.
+        """
+        args = EventDto.export_args.parse_args()
+        rows = iter_timeline_rows(entity_id, since=args['since'], until=args['until'])
+        return export_response(rows, TIMELINE_COLUMNS, args['format'], f'timeline-{entity_id}')
@@ -0,0 +1,85 @@
+import orjson
+from flask import current_app
+
+from .dto import EntityDto, EventDto, AlertDto, OccupancyDto
+from ..models import Entity, Event, Alert, HourlyOccupancy, DailyOccupancy
+
+
+class FastSerializer:
+    """
+    Column-only serialization fast path for a flask-restx model.
+
+    The SQLAlchemy columns backing each field of `model` are resolved once, at
+    import time, and labelled with the field names. List endpoints select those
+    columns as plain row tuples and encode them with orjson, skipping ORM
+    hydration and per-field marshalling. The output matches `marshal(obj, model)`
+    for the field types used by the DTOs (integers, strings, booleans and naive
+    ISO 8601 datetimes), so the documented models stay accurate.
+    """
+    def __init__(self, model, columns):
+        if set(model) != set(columns):
+            raise ValueError(f"Columns for {model.name} must match its fields: {sorted(model)}")
+        self.names = tuple(model)
+        self.columns = tuple(columns[name].label(name) for name in self.names)
+
+    def to_dicts(self, rows):
+        names = self.names
+        return [dict(zip(names, row)) for row in rows]
+
+    def dumps(self, rows, envelope, **extra):
+        """
+        Encodes `rows` as `{envelope: [...], **extra}` and returns JSON text.
+        """
+        return orjson.dumps({envelope: self.to_dicts(rows), **extra}).decode()
+
+
+def json_response(payload):
+    """
+    Wraps an already-encoded JSON payload in a response.
+    """
+    return current_app.response_class(payload, mimetype='application/json')
+
+
+entity_serializer = FastSerializer(EntityDto.entity, {
+    'id': Entity.id,
+    'name': Entity.name,
+    'entity_type': Entity.entity_type,
+    'primary_email': Entity.primary_email,
+})
+
+event_serializer = FastSerializer(EventDto.event, {
+    'id': Event.id,
+    'timestamp': Event.timestamp,
+    'location': Event.location,
+    'source_type': Event.source_type,
+    'description': Event.description,
+})
+
+entity_event_serializer = FastSerializer(EventDto.entity_event, {
+    'id': Event.id,
+    'entity_id': Event.entity_id,
+    'timestamp': Event.timestamp,
+    'location': Event.location,
+    'source_type': Event.source_type,
+    'description': Event.description,
+})
+
+alert_serializer = FastSerializer(AlertDto.alert, {
+    'id': Alert.id,
+    'timestamp': Alert.timestamp,
+    'severity': Alert.severity,
+    'message': Alert.message,
+    'is_acknowledged': Alert.is_acknowledged,
+    'entity_name': Entity.name,
+})
+
+occupancy_serializers = {
+    granularity: FastSerializer(OccupancyDto.bucket, {
+        'location': model.location,
+        'source_type': model.source_type,
+        'bucket': model.bucket,
+        'entity_count': model.entity_count,
+        'event_count': model.event_count,
+    })
+    for granularity, model in (('hour', HourlyOccupancy), ('day', DailyOccupancy))
+}
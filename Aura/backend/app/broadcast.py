@@ -0,0 +1,105 @@
+import json
+import logging
+import queue
+import threading
+
+import redis
+
+log = logging.getLogger(__name__)
+
+
+class MemoryHub:
+    """
+    In-process stand-in for Redis pub/sub, used when no ALERT_STREAM_REDIS_URL is
+    configured. Messages only reach subscribers in the same process.
+    """
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.put(message)
+        return len(subscribers)
+
+    def subscription(self, channel):
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+        return _MemorySubscription(self, channel, subscriber)
+
+    def unsubscribe(self, channel, subscriber):
+        with self._lock:
+            self._subscribers.get(channel, set()).discard(subscriber)
+
+
+class _MemorySubscription:
+    def __init__(self, hub, channel, subscriber):
+        self._hub = hub
+        self._channel = channel
+        self._subscriber = subscriber
+
+    def get(self, timeout):
+        try:
+            return self._subscriber.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._hub.unsubscribe(self._channel, self._subscriber)
+
+
+class _RedisSubscription:
+    def __init__(self, client, channel):
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(channel)
+
+    def get(self, timeout):
+        message = self._pubsub.get_message(timeout=timeout)
+        return message['data'] if message else None
+
+    def close(self):
+        self._pubsub.close()
+
+
+class AlertBroadcaster:
+    """
+    Fans newly created alerts out to live subscribers over a Redis pub/sub channel.
+
+    Each message is a JSON list of serialized alerts. Publishing is best effort:
+    if Redis is unavailable the alert is still stored, and clients pick it up on
+    their next resume from the last alert ID they saw.
+    """
+    def __init__(self, app=None):
+        self.client = None
+        self.channel = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get('ALERT_STREAM_REDIS_URL')
+        self.channel = app.config['ALERT_STREAM_CHANNEL']
+        self.client = redis.Redis.from_url(url, decode_responses=True) if url else MemoryHub()
+        app.extensions['alert_broadcaster'] = self
+
+    def publish(self, alerts):
+        if not alerts:
+            return
+        try:
+            self.client.publish(self.channel, json.dumps(alerts))
+        except redis.RedisError as exc:
+            log.warning(f"Could not publish {len(alerts)} alerts to the live stream: {exc}")
+
+    def subscribe(self):
+        """
+        Returns a subscription whose get(timeout) yields the next JSON message,
+        or None if nothing arrived within `timeout` seconds.
+        """
+        if isinstance(self.client, MemoryHub):
+            return self.client.subscription(self.channel)
+        return _RedisSubscription(self.client, self.channel)
+
+
+broadcaster = AlertBroadcaster()
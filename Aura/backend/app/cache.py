@@ -0,0 +1,240 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+import redis
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .database import primary_reads
+from .models import Entity, Alert
+
+log = logging.getLogger(__name__)
+
+KEY_PREFIX = 'aura:cache'
+
+
+class MemoryBackend:
+    """
+    In-process stand-in for the subset of the Redis API used by ResponseCache.
+
+    Used when no CACHE_REDIS_URL is configured (e.g. in tests or local runs).
+    """
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def mget(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            values = []
+            for key in keys:
+                value, expires = self._data.get(key, (None, None))
+                if expires is not None and expires <= now:
+                    del self._data[key]
+                    value = None
+                values.append(value)
+            return values
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ex if ex else None)
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._data.get(key, (0, None))[0] or 0) + 1
+            self._data[key] = (str(value), None)
+            return value
+
+
+class ResponseCache:
+    """
+    Caches serialized API responses in Redis, grouped into namespaces.
+
+    Each namespace has a version counter. Cached payloads are stored together
+    with the version they were built from, so invalidating a namespace is a single
+    INCR and stale entries are simply ignored until their TTL expires. A lookup is
+    one MGET of (version, payload).
+    """
+    def __init__(self, app=None):
+        self.backend = None
+        self.hits = Counter()
+        self.misses = Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get('CACHE_REDIS_URL')
+        if url:
+            self.backend = redis.Redis.from_url(url, decode_responses=True, socket_timeout=0.5)
+        else:
+            self.backend = MemoryBackend()
+        app.extensions['response_cache'] = self
+
+    @staticmethod
+    def _version_key(namespace):
+        return f'{KEY_PREFIX}:{namespace}:version'
+
+    @staticmethod
+    def _payload_key(namespace, key):
+        return f'{KEY_PREFIX}:{namespace}:{key}'
+
+    def get_or_set(self, namespace, key, build, ttl=None):
+        """
+        Returns the cached JSON text for (namespace, key), calling `build` to
+        produce it on a miss. Returns (payload, hit).
+
+        If Redis is unreachable the response is built directly, so an outage
+        degrades to uncached behaviour rather than failing requests.
+        """
+        try:
+            version, cached = self._lookup(namespace, key)
+        except redis.RedisError as exc:
+            log.warning(f"Response cache unavailable, serving uncached: {exc}")
+            self.misses[namespace] += 1
+            return build(), False
+        return self._get_or_build(namespace, key, build, ttl, version, cached)
+
+    def _lookup(self, namespace, key):
+        version, cached = self.backend.mget([self._version_key(namespace), self._payload_key(namespace, key)])
+        return version or '0', cached
+
+    def _get_or_build(self, namespace, key, build, ttl, version, cached):
+        if cached is not None:
+            cached_version, _, payload = cached.partition(':')
+            if cached_version == version:
+                self.hits[namespace] += 1
+                return payload, True
+
+        self.misses[namespace] += 1
+        # Stored under `version`, so it must not come from a replica still behind the write that set it.
+        with primary_reads():
+            payload = build()
+        try:
+            self.backend.set(self._payload_key(namespace, key), f'{version}:{payload}',
+                             ex=ttl or current_app.config['CACHE_DEFAULT_TTL'])
+        except redis.RedisError as exc:
+            log.warning(f"Could not store response in cache: {exc}")
+        return payload, False
+
+    def json_response(self, namespace, key, build, ttl=None):
+        """
+        Wraps `get_or_set` in a JSON response carrying an X-Cache: HIT/MISS header.
+
+        The response's ETag is derived from the namespace version and `key`, so a
+        client revalidating with a matching If-None-Match gets a 304 from the same
+        single MGET, without the payload being built. No ETag is sent while Redis
+        is unreachable.
+        """
+        try:
+            version, cached = self._lookup(namespace, key)
+        except redis.RedisError as exc:
+            log.warning(f"Response cache unavailable, serving uncached: {exc}")
+            self.misses[namespace] += 1
+            response = current_app.response_class(build(), mimetype='application/json')
+            response.headers['X-Cache'] = 'MISS'
+            return response
+
+        etag = make_etag(namespace, version, key)
+        response = not_modified(etag)
+        if response is not None:
+            self.hits[namespace] += 1
+            return response
+
+        payload, hit = self._get_or_build(namespace, key, build, ttl, version, cached)
+        response = current_app.response_class(payload, mimetype='application/json')
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return with_etag(response, etag)
+
+    def version(self, namespace):
+        """
+        Returns the current version of a namespace, or None if Redis is unreachable.
+        """
+        try:
+            version, = self.backend.mget([self._version_key(namespace)])
+        except redis.RedisError as exc:
+            log.warning(f"Could not read cache namespace version {namespace!r}: {exc}")
+            return None
+        return version or '0'
+
+    def invalidate(self, *namespaces):
+        """
+        Bumps the version of each namespace, making all of its cached entries stale.
+        """
+        for namespace in namespaces:
+            try:
+                self.backend.incr(self._version_key(namespace))
+            except redis.RedisError as exc:
+                log.warning(f"Could not invalidate cache namespace {namespace!r}: {exc}")
+
+    def stats(self):
+        """
+        Returns this process's hit/miss counters per namespace.
+        """
+        return {
+            namespace: {'hits': self.hits[namespace], 'misses': self.misses[namespace]}
+            for namespace in sorted(set(self.hits) | set(self.misses))
+        }
+
+
+def make_etag(*parts):
+    """
+    Derives an ETag value from the parts that determine a response's content.
+    """
+    return hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()[:24]
+
+
+def not_modified(etag):
+    """
+    Returns a 304 response if the request's If-None-Match matches `etag`, else None.
+    """
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    return with_etag(current_app.response_class(status=304), etag)
+
+
+def with_etag(response, etag):
+    """
+    Tags `response` with a weak ETag and asks clients to revalidate before reuse.
+
+    The ETag is weak because a payload rebuilt for the same version may differ
+    in incidental bytes (e.g. its sync watermark) while meaning the same thing.
+    """
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+cache = ResponseCache()
+
+# Maps ORM models to the cache namespaces whose responses include their rows.
+# Changes made through the ORM (e.g. acknowledging an alert) invalidate these
+# namespaces on commit; bulk Core writes (ingestion, set-based alerting) call
+# cache.invalidate() themselves.
+INVALIDATES = {
+    Entity: ('entities', 'alerts'),  # alert responses embed the entity name
+    Alert: ('alerts',),
+}
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_invalidations(session, flush_context):
+    pending = session.info.setdefault('cache_invalidate', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        pending.update(INVALIDATES.get(type(obj), ()))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_invalidations(session):
+    pending = session.info.pop('cache_invalidate', None)
+    if pending:
+        cache.invalidate(*pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('cache_invalidate', None)
@@ -0,0 +1,98 @@
+import click
+
+from .services.archive_service import archive_events
+from .services.deduplication_service import DeduplicationStats, find_duplicate_entities, merge_entities
+from .services.ingestion_service import SOURCES, ingest_file
+from .services.occupancy_service import backfill_occupancy
+from .services.partition_service import ensure_partitions, split_default_partition
+from .services.summary_service import rebuild_all_summaries
+
+
+def register_commands(app):
+    """
+    Registers the application's custom `flask` CLI commands.
+    """
+    @app.cli.command('ingest')
+    @click.argument('source', type=click.Choice(sorted(SOURCES)))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--chunk-size', type=int, default=None, help='Rows per chunk (defaults to INGEST_CHUNK_SIZE).')
+    @click.option('--no-rules', is_flag=True, help='Do not check the events against the alert rules (e.g. for a backfill).')
+    def ingest(source, path, chunk_size, no_rules):
+        """
+        Bulk-load a CSV file of SOURCE records into the database.
+
+        Entity feeds (students, staff) should be loaded before the event feeds
+        (swipes, wifi, library) that reference their identifiers.
+        """
+        stats = ingest_file(source, path, chunk_size=chunk_size, progress=lambda s: click.echo(s.summary()),
+                            evaluate_rules=not no_rules)
+        click.echo(f"Done. {stats.summary()}")
+
+    @app.cli.command('backfill-occupancy')
+    @click.option('--since', type=click.DateTime(), default=None, help='First day to rebuild (UTC); defaults to the first event.')
+    @click.option('--until', type=click.DateTime(), default=None, help='Rebuild days before this time (UTC); defaults to after the last event.')
+    def backfill_occupancy_command(since, until):
+        """
+        Rebuild the hourly and daily occupancy rollups from the events table.
+
+        Each UTC day is recomputed and committed on its own. Run it once after
+        upgrading to create the rollups for existing history.
+        """
+        days = backfill_occupancy(since=since, until=until, progress=lambda day: click.echo(f"Rebuilt {day:%Y-%m-%d}"))
+        click.echo(f"Done. Rebuilt {days} days.")
+
+    @app.cli.command('merge-duplicates')
+    @click.option('--threshold', type=click.FloatRange(0, 1), default=None,
+                  help='Minimum similarity to merge (defaults to DEDUP_MATCH_THRESHOLD).')
+    @click.option('--dry-run', is_flag=True, help='Only list the duplicate groups that would be merged.')
+    def merge_duplicates(threshold, dry_run):
+        """
+        Find entities that are the same person or asset and merge them.
+
+        Each group is merged into its oldest entity, which receives the others'
+        identifiers, events and alerts. Review a --dry-run first.
+        """
+        stats = DeduplicationStats()
+        clusters = find_duplicate_entities(threshold=threshold, stats=stats)
+        if dry_run:
+            for cluster in clusters:
+                click.echo(f"{cluster[0]} <- {', '.join(map(str, cluster[1:]))}")
+        else:
+            merge_entities(clusters, stats=stats, progress=lambda done: click.echo(f"Merged {done}/{len(clusters)} groups"))
+        click.echo(f"Done. {stats.summary()}")
+
+    @app.cli.command('archive-events')
+    @click.option('--before', type=click.DateTime(), default=None,
+                  help='Archive events before this time (UTC); defaults to midnight EVENT_RETENTION_DAYS ago.')
+    def archive_events_command(before):
+        """
+        Move old events from the database into the Parquet event archive.
+
+        Timelines and exports keep returning archived events. Safe to stop and re-run.
+        """
+        result = archive_events(before=before, progress=lambda archived: click.echo(f"Archived {archived} events"))
+        click.echo(f"Done. Archived {result['archived']} events into {result['partitions']} partitions.")
+
+    @app.cli.command('maintain-partitions')
+    @click.option('--months-ahead', type=int, default=None,
+                  help='Months after this one to create partitions for (defaults to EVENT_PARTITION_MONTHS_AHEAD).')
+    def maintain_partitions_command(months_ahead):
+        """
+        Split the default partition of the events table and create upcoming monthly partitions.
+
+        PostgreSQL only; does nothing when the events table is not partitioned.
+        Expired partitions are dropped by `flask archive-events`.
+        """
+        moved = split_default_partition()
+        created = ensure_partitions(months_ahead)
+        click.echo(f"Done. Created {len(created)} partitions; moved {moved} events out of the default partition.")
+
+    @app.cli.command('rebuild-summaries')
+    def rebuild_summaries_command():
+        """
+        Recompute every entity summary from the events and alerts tables.
+
+        Migration 0015 summarizes existing entities; use this to repair summaries. Safe to stop and re-run.
+        """
+        done = rebuild_all_summaries(progress=lambda done: click.echo(f"Summarized {done} entities"))
+        click.echo(f"Done. Summarized {done} entities.")
@@ -0,0 +1,199 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from flask import request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+from .metrics import DB_REPLICA_FALLBACKS
+
+log = logging.getLogger(__name__)
+
+# Kinds of process the app runs in; each has its own connection pool settings (DB_POOL_SETTINGS).
+PROCESS_ROLES = ('api', 'worker', 'beat')
+
+# Bind key of the read replica in SQLALCHEMY_BINDS.
+REPLICA_BIND = 'replica'
+
+# session.info key set while the session's reads may be served by the replica.
+REPLICA_READS = 'replica_reads'
+
+# session.info key set while the session's reads must be served by the primary, replica_reads or not.
+PRIMARY_READS = 'primary_reads'
+
+
+def engine_options(url, settings, config):
+    """
+    Returns the create_engine() options for a database URL under one process
+    role's pool settings.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}  # One static in-memory connection; there is no pool to size.
+    options = {
+        'pool_size': settings['pool_size'],
+        'max_overflow': settings['max_overflow'],
+        'pool_timeout': settings['pool_timeout'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE_SECONDS'],
+    }
+    if url.get_backend_name() == 'postgresql' and settings['statement_timeout_ms']:
+        options['connect_args'] = {'options': f"-c statement_timeout={settings['statement_timeout_ms']}"}
+    return options
+
+
+class RoutingSession(Session):
+    """
+    The `db.session` class. While REPLICA_READS is set in its info (see
+    `replica_reads`), plain SELECTs go to the read replica; flushes, DML,
+    SELECT ... FOR UPDATE and textual SQL always go to the primary, as does
+    everything inside `primary_reads` and when no replica is configured or it
+    cannot be reached.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get(REPLICA_READS) and not self.info.get(PRIMARY_READS) \
+                and not self._flushing and _is_plain_select(clause):
+            replica = db_router.replica(self)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_plain_select(clause):
+    return getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+
+
+@contextmanager
+def replica_reads(session=None):
+    """
+    Lets the reads of `session` (default: db.session) inside the block be
+    served by the read replica. Usable as a decorator. Reads may then lag
+    behind writes by the replication delay, so only wrap code that does not
+    need to see its own or very recent writes.
+    """
+    if session is None:
+        from .models import db
+        session = db.session
+    previous = session.info.get(REPLICA_READS)
+    session.info[REPLICA_READS] = True
+    try:
+        yield session
+    finally:
+        session.info[REPLICA_READS] = previous
+
+
+@contextmanager
+def primary_reads(session=None):
+    """
+    Makes the reads of `session` (default: db.session) inside the block go to
+    the primary, even within `replica_reads` or a GET request. Wrap anything
+    built for a cache version that a write has just bumped: built from a
+    lagging replica, it would hold the data from before the write under the
+    version that says it is current.
+    """
+    if session is None:
+        from .models import db
+        session = db.session
+    previous = session.info.get(PRIMARY_READS)
+    session.info[PRIMARY_READS] = True
+    try:
+        yield session
+    finally:
+        session.info[PRIMARY_READS] = previous
+
+
+class DatabaseRouter:
+    """
+    Configures the database engines of a process and routes reads between the
+    primary and the optional read replica (DATABASE_REPLICA_URL).
+
+    `init_app` must run before `db.init_app`: it picks the pool settings of
+    the app's PROCESS_ROLE for every engine and adds the replica bind. Reads of
+    GET and HEAD requests are then routed to the replica. When the replica
+    cannot be reached, reads fall back to the primary for
+    DATABASE_REPLICA_RETRY_SECONDS before it is tried again.
+    """
+    def __init__(self, app=None):
+        self.retry_seconds = 30
+        self._replica_down_until = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        role = config['PROCESS_ROLE']
+        if role not in PROCESS_ROLES:
+            raise ValueError(f"Unknown PROCESS_ROLE '{role}'. Available: {', '.join(PROCESS_ROLES)}.")
+        settings = config['DB_POOL_SETTINGS'][role]
+        self.retry_seconds = config['DATABASE_REPLICA_RETRY_SECONDS']
+
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            **engine_options(config['SQLALCHEMY_DATABASE_URI'], settings, config),
+            **config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+        }
+        if config['DATABASE_REPLICA_URL']:
+            config['SQLALCHEMY_BINDS'] = {
+                **config.get('SQLALCHEMY_BINDS', {}),
+                REPLICA_BIND: {'url': config['DATABASE_REPLICA_URL'],
+                               **engine_options(config['DATABASE_REPLICA_URL'], settings, config)},
+            }
+
+        @app.before_request
+        def _route_reads():
+            if request.method in ('GET', 'HEAD'):
+                from .models import db
+                db.session.info[REPLICA_READS] = True
+
+        @app.teardown_request
+        def _reset_routing(exc):
+            from .models import db
+            db.session.info.pop(REPLICA_READS, None)
+
+        app.extensions['db_router'] = self
+
+    def replica(self, session):
+        """
+        Returns the replica engine for `session`'s reads, or None to use the primary.
+
+        The session's connection to the replica is opened here, so a replica
+        that cannot be reached is noticed before a query is sent to it.
+        """
+        engine = session._db.engines.get(REPLICA_BIND)
+        if engine is None or time.monotonic() < self._replica_down_until:
+            return None
+        try:
+            session.connection(bind_arguments={'bind': engine})
+        except OperationalError:
+            log.warning(f"Read replica unreachable; reading from the primary for {self.retry_seconds}s.",
+                        exc_info=True)
+            self._replica_down_until = time.monotonic() + self.retry_seconds
+            DB_REPLICA_FALLBACKS.inc()
+            return None
+        return engine
+
+    def replayed_until(self, session=None):
+        """
+        Returns the commit time (naive UTC) of the last transaction the read
+        replica has replayed, so that delta-sync watermarks for replica reads
+        do not run ahead of what the replica holds. Returns None when the reads
+        of `session` (default: db.session) cannot reach the replica (none
+        configured, unreachable or inside `primary_reads`) or the replica is
+        not a PostgreSQL standby.
+        """
+        if session is None:
+            from .models import db
+            session = db.session()
+        if session.info.get(PRIMARY_READS):
+            return None
+        engine = self.replica(session)
+        if engine is None or engine.dialect.name != 'postgresql':
+            return None
+        return session.connection(bind_arguments={'bind': engine}).execute(
+            text("SELECT pg_last_xact_replay_timestamp() AT TIME ZONE 'UTC'")
+        ).scalar()
+
+
+db_router = DatabaseRouter()
@@ -0,0 +1,341 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+log = logging.getLogger(__name__)
+
+# Columns of an archived event, as stored in the Parquet files.
+ARCHIVE_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('entity_id', pa.int64()),
+    ('timestamp', pa.timestamp('us')),
+    ('location', pa.string()),
+    ('source_type', pa.string()),
+    ('description', pa.string()),
+    ('ingest_key', pa.string()),
+    ('updated_at', pa.timestamp('us')),
+])
+
+# Rows per Parquet row group. Files are sorted by (entity_id, timestamp), so the
+# row-group min/max statistics let a read skip the groups of other entities.
+ROW_GROUP_SIZE = 32768
+
+# A partition with more files than this is rewritten as a single file after an archive run.
+COMPACT_AFTER_FILES = 8
+
+MANIFEST = 'manifest.json'
+
+# Maps entities merged away (see deduplication_service) to their survivor. Archived
+# files are never rewritten, so their rows keep the merged entity's ID.
+ALIASES = 'aliases.json'
+
+
+class EventArchive:
+    """
+    Cold tier of the events table: zstd-compressed Parquet files on a shared volume.
+
+    Files are laid out as month=YYYY-MM/bucket=N/part-*.parquet, where N is
+    entity_id modulo the bucket count, so a read for a few entities only opens
+    their buckets of the months its time range spans. Inside each file the
+    entity_id and timestamp filters are pushed down to row-group statistics.
+
+    A manifest records the horizon: every archived event is older than it, and
+    events older than it may be archived. Reads that stay at or after the
+    horizon never touch the archive.
+
+    Archive runs write new files before the rows are deleted from the database,
+    so a crash in between leaves an event in both tiers; reads drop duplicate IDs.
+
+    Merging entities does not touch the files. Instead the merged IDs are
+    recorded as aliases of the survivor: a read for the survivor also reads
+    their rows and reports them under the survivor's ID.
+    """
+    def __init__(self, app=None):
+        self.root = None
+        self.default_buckets = 16
+        self._manifest = {}
+        self._manifest_mtime = None
+        self._aliases = ({}, {})
+        self._aliases_mtime = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.root = app.config['EVENT_ARCHIVE_PATH']
+        self.default_buckets = app.config['EVENT_ARCHIVE_BUCKETS']
+        app.extensions['event_archive'] = self
+
+    # --- Manifest ---
+
+    def _read_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            if mtime != self._manifest_mtime:
+                with open(path) as handle:
+                    self._manifest = json.load(handle)
+                self._manifest_mtime = mtime
+            return self._manifest
+
+    def _write_manifest(self, manifest):
+        self._write_json(MANIFEST, manifest)
+
+    def _write_json(self, name, content):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, name)
+        temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump(content, handle)
+        os.replace(temporary, path)
+
+    # --- Merged entities ---
+
+    def _read_aliases(self):
+        """
+        Returns ({merged ID: survivor ID}, {survivor ID: [merged IDs]}).
+        """
+        path = os.path.join(self.root, ALIASES)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return {}, {}
+        with self._lock:
+            if mtime != self._aliases_mtime:
+                with open(path) as handle:
+                    survivor_of = {int(merged): survivor for merged, survivor in json.load(handle).items()}
+                merged_into = {}
+                for merged, survivor in survivor_of.items():
+                    merged_into.setdefault(survivor, []).append(merged)
+                self._aliases, self._aliases_mtime = (survivor_of, merged_into), mtime
+            return self._aliases
+
+    def record_merges(self, survivor_of):
+        """
+        Records that the entities keyed in `survivor_of` were merged into the
+        mapped survivors, so their archived events are read as the survivors'.
+        Entities merged earlier into one now merged away follow it to its survivor.
+        Nothing is recorded while the archive is empty: events archived later
+        already carry the survivor's ID.
+        """
+        if not survivor_of or self.horizon() is None:
+            return
+        aliases, _ = self._read_aliases()
+        aliases = {merged: survivor_of.get(survivor, survivor) for merged, survivor in aliases.items()}
+        aliases.update((int(merged), int(survivor)) for merged, survivor in survivor_of.items())
+        self._write_json(ALIASES, {str(merged): survivor for merged, survivor in sorted(aliases.items())})
+
+    def horizon(self):
+        """
+        Returns the time before which events may be archived, or None if nothing is.
+        """
+        archived_before = self._read_manifest().get('archived_before')
+        return datetime.fromisoformat(archived_before) if archived_before else None
+
+    @property
+    def buckets(self):
+        # The bucket count is fixed once files exist; changing it would misplace reads.
+        return self._read_manifest().get('buckets', self.default_buckets)
+
+    def advance_horizon(self, archived_before: datetime):
+        """
+        Records that events before `archived_before` may now be in the archive.
+        """
+        horizon = self.horizon()
+        if horizon is None or archived_before > horizon:
+            self._write_manifest({'archived_before': archived_before.isoformat(), 'buckets': self.buckets})
+
+    def covers(self, since: datetime = None, oldest: datetime = None):
+        """
+        Tells whether a read of events at or after `since` must consult the archive.
+
+        `oldest` is the oldest event already found in the database for a page that
+        is full: archived events are all older than the horizon, so if that event
+        is not, no archived event can be on the page.
+        """
+        horizon = self.horizon()
+        if horizon is None:
+            return False
+        if since is not None and since >= horizon:
+            return False
+        return oldest is None or oldest < horizon
+
+    # --- Writing ---
+
+    def write(self, table):
+        """
+        Appends a pyarrow Table of events (ARCHIVE_SCHEMA) to the archive.
+
+        Each (month, bucket) partition the rows fall into gets one new file.
+        Files are written under a temporary name and renamed into place, so
+        readers never see a partial file.
+
+        :returns: The set of partition directories written to.
+        """
+        months = pc.strftime(table['timestamp'], format='%Y-%m').to_numpy(zero_copy_only=False)
+        buckets = table['entity_id'].to_numpy() % self.buckets
+
+        written = set()
+        for month in np.unique(months):
+            in_month = months == month
+            for bucket in np.unique(buckets[in_month]):
+                rows = table.filter(pa.array(in_month & (buckets == bucket))).sort_by(
+                    [('entity_id', 'ascending'), ('timestamp', 'ascending'), ('id', 'ascending')])
+                directory = self._partition_dir(month, int(bucket))
+                self._write_file(directory, rows)
+                written.add(directory)
+        return written
+
+    def _partition_dir(self, month, bucket):
+        return os.path.join(self.root, f'month={month}', f'bucket={bucket}')
+
+    @staticmethod
+    def _write_file(directory, rows):
+        os.makedirs(directory, exist_ok=True)
+        name = f'part-{uuid.uuid4().hex}.parquet'
+        # Names starting with '.' are skipped by readers until the rename.
+        temporary = os.path.join(directory, f'.{name}.tmp')
+        pq.write_table(rows, temporary, compression='zstd', row_group_size=ROW_GROUP_SIZE)
+        os.replace(temporary, os.path.join(directory, name))
+
+    def compact(self, directory):
+        """
+        Rewrites the files of a partition as one sorted, de-duplicated file.
+
+        Returns True if the partition was compacted.
+        """
+        files = self._files(directory)
+        if len(files) <= COMPACT_AFTER_FILES:
+            return False
+        table = ds.dataset(files, schema=ARCHIVE_SCHEMA, format='parquet').to_table()
+        self._write_file(directory, _drop_duplicate_ids(table).sort_by(
+            [('entity_id', 'ascending'), ('timestamp', 'ascending'), ('id', 'ascending')]))
+        for path in files:
+            os.remove(path)
+        return True
+
+    # --- Reading ---
+
+    @staticmethod
+    def _files(directory):
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        return sorted(os.path.join(directory, name) for name in names
+                      if name.endswith('.parquet') and not name.startswith('.'))
+
+    def _months(self, since, before):
+        """
+        Archived months overlapping [since, before), newest first.
+        """
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        months = []
+        for name in names:
+            if not name.startswith('month='):
+                continue
+            start = datetime.strptime(name[len('month='):], '%Y-%m')
+            end = (start + timedelta(days=32)).replace(day=1)
+            if (since is None or end > since) and (before is None or start < before):
+                months.append(name[len('month='):])
+        return sorted(months, reverse=True)
+
+    def read(self, entity_ids, since: datetime = None, until: datetime = None, position=None,
+             changed_since: datetime = None, limit: int = None):
+        """
+        Returns archived events of `entity_ids` as dicts, newest first.
+
+        `since`/`until` bound the event time as a half-open window, `position` is
+        a decoded (timestamp, id) keyset cursor to read strictly after, and
+        `changed_since` filters on updated_at. Months are read newest first and
+        reading stops once `limit` events are found.
+        """
+        entity_ids = list(dict.fromkeys(entity_ids))
+        if not entity_ids:
+            return []
+        rows = []
+        for month_rows in self._iter_months(entity_ids, since, until, position, changed_since):
+            rows.extend(month_rows)
+            if limit is not None and len(rows) >= limit:
+                return rows[:limit]
+        return rows
+
+    def iter_events(self, entity_ids, since: datetime = None, until: datetime = None):
+        """
+        Yields archived events of `entity_ids` as dicts, newest first, one month at a time.
+        """
+        for month_rows in self._iter_months(list(dict.fromkeys(entity_ids)), since, until, None, None):
+            yield from month_rows
+
+    def _iter_months(self, entity_ids, since, until, position, changed_since):
+        before = until
+        if position is not None:
+            # Months up to and including the cursor position's timestamp.
+            through_position = position[0] + timedelta(microseconds=1)
+            before = through_position if before is None else min(before, through_position)
+        survivor_of, merged_into = self._read_aliases()
+        merged = [alias for entity_id in entity_ids for alias in merged_into.get(entity_id, ())]
+        entity_ids = entity_ids + merged
+        buckets = self.buckets
+        wanted_buckets = sorted({entity_id % buckets for entity_id in entity_ids})
+
+        condition = pc.field('entity_id').isin(entity_ids)
+        if since is not None:
+            condition &= pc.field('timestamp') >= pa.scalar(since, pa.timestamp('us'))
+        if until is not None:
+            condition &= pc.field('timestamp') < pa.scalar(until, pa.timestamp('us'))
+        if position is not None:
+            timestamp = pa.scalar(position[0], pa.timestamp('us'))
+            condition &= (pc.field('timestamp') < timestamp) | (
+                (pc.field('timestamp') == timestamp) & (pc.field('id') < position[1]))
+        if changed_since is not None:
+            condition &= pc.field('updated_at') >= pa.scalar(changed_since, pa.timestamp('us'))
+
+        for month in self._months(since, before):
+            table = self._read_month(month, wanted_buckets, condition)
+            if table is not None and table.num_rows:
+                table = _drop_duplicate_ids(table).sort_by([('timestamp', 'descending'), ('id', 'descending')])
+                rows = table.to_pylist()
+                if merged:
+                    for row in rows:
+                        row['entity_id'] = survivor_of.get(row['entity_id'], row['entity_id'])
+                yield rows
+
+    def _read_month(self, month, buckets, condition):
+        # A compaction may remove files between listing and reading them; list again once.
+        for attempt in range(2):
+            files = [path for bucket in buckets for path in self._files(self._partition_dir(month, bucket))]
+            if not files:
+                return None
+            try:
+                return ds.dataset(files, schema=ARCHIVE_SCHEMA, format='parquet').to_table(filter=condition)
+            except FileNotFoundError:
+                if attempt:
+                    raise
+
+
+def _drop_duplicate_ids(table):
+    # Only events caught in both tiers by an interrupted archive run are duplicated.
+    if pc.count_distinct(table['id']).as_py() == table.num_rows:
+        return table
+    first = table.append_column('_row', pa.array(range(table.num_rows))) \
+        .group_by('id').aggregate([('_row', 'min')])['_row_min']
+    return table.take(first)
+
+
+event_archive = EventArchive()
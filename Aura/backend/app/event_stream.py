@@ -0,0 +1,220 @@
+import itertools
+import threading
+import time
+
+import redis
+from prometheus_client.core import GaugeMetricFamily
+
+from .metrics import metrics
+
+
+class MemoryEventLog:
+    """
+    In-process stand-in for the Redis stream and consumer group used by
+    EventStream, used when no EVENT_STREAM_REDIS_URL is configured. Entries only
+    reach consumers in the same process (e.g. tests or eager Celery runs).
+    """
+    def __init__(self):
+        self._entries = {}
+        self._pending = {}
+        self._cursor = 0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._arrived = threading.Condition(self._lock)
+
+    def append(self, records):
+        with self._arrived:
+            ids = []
+            for fields in records:
+                entry_id = f'{int(time.time() * 1000)}-{next(self._sequence)}'
+                self._entries[entry_id] = fields
+                ids.append(entry_id)
+            self._arrived.notify_all()
+            return ids
+
+    def read(self, consumer, count, block_ms):
+        deadline = time.monotonic() + block_ms / 1000
+        with self._arrived:
+            while True:
+                delivered = list(self._entries)[self._cursor:self._cursor + count]
+                if delivered or time.monotonic() >= deadline:
+                    break
+                self._arrived.wait(deadline - time.monotonic())
+            self._cursor += len(delivered)
+            now = time.monotonic()
+            for entry_id in delivered:
+                self._pending[entry_id] = (consumer, now)
+            return [(entry_id, self._entries[entry_id]) for entry_id in delivered]
+
+    def claim_stale(self, consumer, min_idle_ms, count):
+        now = time.monotonic()
+        with self._lock:
+            stale = [entry_id for entry_id, (_, since) in self._pending.items()
+                     if (now - since) * 1000 >= min_idle_ms][:count]
+            for entry_id in stale:
+                self._pending[entry_id] = (consumer, now)
+            return [(entry_id, self._entries[entry_id]) for entry_id in stale]
+
+    def ack(self, ids):
+        with self._lock:
+            for entry_id in ids:
+                if self._pending.pop(entry_id, None) is not None:
+                    del self._entries[entry_id]
+                    self._cursor -= 1
+
+    def length(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            oldest = next(iter(self._entries), None)
+            return len(self._entries), len(self._pending), oldest
+
+
+class _RedisEventLog:
+    def __init__(self, client, key, group):
+        self._client = client
+        self._key = key
+        self._group = group
+        self._group_ready = False
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self._client.xgroup_create(self._key, self._group, id='0', mkstream=True)
+        except redis.ResponseError as exc:
+            if 'BUSYGROUP' not in str(exc):
+                raise
+        self._group_ready = True
+
+    def append(self, records):
+        pipe = self._client.pipeline(transaction=False)
+        for fields in records:
+            pipe.xadd(self._key, fields)
+        return pipe.execute()
+
+    def read(self, consumer, count, block_ms):
+        self._ensure_group()
+        response = self._client.xreadgroup(self._group, consumer, {self._key: '>'}, count=count, block=block_ms)
+        return response[0][1] if response else []
+
+    def claim_stale(self, consumer, min_idle_ms, count):
+        self._ensure_group()
+        _, claimed, *_ = self._client.xautoclaim(self._key, self._group, consumer, min_idle_ms, count=count)
+        # Entries deleted while pending come back as (id, None); there is nothing left to write.
+        return [(entry_id, fields) for entry_id, fields in claimed if fields]
+
+    def ack(self, ids):
+        # Acknowledged entries are deleted so the stream length is the undelivered
+        # plus in-flight backlog, which is what backpressure is measured against.
+        pipe = self._client.pipeline(transaction=False)
+        pipe.xack(self._key, self._group, *ids)
+        pipe.xdel(self._key, *ids)
+        pipe.execute()
+
+    def length(self):
+        return self._client.xlen(self._key)
+
+    def stats(self):
+        self._ensure_group()
+        pipe = self._client.pipeline(transaction=False)
+        pipe.xlen(self._key)
+        pipe.xpending(self._key, self._group)
+        pipe.xrange(self._key, count=1)
+        length, pending, oldest = pipe.execute()
+        return length, pending['pending'], oldest[0][0] if oldest else None
+
+
+class EventStream:
+    """
+    Durable buffer between the live event endpoint and the database, backed by a
+    Redis stream read through a consumer group.
+
+    Producers append resolved events; consumers read them in batches, write them
+    and only then acknowledge them. Entries a consumer read but never
+    acknowledged (e.g. because its worker died) are reclaimed by another consumer
+    after EVENT_STREAM_CLAIM_IDLE_MS, so delivery is at-least-once and writers
+    de-duplicate on each event's idempotency key.
+    """
+    def __init__(self, app=None):
+        self.log = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get('EVENT_STREAM_REDIS_URL')
+        if url:
+            client = redis.Redis.from_url(url, decode_responses=True)
+            self.log = _RedisEventLog(client, app.config['EVENT_STREAM_KEY'], app.config['EVENT_STREAM_GROUP'])
+        else:
+            self.log = MemoryEventLog()
+        app.extensions['event_stream'] = self
+
+    def append(self, records):
+        """
+        Appends a list of field dicts (string values) and returns their entry IDs.
+        """
+        return self.log.append(records) if records else []
+
+    def read(self, consumer, count, block_ms):
+        """
+        Returns up to `count` new (entry_id, fields) pairs for `consumer`, waiting
+        up to `block_ms` milliseconds for the first one to arrive.
+        """
+        return self.log.read(consumer, count, block_ms)
+
+    def claim_stale(self, consumer, min_idle_ms, count):
+        """
+        Moves up to `count` entries that other consumers have left unacknowledged
+        for at least `min_idle_ms` to `consumer` and returns them.
+        """
+        return self.log.claim_stale(consumer, min_idle_ms, count)
+
+    def ack(self, ids):
+        if ids:
+            self.log.ack(ids)
+
+    def length(self):
+        """
+        Returns the number of entries not yet written to the database.
+        """
+        return self.log.length()
+
+    def stats(self):
+        """
+        Returns the backlog: entries not yet written (`length`), how many of those
+        are in flight with a consumer (`pending`) and the age in seconds of the
+        oldest one (`lag_seconds`), derived from its entry ID.
+        """
+        length, pending, oldest = self.log.stats()
+        lag = max(0.0, time.time() - entry_time(oldest)) if oldest else 0.0
+        return {'length': length, 'pending': pending, 'lag_seconds': round(lag, 3)}
+
+    def collect(self):
+        """
+        Prometheus collector: reports the backlog at scrape time.
+        """
+        if self.log is None:
+            return
+        try:
+            stats = self.stats()
+        except redis.RedisError:
+            return
+        yield GaugeMetricFamily('aura_event_stream_backlog', 'Live events waiting to be written.', value=stats['length'])
+        yield GaugeMetricFamily('aura_event_stream_pending', 'Live events read by a consumer but not yet written.',
+                                value=stats['pending'])
+        yield GaugeMetricFamily('aura_event_stream_lag_seconds', 'Age of the oldest live event waiting to be written.',
+                                value=stats['lag_seconds'])
+
+
+def entry_time(entry_id):
+    """
+    Returns the time (epoch seconds) encoded in a stream entry ID.
+    """
+    return int(entry_id.split('-', 1)[0]) / 1000
+
+
+event_stream = EventStream()
+metrics.register_collector(event_stream)
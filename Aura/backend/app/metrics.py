@@ -0,0 +1,282 @@
+import glob
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import current_app, g, has_app_context, jsonify, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY,
+                               generate_latest, multiprocess, values)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+
+def process_identifier(pid=None):
+    """
+    Names the metric files of a process in PROMETHEUS_MULTIPROC_DIR. The API and
+    worker containers share that directory but not a PID namespace, so the
+    host name keeps their files apart.
+    """
+    return f'{socket.gethostname()}-{os.getpid() if pid is None else pid}'
+
+
+# Must be set before the first metric below is created.
+if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    values.ValueClass = values.MultiProcessValue(process_identifier)
+
+# --- Metric definitions ---
+# `context` is the matched URL rule for HTTP requests, the task name for Celery
+# tasks, and 'none' for statements issued outside either (e.g. CLI commands).
+
+REQUEST_LATENCY = Histogram(
+    'aura_http_request_duration_seconds', 'Time spent handling an HTTP request.',
+    ['method', 'endpoint', 'status'],
+)
+REQUEST_QUERIES = Histogram(
+    'aura_http_request_queries', 'SQL statements executed per HTTP request.',
+    ['endpoint'], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500, 1000),
+)
+TASK_LATENCY = Histogram(
+    'aura_task_duration_seconds', 'Time spent running a Celery task.',
+    ['task', 'outcome'], buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+TASK_QUERIES = Histogram(
+    'aura_task_queries', 'SQL statements executed per Celery task run.',
+    ['task'], buckets=(0, 1, 2, 5, 10, 50, 100, 500, 1000, 5000, 10000),
+)
+SQL_LATENCY = Histogram(
+    'aura_sql_query_duration_seconds', 'Time spent executing a single SQL statement.',
+    ['context'], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+SQL_ROWS = Counter(
+    'aura_sql_rows_total', 'Rows reported by the driver for statements that return a result set.',
+    ['context'],
+)
+SQL_SLOW = Counter(
+    'aura_sql_slow_queries_total', 'SQL statements slower than METRICS_SLOW_QUERY_MS.',
+    ['context'],
+)
+
+# --- Live event ingestion ---
+EVENTS_ACCEPTED = Counter('aura_events_accepted_total', 'Live events validated and appended to the event stream.')
+EVENTS_REJECTED = Counter('aura_events_rejected_total', 'Live events rejected by validation or resolution.')
+EVENTS_THROTTLED = Counter('aura_events_throttled_total', 'Live events refused because the event stream backlog was full.')
+EVENTS_WRITTEN = Counter('aura_events_written_total', 'Stream events written to the events table.')
+EVENTS_DUPLICATE = Counter('aura_events_duplicate_total', 'Redelivered stream events skipped by their idempotency key.')
+EVENTS_DROPPED = Counter('aura_events_dropped_total', 'Stream events that could not be written and were discarded.')
+EVENT_BATCH_SIZE = Histogram(
+    'aura_event_batch_size', 'Stream entries per micro-batch written by the event consumer.',
+    buckets=(1, 10, 50, 100, 500, 1000, 2500, 5000, 10000),
+)
+EVENT_LAG = Histogram(
+    'aura_event_lag_seconds', 'Time from a live event entering the stream to its batch being committed.',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+
+
+# --- Database routing ---
+DB_REPLICA_FALLBACKS = Counter('aura_db_replica_fallbacks_total',
+                               'Times the read replica could not be reached and reads moved to the primary.')
+
+# --- Alert rules ---
+RULE_EVENTS = Counter('aura_rule_events_total', 'Events evaluated by an alert rule.', ['rule'])
+RULE_ALERTS = Counter('aura_rule_alerts_total', 'Alerts raised by an alert rule.', ['rule'])
+RULE_LATENCY = Histogram(
+    'aura_rule_duration_seconds', 'Time an alert rule spent evaluating one batch of events.',
+    ['rule'], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+class QueryTracker:
+    """
+    Running SQL totals for one HTTP request or one Celery task run.
+    """
+    def __init__(self, context):
+        self.context = context
+        self.queries = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class PerformanceMetrics:
+    """
+    Records request, task and SQL timings as Prometheus metrics.
+
+    SQL statements are timed through engine cursor events and attributed to the
+    request or task running in the current app context. Statements slower than
+    METRICS_SLOW_QUERY_MS are kept as samples (most recent first) and logged, and
+    requests or tasks issuing more than METRICS_QUERY_COUNT_WARN statements are
+    logged so N+1 patterns show up without a profiler.
+
+    Metrics are per process. When PROMETHEUS_MULTIPROC_DIR points at a directory
+    shared by the API and the Celery workers, /metrics aggregates all of them.
+    """
+    def __init__(self, app=None):
+        self.slow_query_ms = 200.0
+        self.query_count_warn = 50
+        self.slow_queries = deque(maxlen=50)
+        self.collectors = CollectorRegistry()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.slow_query_ms = app.config['METRICS_SLOW_QUERY_MS']
+        self.query_count_warn = app.config['METRICS_QUERY_COUNT_WARN']
+        self.slow_queries = deque(maxlen=app.config['METRICS_SLOW_QUERY_SAMPLES'])
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        app.add_url_rule('/metrics/slow-queries', 'slow_queries', self.slow_queries_view)
+        app.extensions['performance_metrics'] = self
+
+    # --- HTTP requests ---
+
+    @staticmethod
+    def _start_request():
+        rule = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.query_tracker = QueryTracker(rule)
+
+    def _finish_request(self, response):
+        tracker = g.pop('query_tracker', None)
+        if tracker is None:
+            return response
+        # Streaming responses (exports, SSE) are timed up to their headers only.
+        elapsed = tracker.elapsed
+        REQUEST_LATENCY.labels(request.method, tracker.context, response.status_code).observe(elapsed)
+        REQUEST_QUERIES.labels(tracker.context).observe(tracker.queries)
+        self._warn_on_query_count('Request', f'{request.method} {tracker.context}', tracker)
+
+        if current_app.config['METRICS_SERVER_TIMING']:
+            response.headers['Server-Timing'] = (
+                f'db;dur={tracker.seconds * 1000:.1f};desc="{tracker.queries} queries, {tracker.rows} rows", '
+                f'app;dur={elapsed * 1000:.1f}'
+            )
+        return response
+
+    # --- Celery tasks ---
+
+    @contextmanager
+    def track_task(self, name):
+        """
+        Times a task run and attributes its SQL statements to it. Must be entered
+        inside the app context the task runs in.
+        """
+        tracker = g.query_tracker = QueryTracker(name)
+        outcome = 'failure'
+        try:
+            yield tracker
+            outcome = 'success'
+        finally:
+            g.pop('query_tracker', None)
+            TASK_LATENCY.labels(name, outcome).observe(tracker.elapsed)
+            TASK_QUERIES.labels(name).observe(tracker.queries)
+            self._warn_on_query_count('Task', name, tracker)
+
+    # --- SQL statements ---
+
+    def record_query(self, statement, seconds, rows):
+        tracker = g.get('query_tracker') if has_app_context() else None
+        context = tracker.context if tracker else 'none'
+        if tracker:
+            tracker.queries += 1
+            tracker.seconds += seconds
+            tracker.rows += max(rows, 0)
+
+        SQL_LATENCY.labels(context).observe(seconds)
+        if rows > 0:
+            SQL_ROWS.labels(context).inc(rows)
+        if seconds * 1000 >= self.slow_query_ms:
+            SQL_SLOW.labels(context).inc()
+            sample = {
+                'context': context,
+                'duration_ms': round(seconds * 1000, 1),
+                'rows': rows,
+                'statement': ' '.join(statement.split())[:1000],
+                'at': datetime.utcnow().isoformat(),
+            }
+            with self._lock:
+                self.slow_queries.appendleft(sample)
+            log.warning(f"Slow query in {context} ({sample['duration_ms']}ms): {sample['statement'][:200]}")
+
+    def _warn_on_query_count(self, kind, name, tracker):
+        if tracker.queries > self.query_count_warn:
+            log.warning(f"{kind} {name} issued {tracker.queries} SQL statements "
+                        f"({tracker.seconds * 1000:.1f}ms in the database); possible N+1 query pattern.")
+
+    def register_collector(self, collector):
+        """
+        Adds a collector whose values are read live on every scrape of this
+        process (e.g. the event stream backlog) rather than recorded per process.
+        """
+        self.collectors.register(collector)
+
+    # --- Views ---
+
+    def metrics_view(self):
+        if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        payload = generate_latest(registry) + generate_latest(self.collectors)
+        return current_app.response_class(payload, content_type=CONTENT_TYPE_LATEST)
+
+    def slow_queries_view(self):
+        with self._lock:
+            samples = list(self.slow_queries)
+        return jsonify({'slow_queries': samples, 'threshold_ms': self.slow_query_ms})
+
+
+metrics = PerformanceMetrics()
+
+
+def clear_multiprocess_dir():
+    """
+    Removes the metric files left in PROMETHEUS_MULTIPROC_DIR by earlier runs on
+    this host. Call once in the parent process before any child starts (gunicorn
+    `on_starting`, Celery `worker_init`); files of other containers are left alone.
+    """
+    path = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    stale = glob.glob(os.path.join(path, f'*_{process_identifier("*")}.db'))
+    for filename in stale:
+        os.remove(filename)
+    if stale:
+        log.info(f"Removed {len(stale)} metric files of earlier processes from {path}.")
+
+
+def mark_process_dead(pid):
+    """
+    Drops the live gauge values of an exited child process, so /metrics stops
+    reporting them. Its counters and histograms are kept, as their totals still count.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(process_identifier(pid))
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    # rowcount is only meaningful for statements that return rows and is -1
+    # when the driver does not know it (e.g. SQLite, server-side cursors).
+    rows = cursor.rowcount if cursor.description is not None else -1
+    metrics.record_query(statement, elapsed, rows)
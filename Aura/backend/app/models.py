@@ -1,9 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, bindparam, event, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
-# Initialize the SQLAlchemy extension
-db = SQLAlchemy()
+from .database import RoutingSession
+
+# Initialize the SQLAlchemy extension. Its session can send reads to a read replica (see app/database.py).
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Entity(db.Model):
     """
@@ -11,11 +15,19 @@ class Entity(db.Model):
     This is the central table for all resolved entities on campus.
     """
     __tablename__ = 'entities'
+    # IDs of merged entities live on in entity_aliases; SQLite must not hand them out again.
+    __table_args__ = {'sqlite_autoincrement': True}
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128), nullable=False)
     entity_type = db.Column(db.String(50), nullable=False) # e.g., 'student', 'staff', 'asset'
     primary_email = db.Column(db.String(128), unique=True, nullable=True)
+    # Timestamp of the entity's most recent event. Maintained on every event write
+    # so that inactivity checks are an index range scan instead of a GROUP BY over events.
+    last_seen_at = db.Column(db.DateTime, nullable=True, index=True)
+    # Time of the last change to the entity's own fields, for delta sync ("changed since").
+    # Advancing last_seen_at does not count as a change.
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # --- Relationships ---
     # One-to-Many: One Entity can have multiple Identifiers
@@ -40,7 +52,7 @@ class Identifier(db.Model):
     value = db.Column(db.String(255), nullable=False, index=True)
 
     # --- Foreign Keys ---
-    entity_id = db.Column(db.Integer, db.ForeignKey('entities.id'), nullable=False)
+    entity_id = db.Column(db.Integer, db.ForeignKey('entities.id'), nullable=False, index=True)
 
     # --- Relationships ---
     # Many-to-One: Many Identifiers belong to one Entity
@@ -49,10 +61,25 @@ class Identifier(db.Model):
     def __repr__(self):
         return f'<Identifier {self.identifier_type}: {self.value}>'
 
+# Trigram GIN indexes answering the typeahead search (prefix LIKE and pg_trgm word
+# similarity on lower-cased values). PostgreSQL only; other databases are searched
+# through the in-process prefix index in search_service.
+event.listen(db.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+for _name, _column in (('ix_entities_name_trgm', Entity.name),
+                       ('ix_entities_primary_email_trgm', Entity.primary_email),
+                       ('ix_identifiers_value_trgm', Identifier.value)):
+    db.Index(_name, func.lower(_column).label('value'), postgresql_using='gin',
+             postgresql_ops={'value': 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+
 class Event(db.Model):
     """
     Represents a single recorded activity for an entity from any data source.
     This table forms the basis for generating activity timelines.
+
+    On PostgreSQL the table is range-partitioned by month on `timestamp`
+    (migration 0011, services/partition_service.py), so its primary key there is
+    (id, timestamp); IDs still come from one sequence and identify an event alone.
     """
     __tablename__ = 'events'
 
@@ -61,6 +88,12 @@ class Event(db.Model):
     location = db.Column(db.String(255), nullable=True)
     source_type = db.Column(db.String(50), nullable=False) # e.g., 'swipe', 'wifi', 'library', 'cctv'
     description = db.Column(db.Text, nullable=True)
+    # Idempotency key of events pushed through the live ingestion endpoint. Events
+    # delivered more than once by the event stream share a key and are written once.
+    ingest_key = db.Column(db.String(128), nullable=True)
+    # Time the event was written or last changed (e.g. moved by an entity merge), for
+    # delta sync and timeline ETags. Unlike `timestamp`, this is when the server learned of it.
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # --- Foreign Keys ---
     entity_id = db.Column(db.Integer, db.ForeignKey('entities.id'), nullable=False)
@@ -72,6 +105,51 @@ class Event(db.Model):
     def __repr__(self):
         return f'<Event {self.source_type} at {self.timestamp} for Entity ID {self.entity_id}>'
 
+def advance_last_seen(connection, rows):
+    """
+    Moves `Entity.last_seen_at` forward for each {'b_entity_id', 'b_seen_at'} row.
+
+    The update only ever advances the value, so it is safe to apply with
+    out-of-order or replayed events, and it accepts many rows in one executemany.
+    """
+    if not rows:
+        return
+    stmt = Entity.__table__.update().where(
+        Entity.id == bindparam('b_entity_id'),
+        or_(Entity.last_seen_at.is_(None), Entity.last_seen_at < bindparam('b_seen_at')),
+    ).values(last_seen_at=bindparam('b_seen_at'), updated_at=Entity.updated_at)  # not a change to sync
+    connection.execute(stmt, rows)
+
+def conflict_insert(connection, model):
+    """
+    Returns an INSERT for `model` supporting ON CONFLICT clauses
+    (on_conflict_do_nothing / on_conflict_do_update) on PostgreSQL and SQLite.
+    """
+    dialects = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+    name = connection.dialect.name
+    if name not in dialects:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on {name}.")
+    return dialects[name](model)
+
+@event.listens_for(Event, 'after_insert')
+def _event_after_insert(mapper, connection, target):
+    # Keep last_seen_at current for events written through the ORM.
+    # Bulk writers call advance_last_seen() themselves.
+    advance_last_seen(connection, [{'b_entity_id': target.entity_id, 'b_seen_at': target.timestamp}])
+
+# Serves keyset-paginated timeline reads (WHERE entity_id = ? ORDER BY timestamp DESC, id DESC)
+# with a single index range scan instead of a sort over the entity's full history.
+db.Index('ix_events_entity_id_timestamp_id', Event.entity_id, Event.timestamp.desc(), Event.id.desc())
+# Backs the ON CONFLICT DO NOTHING de-duplication of live events. Bulk-loaded events have no key.
+# Includes timestamp because unique indexes on a partitioned table must contain the partition key.
+db.Index('ux_events_ingest_key', Event.ingest_key, Event.timestamp, unique=True)
+# Serves co-location lookups (WHERE location = ? AND timestamp BETWEEN ? AND ?). Including
+# entity_id lets PostgreSQL answer each time window with an index-only range scan.
+db.Index('ix_events_location_timestamp_entity_id', Event.location, Event.timestamp, Event.entity_id)
+# Serves timeline delta sync (WHERE entity_id = ? AND updated_at >= ?) and the per-entity
+# max(updated_at) behind timeline ETags, both without reading the entity's full history.
+db.Index('ix_events_entity_id_updated_at', Event.entity_id, Event.updated_at)
+
 class Alert(db.Model):
     """
     Represents a triggered alert for an entity, typically due to anomalous activity.
@@ -83,6 +161,8 @@ class Alert(db.Model):
     severity = db.Column(db.String(50), nullable=False) # e.g., 'low', 'medium', 'high', 'critical'
     message = db.Column(db.Text, nullable=False)
     is_acknowledged = db.Column(db.Boolean, default=False, nullable=False)
+    # Time the alert was raised or last changed (e.g. acknowledged), for delta sync.
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # --- Foreign Keys ---
     entity_id = db.Column(db.Integer, db.ForeignKey('entities.id'), nullable=False)
@@ -93,3 +173,132 @@ class Alert(db.Model):
 
     def __repr__(self):
         return f'<Alert {self.severity} at {self.timestamp} for Entity ID {self.entity_id}>'
+
+# Partial indexes over unacknowledged alerts only. They stay small however long the
+# alert log grows and serve the open-alert feed and the open-alert existence check
+# made by the inactivity scan.
+db.Index('ix_alerts_open_timestamp_id', Alert.timestamp.desc(), Alert.id.desc(),
+         postgresql_where=Alert.is_acknowledged == db.false(), sqlite_where=Alert.is_acknowledged == db.false())
+db.Index('ix_alerts_open_entity_id', Alert.entity_id,
+         postgresql_where=Alert.is_acknowledged == db.false(), sqlite_where=Alert.is_acknowledged == db.false())
+# Serves the per-entity alert feed (WHERE entity_id = ? ORDER BY timestamp DESC, id DESC).
+db.Index('ix_alerts_entity_id_timestamp_id', Alert.entity_id, Alert.timestamp.desc(), Alert.id.desc())
+
+class RuleState(db.Model):
+    """
+    Rolling per-entity state of an alert rule (see app/rules.py), e.g. the
+    entity's last sighting for the impossible travel rule. One small row per
+    rule and entity, updated as batches of events are evaluated.
+    """
+    __tablename__ = 'rule_state'
+
+    rule = db.Column(db.String(50), primary_key=True)
+    entity_id = db.Column(db.Integer, db.ForeignKey('entities.id'), primary_key=True)
+    state = db.Column(db.JSON, nullable=True)
+    # Event time of the last alert the rule raised for the entity, for the cooldown.
+    alerted_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RuleState {self.rule} for Entity ID {self.entity_id}>'
+
+class EntityAlias(db.Model):
+    """
+    An entity merged away by deduplication (see services/deduplication_service.py)
+    and the entity that absorbed it. Lets writers holding a merged ID, e.g.
+    live events resolved before the merge, write to the survivor instead, and
+    tells delta-sync clients which entities are gone.
+    """
+    __tablename__ = 'entity_aliases'
+
+    # Not a foreign key: the merged entity no longer exists.
+    merged_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    survivor_id = db.Column(db.Integer, db.ForeignKey('entities.id'), nullable=False, index=True)
+    merged_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<EntityAlias {self.merged_id} -> {self.survivor_id}>'
+
+class EntitySummary(db.Model):
+    """
+    Precomputed activity overview of one entity for the dashboard: its latest
+    event, event counts per source for today and for the last
+    ENTITY_SUMMARY_WINDOW_DAYS days, and its open alerts. Maintained
+    incrementally as events are written and alerts raised or acknowledged;
+    see services/summary_service.py.
+    """
+    __tablename__ = 'entity_summaries'
+
+    entity_id = db.Column(db.Integer, db.ForeignKey('entities.id'), primary_key=True)
+    last_event_at = db.Column(db.DateTime, nullable=True)
+    last_location = db.Column(db.String(255), nullable=True)
+    last_source_type = db.Column(db.String(50), nullable=True)
+    # Events per UTC day and source within the window, e.g. {'2024-03-04': {'swipe': 3}}.
+    daily_counts = db.Column(db.JSON, nullable=False, default=dict)
+    # Totals of daily_counts for `counted_on` and for the window ending on it, stored so the
+    # overview can be sorted by them. Rolled forward each day by tasks.roll_entity_summaries.
+    events_today = db.Column(db.Integer, nullable=False, default=0)
+    events_window = db.Column(db.Integer, nullable=False, default=0)
+    counted_on = db.Column(db.Date, nullable=True)
+    open_alerts = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<EntitySummary for Entity ID {self.entity_id}>'
+
+# One index per sort order of the summary endpoint, each ending in entity_id for its keyset
+# cursor, so a page of the overview is one index range scan in either direction.
+for _column in (EntitySummary.last_event_at, EntitySummary.events_today, EntitySummary.events_window,
+                EntitySummary.open_alerts):
+    db.Index(f'ix_entity_summaries_{_column.key}_entity_id', _column, EntitySummary.entity_id)
+
+class HourlyOccupancy(db.Model):
+    """
+    Pre-aggregated occupancy: distinct entities and events seen per location,
+    source and hour (UTC). Maintained incrementally as events are written; see
+    services/occupancy_service.py.
+    """
+    __tablename__ = 'occupancy_hourly'
+
+    location = db.Column(db.String(255), primary_key=True)
+    source_type = db.Column(db.String(50), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True, index=True) # Start of the hour
+    entity_count = db.Column(db.Integer, nullable=False, default=0)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<HourlyOccupancy {self.location} {self.source_type} {self.bucket}: {self.entity_count}>'
+
+class DailyOccupancy(db.Model):
+    """
+    Pre-aggregated occupancy: distinct entities and events seen per location,
+    source and day (UTC).
+    """
+    __tablename__ = 'occupancy_daily'
+
+    location = db.Column(db.String(255), primary_key=True)
+    source_type = db.Column(db.String(50), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True, index=True) # Midnight starting the day
+    entity_count = db.Column(db.Integer, nullable=False, default=0)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailyOccupancy {self.location} {self.source_type} {self.bucket}: {self.entity_count}>'
+
+class OccupancyPresence(db.Model):
+    """
+    Records which entities have already been counted in each occupancy bucket, so
+    distinct-entity counts can be maintained incrementally: an entity only adds
+    to a bucket's entity_count the first time it is seen there. Only recent
+    buckets need it; older rows are pruned (see prune_occupancy_presence).
+    """
+    __tablename__ = 'occupancy_presence'
+
+    granularity = db.Column(db.String(8), primary_key=True) # 'hour' or 'day'
+    location = db.Column(db.String(255), primary_key=True)
+    source_type = db.Column(db.String(50), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True, index=True) # Rebuilds and pruning select by bucket alone
+    entity_id = db.Column(db.Integer, primary_key=True)
+
+    def __repr__(self):
+        return f'<OccupancyPresence {self.granularity} {self.location} {self.bucket} Entity ID {self.entity_id}>'
@@ -0,0 +1,224 @@
+from abc import ABC, abstractmethod
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+# Columns of the event frames rules are evaluated on, and of the hits they return.
+EVENT_COLUMNS = ['entity_id', 'timestamp', 'location', 'source_type']
+HIT_COLUMNS = ['entity_id', 'timestamp', 'message']
+
+# Rule classes by name, filled by @register_rule. ALERT_RULES selects which ones run.
+RULE_TYPES = {}
+
+
+def register_rule(cls):
+    """
+    Class decorator adding a Rule subclass to the rules ALERT_RULES can enable.
+    """
+    RULE_TYPES[cls.name] = cls
+    return cls
+
+
+class Rule(ABC):
+    """
+    An anomaly rule evaluated against each batch of newly written events.
+
+    `evaluate` receives the batch as a DataFrame (EVENT_COLUMNS, sorted by
+    entity_id and timestamp, already restricted to `source_types`) and the
+    rule's saved state for the entities in it, and returns the hits as a
+    DataFrame of HIT_COLUMNS together with the new state of every entity whose
+    state changed. State is a small JSON-serializable dict per entity, bounded
+    by the rule rather than by the entity's history, so each event costs the
+    same whatever came before it.
+    """
+    name = None
+    severity = 'medium'
+
+    def __init__(self, config):
+        self.source_types = None
+
+    @abstractmethod
+    def evaluate(self, events, state):
+        """
+        Returns (hits, new_state) for a batch of events; see the class docstring.
+        """
+
+
+def _source_types(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _minutes(delta):
+    return (delta.dt.total_seconds() / 60).round(1).astype(str)
+
+
+# Timestamps are kept in rule state as integer microseconds since the epoch:
+# compact in JSON, and converted to and from whole columns at once.
+def _to_micros(timestamps):
+    return timestamps.astype('datetime64[us]').astype('int64')
+
+
+def _from_micros(values):
+    return pd.to_datetime(pd.Series(values, dtype='int64'), unit='us')
+
+
+@register_rule
+class ImpossibleTravelRule(Rule):
+    """
+    Flags an entity seen at two different locations closer together in time
+    than the minimum transit time between any two locations on campus.
+
+    State: the entity's latest sighting (timestamp and location).
+    """
+    name = 'impossible_travel'
+
+    def __init__(self, config):
+        self.source_types = _source_types(config['RULE_TRAVEL_SOURCE_TYPES'])
+        self.severity = config['RULE_TRAVEL_SEVERITY']
+        self.min_transit = timedelta(minutes=config['RULE_TRAVEL_MIN_MINUTES'])
+
+    def evaluate(self, events, state):
+        events = events.dropna(subset=['location'])
+        previous = pd.DataFrame({
+            'entity_id': pd.Series(list(state), dtype='int64'),
+            'timestamp': _from_micros([last['timestamp'] for last in state.values()]),
+            'location': pd.Series([last['location'] for last in state.values()], dtype=object),
+        })
+        sightings = pd.concat([previous, events[['entity_id', 'timestamp', 'location']]], ignore_index=True) \
+            .sort_values(['entity_id', 'timestamp'], kind='stable')
+
+        before = sightings.shift()
+        gap = sightings['timestamp'] - before['timestamp']
+        hit = sightings['entity_id'].eq(before['entity_id']) & before['location'].notna() \
+            & sightings['location'].ne(before['location']) & (gap < self.min_transit)
+        hits = sightings[hit]
+        hits = hits.assign(message=(
+            "Seen at '" + hits['location'] + "' " + _minutes(gap[hit]) + " minutes after '" + before.loc[hit, 'location']
+            + f"'; no two locations are less than {self.min_transit.total_seconds() / 60:g} minutes apart."
+        ))
+
+        latest = sightings.drop_duplicates('entity_id', keep='last')
+        new_state = {
+            entity_id: {'timestamp': timestamp, 'location': location}
+            for entity_id, timestamp, location in zip(latest['entity_id'].tolist(),
+                                                      _to_micros(latest['timestamp']).tolist(),
+                                                      latest['location'].tolist())
+        }
+        return hits[HIT_COLUMNS], new_state
+
+
+@register_rule
+class AfterHoursRule(Rule):
+    """
+    Flags access events outside opening hours, in the campus's local time.
+
+    Stateless: each event is judged on its own.
+    """
+    name = 'after_hours'
+
+    def __init__(self, config):
+        self.source_types = _source_types(config['RULE_AFTER_HOURS_SOURCE_TYPES'])
+        self.severity = config['RULE_AFTER_HOURS_SEVERITY']
+        self.start = config['RULE_AFTER_HOURS_START']
+        self.end = config['RULE_AFTER_HOURS_END']
+        self.timezone = config['RULE_AFTER_HOURS_TIMEZONE']
+
+    def evaluate(self, events, state):
+        local = events['timestamp'].dt.tz_localize('UTC').dt.tz_convert(self.timezone)
+        hour = local.dt.hour
+        if self.start > self.end:  # closed overnight, e.g. 22:00-06:00
+            closed = (hour >= self.start) | (hour < self.end)
+        else:
+            closed = (hour >= self.start) & (hour < self.end)
+        hits = events[closed]
+        hits = hits.assign(message=(
+            "Access at '" + hits['location'].fillna('unknown location') + "' at " + local[closed].dt.strftime('%H:%M')
+            + f" ({self.timezone}), outside opening hours; closed {self.start:02d}:00-{self.end:02d}:00."
+        ))
+        return hits[HIT_COLUMNS], {}
+
+
+@register_rule
+class FailedSwipesRule(Rule):
+    """
+    Flags an entity with `count` failed swipes within `window` minutes.
+
+    State: the timestamps of the entity's last `count` - 1 failed swipes.
+    """
+    name = 'failed_swipes'
+
+    def __init__(self, config):
+        self.source_types = _source_types(config['RULE_FAILED_SWIPE_SOURCE_TYPES'])
+        self.severity = config['RULE_FAILED_SWIPE_SEVERITY']
+        self.count = max(2, config['RULE_FAILED_SWIPE_COUNT'])
+        self.window = timedelta(minutes=config['RULE_FAILED_SWIPE_WINDOW_MINUTES'])
+
+    def evaluate(self, events, state):
+        previous = pd.DataFrame({
+            'entity_id': pd.Series([entity_id for entity_id, recent in state.items() for _ in recent['recent']],
+                                   dtype='int64'),
+            'timestamp': _from_micros([timestamp for recent in state.values() for timestamp in recent['recent']]),
+            'new': False,
+        })
+        failures = pd.concat([previous, events[['entity_id', 'timestamp']].assign(new=True)], ignore_index=True) \
+            .sort_values(['entity_id', 'timestamp'], kind='stable')
+
+        # The failure count - 1 places earlier for the same entity opens the window ending here.
+        earlier = failures.groupby('entity_id')['timestamp'].shift(self.count - 1)
+        hit = failures['new'] & (failures['timestamp'] - earlier <= self.window)
+        hits = failures[hit]
+        hits = hits.assign(message=(
+            f"{self.count} failed swipes within {self.window.total_seconds() / 60:g} minutes; last at "
+            + hits['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S') + " UTC."
+        ))
+
+        recent = failures.groupby('entity_id').tail(self.count - 1)
+        entity_ids = recent['entity_id'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, entity_ids[1:] != entity_ids[:-1]])
+        runs = np.split(_to_micros(recent['timestamp']).to_numpy(), starts[1:])
+        new_state = {entity_id: {'recent': run.tolist()} for entity_id, run in zip(entity_ids[starts].tolist(), runs)}
+        return hits[HIT_COLUMNS], new_state
+
+
+class RuleEngine:
+    """
+    Runs the enabled anomaly rules (ALERT_RULES) over batches of events.
+
+    Rules are built once per app from its configuration. The engine hands each
+    rule only the events of its source types, keeps the first hit per entity of
+    every rule in a batch, and leaves loading and saving state, and writing
+    alerts, to services/rule_service.py.
+    """
+    def __init__(self, app=None):
+        self.rules = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        unknown = [name for name in app.config['ALERT_RULES'] if name not in RULE_TYPES]
+        if unknown:
+            raise ValueError(f"Unknown alert rules in ALERT_RULES: {', '.join(unknown)}. "
+                             f"Available: {', '.join(sorted(RULE_TYPES))}.")
+        self.rules = [RULE_TYPES[name](app.config) for name in app.config['ALERT_RULES']]
+        app.extensions['rule_engine'] = self
+
+    def batches(self, events):
+        """
+        Yields (rule, events) for each enabled rule with events to evaluate.
+        """
+        events = events[EVENT_COLUMNS].sort_values(['entity_id', 'timestamp'], kind='stable')
+        for rule in self.rules:
+            selected = events if rule.source_types is None else events[events['source_type'].isin(rule.source_types)]
+            if not selected.empty:
+                yield rule, selected
+
+    @staticmethod
+    def first_hits(hits):
+        """
+        Keeps the earliest hit of each entity.
+        """
+        return hits.sort_values(['entity_id', 'timestamp'], kind='stable').drop_duplicates('entity_id')
+
+
+rule_engine = RuleEngine()
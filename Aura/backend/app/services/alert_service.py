@@ -0,0 +1,172 @@
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import event, false, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from ..broadcast import broadcaster
+from ..cache import cache
+from ..database import primary_reads
+from ..models import db, Alert, Entity
+from .pagination import keyset_paginate
+from .summary_service import adjust_open_alerts
+
+def get_alert_feed(severity=None, is_acknowledged: bool = None, entity_id: int = None,
+                   since: datetime = None, until: datetime = None, limit: int = 100, cursor: str = None,
+                   changed_since: datetime = None, columns=None):
+    """
+    Retrieves one page of alerts, newest first, matching the given filters.
+
+    `severity` may be a single value or a list of accepted values. Time filters
+    form the half-open window [since, until). Pages are addressed with a keyset
+    cursor on (timestamp, id); unacknowledged-only feeds are served by the partial
+    index on open alerts. The related entity is eager loaded to avoid N+1
+    queries when the entity name is serialized. With `changed_since`, only
+    alerts raised or changed (e.g. acknowledged) at or after that time are returned.
+
+    When `columns` is given (it must include `timestamp` and `id`), only those
+    columns are selected, joined to the entity, and the page holds plain row tuples.
+    """
+    if columns:
+        query = db.session.query(*columns).select_from(Alert).join(Entity, Alert.entity_id == Entity.id)
+    else:
+        query = Alert.query.options(joinedload(Alert.entity))
+    if severity:
+        query = query.filter(Alert.severity.in_([severity] if isinstance(severity, str) else severity))
+    if is_acknowledged is not None:
+        query = query.filter(Alert.is_acknowledged == is_acknowledged)
+    if entity_id is not None:
+        query = query.filter(Alert.entity_id == entity_id)
+    if since is not None:
+        query = query.filter(Alert.timestamp >= since)
+    if until is not None:
+        query = query.filter(Alert.timestamp < until)
+    if changed_since is not None:
+        query = query.filter(Alert.updated_at >= changed_since)
+    return keyset_paginate(query, Alert.timestamp, Alert.id, cursor=cursor, limit=limit)
+
+
+def acknowledge_alerts(alert_ids, acknowledged: bool = True):
+    """
+    Sets `is_acknowledged` on every alert in `alert_ids` with a single UPDATE,
+    and moves the open-alert counts of the entity summaries to match.
+
+    Returns the number of alerts whose state changed.
+    """
+    changed = db.session.execute(
+        update(Alert)
+        .where(Alert.id.in_(alert_ids), Alert.is_acknowledged != acknowledged)
+        .values(is_acknowledged=acknowledged)
+        .returning(Alert.entity_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    adjust_open_alerts(db.session.connection(), changed, -1 if acknowledged else 1)
+    db.session.commit()
+    if changed:
+        cache.invalidate('alerts')
+    return len(changed)
+
+
+def get_alert_payloads(alert_ids=None, after_id: int = None, limit: int = None, open_only: bool = False):
+    """
+    Loads alerts as plain dicts shaped like AlertDto.alert, in ascending ID order.
+
+    Selects either the given `alert_ids` or the alerts created after `after_id`,
+    only unacknowledged ones with `open_only`. Only the serialized columns are
+    read, so no ORM objects are built.
+    """
+    stmt = select(Alert.id, Alert.timestamp, Alert.severity, Alert.message, Alert.is_acknowledged,
+                  Entity.name.label('entity_name')) \
+        .join(Entity, Alert.entity_id == Entity.id) \
+        .order_by(Alert.id)
+    if alert_ids is not None:
+        stmt = stmt.where(Alert.id.in_(alert_ids))
+    if after_id is not None:
+        stmt = stmt.where(Alert.id > after_id)
+    if open_only:
+        stmt = stmt.where(Alert.is_acknowledged == false())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return [
+        dict(row._mapping, timestamp=row.timestamp.isoformat())
+        for row in db.session.execute(stmt)
+    ]
+
+
+def publish_alerts(alert_ids):
+    """
+    Pushes newly created alerts to live stream subscribers.
+
+    Alert producers that commit their own transaction (the inactivity scan)
+    call this after committing the alerts they created. Producers writing
+    inside someone else's transaction use `stage_alerts` instead.
+    """
+    if alert_ids:
+        broadcaster.publish(get_alert_payloads(alert_ids=alert_ids))
+
+
+def stage_alerts(session, alert_ids):
+    """
+    Queues alerts created in `session` to be published, and the alert cache
+    invalidated, when the session commits; rolled-back alerts are never
+    announced. Payloads are loaded now, while the transaction that wrote the
+    alerts can read them.
+    """
+    if alert_ids:
+        session.info.setdefault('new_alerts', []).extend(get_alert_payloads(alert_ids=alert_ids))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_staged_alerts(session):
+    staged = session.info.pop('new_alerts', None)
+    if staged:
+        cache.invalidate('alerts')
+        broadcaster.publish(staged)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_staged_alerts(session):
+    session.info.pop('new_alerts', None)
+
+
+def stream_alerts(last_id: int = None, heartbeat: float = 15.0, max_seconds: float = 300.0, replay_limit: int = 1000):
+    """
+    Yields alerts as they are created, for a Server-Sent Events response.
+
+    When `last_id` is given, the unacknowledged alerts created after it are
+    replayed first, `replay_limit` per query until the replay has caught up,
+    so a reconnecting client misses nothing without reloading the feed (alerts
+    acknowledged meanwhile need no announcing). The subscription is opened
+    before the replay and IDs at or below the last one sent are skipped, so
+    alerts created in between are neither lost nor duplicated. Yields None
+    every `heartbeat` seconds of silence, and stops after `max_seconds` so
+    clients reconnect and workers are recycled.
+    """
+    subscription = broadcaster.subscribe()
+    try:
+        while last_id is not None:
+            # From the primary: an alert committed and published before the subscription
+            # opened may not have reached a replica yet, and would then never be sent.
+            with primary_reads():
+                replay = get_alert_payloads(after_id=last_id, limit=replay_limit, open_only=True)
+            # Release the pooled connection; the rest of the stream only waits on pub/sub.
+            db.session.remove()
+            for alert in replay:
+                last_id = alert['id']
+                yield alert
+            if len(replay) < replay_limit:
+                break
+
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            message = subscription.get(timeout=heartbeat)
+            if message is None:
+                yield None
+                continue
+            for alert in json.loads(message):
+                if last_id is None or alert['id'] > last_id:
+                    last_id = alert['id']
+                    yield alert
+    finally:
+        subscription.close()
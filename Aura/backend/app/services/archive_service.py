@@ -0,0 +1,129 @@
+import logging
+import time
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+from flask import current_app
+from sqlalchemy import delete, select
+
+from ..event_archive import ARCHIVE_SCHEMA, event_archive
+from ..models import db, Event
+from .partition_service import drop_partition, lock_partition, next_month, partition_name, partitions_before
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = [getattr(Event, name) for name in ARCHIVE_SCHEMA.names]
+
+
+def archive_events(before: datetime = None, batch_size: int = None, progress=None):
+    """
+    Moves events older than `before` from the events table into the Parquet archive.
+
+    `before` defaults to midnight UTC EVENT_RETENTION_DAYS ago. On a
+    partitioned events table, monthly partitions wholly before it are archived
+    and dropped first (see `archive_expired_partitions`). Of the remaining
+    events, the oldest `batch_size` are removed with DELETE ... RETURNING,
+    written to the archive and then committed, one batch at a time, so the job
+    can be stopped and re-run. Occupancy rollups are left alone: they already count the moved
+    events and keep doing so.
+
+    :param progress: Optional callable invoked with the number of events moved so far.
+    :returns: A dict with the number of events archived, partitions written and
+              partitions compacted.
+    """
+    before = before or _retention_cutoff()
+    batch_size = batch_size or current_app.config['EVENT_ARCHIVE_BATCH_SIZE']
+    started = time.perf_counter()
+
+    # Raise the horizon first, so reads reaching before it consult the archive by the
+    # time the first batch leaves the events table.
+    event_archive.advance_horizon(before)
+
+    archived, partitions = _archive_partitions(partitions_before(before), batch_size, progress)
+    while True:
+        oldest = select(Event.id).where(Event.timestamp < before) \
+            .order_by(Event.timestamp, Event.id).limit(batch_size)
+        rows = db.session.execute(
+            # The timestamp bound lets PostgreSQL prune the delete to the partitions involved.
+            delete(Event).where(Event.id.in_(oldest.scalar_subquery()), Event.timestamp < before)
+            .returning(*ARCHIVE_COLUMNS)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not rows:
+            break
+        table = pa.table(dict(zip(ARCHIVE_SCHEMA.names, zip(*rows))), schema=ARCHIVE_SCHEMA)
+        # Written before the commit: a failure here rolls the delete back and loses nothing.
+        partitions |= event_archive.write(table)
+        db.session.commit()
+        archived += len(rows)
+        if progress:
+            progress(archived)
+
+    compacted = sum(event_archive.compact(directory) for directory in sorted(partitions))
+    log.info(f"Archived {archived} events before {before:%Y-%m-%d} into {len(partitions)} partitions "
+             f"({compacted} compacted) in {time.perf_counter() - started:.1f}s.")
+    return {'archived': archived, 'partitions': len(partitions), 'compacted': compacted,
+            'before': before.isoformat()}
+
+
+def archive_expired_partitions(before: datetime = None, batch_size: int = None):
+    """
+    Archives and drops the monthly event partitions lying wholly before `before`
+    (default: midnight UTC EVENT_RETENTION_DAYS ago). PostgreSQL only; a no-op
+    when the events table is not partitioned.
+
+    Each partition is locked against writes, read in `batch_size` chunks,
+    written to the archive and then detached and dropped, all in one
+    transaction, so nothing is deleted row by row, nothing is left for VACUUM
+    and no event written meanwhile (e.g. by a late backfill) is dropped
+    unarchived; such writes wait for the partition to be gone and then land in
+    the default partition. Events of the cutoff's own month stay
+    until `archive_events` moves them or their whole month expires.
+
+    :returns: A dict with the number of events archived, event partitions
+              dropped and archive partitions compacted.
+    """
+    before = before or _retention_cutoff()
+    batch_size = batch_size or current_app.config['EVENT_ARCHIVE_BATCH_SIZE']
+    months = partitions_before(before)
+    db.session.rollback()
+    if not months:
+        return {'archived': 0, 'dropped': 0, 'compacted': 0, 'before': before.isoformat()}
+
+    event_archive.advance_horizon(before)
+    archived, partitions = _archive_partitions(months, batch_size)
+    compacted = sum(event_archive.compact(directory) for directory in sorted(partitions))
+    log.info(f"Archived {archived} events from {len(months)} expired event partitions.")
+    return {'archived': archived, 'dropped': len(months), 'compacted': compacted, 'before': before.isoformat()}
+
+
+def _archive_partitions(months, batch_size, progress=None):
+    """
+    Moves the monthly event partitions of `months` into the archive and drops them.
+    Returns (events archived, archive partitions written).
+    """
+    archived, partitions = 0, set()
+    for month in months:
+        lock_partition(month)
+        rows = db.session.execute(
+            select(*ARCHIVE_COLUMNS).where(Event.timestamp >= month, Event.timestamp < next_month(month))
+            .execution_options(yield_per=batch_size)
+        )
+        for batch in rows.partitions():
+            table = pa.table(dict(zip(ARCHIVE_SCHEMA.names, zip(*batch))), schema=ARCHIVE_SCHEMA)
+            partitions |= event_archive.write(table)
+            archived += len(batch)
+            if progress:
+                progress(archived)
+        # Written before the drop commits: a failure in between leaves the events in both
+        # tiers, which reads and compaction de-duplicate, and the next run archives them again.
+        # The lock taken before reading is held until then, so the files hold every row dropped.
+        drop_partition(month)
+        db.session.commit()
+        log.info(f"Archived and dropped event partition {partition_name(month)}.")
+    return archived, partitions
+
+
+def _retention_cutoff():
+    return (datetime.utcnow() - timedelta(days=current_app.config['EVENT_RETENTION_DAYS'])) \
+        .replace(hour=0, minute=0, second=0, microsecond=0)
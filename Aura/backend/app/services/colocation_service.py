@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, or_
+
+from ..models import db, Entity, Event
+
+# Time windows looked up per query. Each window becomes one range condition on the
+# (location, timestamp, entity_id) index; chunking keeps statements a reasonable size.
+WINDOWS_PER_QUERY = 500
+
+
+def find_colocated_entities(entity_id: int, since: datetime, until: datetime, window: timedelta, limit: int = 50):
+    """
+    Finds the entities seen at the same location as `entity_id` within `window` of its events.
+
+    Only the subject's events in [since, until) are considered; a contact's event
+    may fall up to `window` outside that range. The lookup avoids a self-join of
+    the events table:
+
+    1. The subject's events are read from the (entity_id, timestamp) index and
+       turned into [timestamp - window, timestamp + window] intervals per
+       location. A sweep over the sorted intervals merges overlapping ones, so a
+       long stay produces one window rather than one per event.
+    2. The events of other entities inside each merged window are fetched with
+       range scans of the (location, timestamp, entity_id) index.
+    3. Each fetched event is matched to the nearest subject event at the same
+       location with a sort-merge (pandas.merge_asof), giving its time gap.
+
+    Work grows with the number of events near the subject, not with the size of
+    the table.
+
+    Contacts are ranked by encounters (their events within the window of one of
+    the subject's), then by the closest gap.
+
+    :returns: (contacts, truncated), where contacts is a list of dicts with
+              entity_id, name, entity_type, encounters, locations,
+              first_contact, last_contact and closest_seconds, and truncated
+              is True if more than `limit` contacts were found.
+    """
+    visits = pd.DataFrame(
+        db.session.query(Event.location, Event.timestamp)
+        .filter(Event.entity_id == entity_id, Event.timestamp >= since, Event.timestamp < until,
+                Event.location.isnot(None))
+        .order_by(Event.location, Event.timestamp)
+        .all(),
+        columns=['location', 'timestamp'],
+    )
+    if visits.empty:
+        return [], False
+
+    nearby = _events_near(entity_id, _merge_windows(visits, window))
+    if nearby.empty:
+        return [], False
+
+    # Pair every nearby event with the subject's closest event at the same location.
+    matched = pd.merge_asof(
+        nearby.sort_values('timestamp'),
+        visits.assign(visit=visits['timestamp']).sort_values('timestamp'),
+        on='timestamp', by='location', direction='nearest', tolerance=pd.Timedelta(window),
+    ).dropna(subset=['visit'])
+    matched['gap'] = (matched['timestamp'] - matched['visit']).abs().dt.total_seconds()
+
+    contacts = matched.groupby('entity_id').agg(
+        encounters=('timestamp', 'size'),
+        first_contact=('timestamp', 'min'),
+        last_contact=('timestamp', 'max'),
+        closest_seconds=('gap', 'min'),
+    ).reset_index().sort_values(['encounters', 'closest_seconds', 'entity_id'], ascending=[False, True, True])
+
+    truncated = len(contacts) > limit
+    contacts = contacts.head(limit)
+    shared = matched.loc[matched['entity_id'].isin(contacts['entity_id']), ['entity_id', 'location']] \
+        .drop_duplicates().sort_values('location').groupby('entity_id')['location'].agg(list)
+    entities = {
+        row.id: row for row in db.session.query(Entity.id, Entity.name, Entity.entity_type)
+        .filter(Entity.id.in_(contacts['entity_id'].tolist()))
+    }
+    return [
+        {
+            'entity_id': int(contact.entity_id),
+            'name': entities[contact.entity_id].name,
+            'entity_type': entities[contact.entity_id].entity_type,
+            'encounters': int(contact.encounters),
+            'locations': shared[contact.entity_id],
+            'first_contact': contact.first_contact.to_pydatetime(),
+            'last_contact': contact.last_contact.to_pydatetime(),
+            'closest_seconds': round(float(contact.closest_seconds), 3),
+        }
+        for contact in contacts.itertuples(index=False)
+        if contact.entity_id in entities
+    ], truncated
+
+
+def _merge_windows(visits, window):
+    """
+    Sweeps the subject's events, sorted by location and time, into disjoint time windows.
+
+    Because the events are sorted, each interval's end is never before the previous
+    one's, so a new window starts exactly where an interval begins after the
+    previous interval ends or at a new location, and ends where the next one starts.
+    """
+    locations = visits['location'].to_numpy()
+    start = (visits['timestamp'] - window).to_numpy()
+    end = (visits['timestamp'] + window).to_numpy()
+    opens = np.ones(len(visits), dtype=bool)
+    opens[1:] = (locations[1:] != locations[:-1]) | (start[1:] > end[:-1])
+    first = np.flatnonzero(opens)
+    last = np.append(first[1:] - 1, len(visits) - 1)
+    return pd.DataFrame({'location': locations[first], 'start': start[first], 'end': end[last]})
+
+
+def _events_near(entity_id, windows):
+    """
+    Fetches (location, timestamp, entity_id) of other entities' events inside the windows.
+    """
+    rows = []
+    for offset in range(0, len(windows), WINDOWS_PER_QUERY):
+        chunk = windows.iloc[offset:offset + WINDOWS_PER_QUERY]
+        rows.extend(
+            db.session.query(Event.location, Event.timestamp, Event.entity_id)
+            .filter(Event.entity_id != entity_id, or_(*[
+                and_(Event.location == location, Event.timestamp >= start.to_pydatetime(),
+                     Event.timestamp <= end.to_pydatetime())
+                for location, start, end in chunk.itertuples(index=False)
+            ]))
+            .all()
+        )
+    return pd.DataFrame(rows, columns=['location', 'timestamp', 'entity_id'])
@@ -0,0 +1,421 @@
+import logging
+import re
+import time
+import unicodedata
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import case, delete, func, insert, select, update
+
+from ..cache import cache
+from ..event_archive import event_archive
+from ..models import db, Entity, EntityAlias, EntitySummary, Identifier, Event, Alert, RuleState
+from .occupancy_service import rebuild_occupancy_days
+from .resolution_service import stage_identifiers
+from .summary_service import rebuild_summaries
+
+log = logging.getLogger(__name__)
+
+# Identifier types an entity holds at most one value of. Two entities with
+# different values of one of these are different people (or assets) and are
+# never merged, however similar their names.
+EXCLUSIVE_IDENTIFIER_TYPES = ['student_id', 'staff_id', 'card_id', 'asset_tag']
+
+_NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
+# Strings are compared as sets of character bigrams over this alphabet. Other
+# characters are ignored and strings are truncated to PROFILE_WIDTH bytes.
+ALPHABET = ' abcdefghijklmnopqrstuvwxyz0123456789'
+PROFILE_WIDTH = 48
+BIGRAMS = len(ALPHABET) ** 2
+
+# Symbol number (1-based, 0 for ignored bytes) of every byte value.
+_SYMBOLS = np.zeros(256, dtype=np.int32)
+_SYMBOLS[np.frombuffer(ALPHABET.encode(), dtype=np.uint8)] = np.arange(1, len(ALPHABET) + 1)
+# Number of set bits in every byte value.
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+# Strings turned into bigram sets, and candidate pairs scored, per vectorized step.
+PROFILE_CHUNK = 20000
+SCORE_CHUNK = 200000
+
+# Weights of name and email local-part similarity when both entities have an email.
+NAME_WEIGHT = 0.75
+EMAIL_WEIGHT = 0.25
+
+# Upper bound on the number of IDs sent in a single `IN (...)` lookup.
+LOOKUP_BATCH_SIZE = 5000
+
+# Clusters merged per transaction.
+MERGE_BATCH = 500
+
+
+class DeduplicationStats:
+    """
+    Counters for a single duplicate detection run.
+    """
+    def __init__(self):
+        self.entities = 0
+        self.blocks = 0
+        self.oversized_blocks = 0
+        self.candidate_pairs = 0
+        self.vetoed_pairs = 0
+        self.matched_pairs = 0
+        self.clusters = 0
+        self.merged = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def tick(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def summary(self):
+        return (f"{self.entities} entities in {self.blocks} blocks ({self.oversized_blocks} oversized skipped), "
+                f"{self.candidate_pairs} candidate pairs, {self.matched_pairs} matches ({self.vetoed_pairs} vetoed) "
+                f"in {self.clusters} clusters, {self.merged} entities merged "
+                f"({self.elapsed:.2f}s)")
+
+
+def find_duplicate_entities(threshold=None, max_block_size=None, stats=None):
+    """
+    Finds groups of entities that are likely the same person or asset.
+
+    Instead of comparing every pair of entities, each entity is given blocking
+    keys (its sorted name tokens, first initial plus last-name prefix, first-name
+    prefix plus last initial, and normalized email local part) and only entities
+    of the same type sharing a key are compared. Blocks larger than
+    `max_block_size` are skipped, so the number of comparisons grows linearly
+    with the number of entities.
+
+    Candidate pairs are scored in bulk with NumPy: names, and email local parts
+    when both entities have one, are compared by the Dice coefficient of their
+    character bigram sets, held as packed bit rows. Pairs scoring at least
+    `threshold` are joined into clusters, best first, except where the joined
+    cluster would hold two different values of an EXCLUSIVE_IDENTIFIER_TYPES
+    identifier.
+
+    :param threshold: Minimum pair score in [0, 1]. Defaults to DEDUP_MATCH_THRESHOLD.
+    :param max_block_size: Defaults to DEDUP_MAX_BLOCK_SIZE.
+    :param stats: Optional DeduplicationStats to fill in.
+    :returns: A list of clusters, each a sorted list of entity IDs whose first
+              ID is the surviving entity.
+    """
+    threshold = threshold if threshold is not None else current_app.config['DEDUP_MATCH_THRESHOLD']
+    max_block_size = max_block_size or current_app.config['DEDUP_MAX_BLOCK_SIZE']
+    stats = stats or DeduplicationStats()
+
+    entities = pd.DataFrame(
+        db.session.execute(select(Entity.id, Entity.name, Entity.entity_type, Entity.primary_email)).all(),
+        columns=['id', 'name', 'entity_type', 'email'],
+    )
+    stats.entities = len(entities)
+    if entities.empty:
+        return []
+    entities = _normalize(entities)
+
+    pairs = _candidate_pairs(_blocking_keys(entities), max_block_size, stats)
+    if pairs.empty:
+        return []
+
+    pairs['score'] = _score_pairs(entities, pairs, threshold)
+    matches = pairs[pairs['score'] >= threshold].sort_values(['score', 'a', 'b'], ascending=[False, True, True])
+    stats.matched_pairs = len(matches)
+
+    exclusive = _exclusive_identifiers(np.union1d(matches['a'], matches['b']).tolist())
+    clusters = _cluster(matches['a'].tolist(), matches['b'].tolist(), exclusive, stats)
+    stats.clusters = len(clusters)
+    stats.tick()
+    log.info(f"Duplicate detection: {stats.summary()}")
+    return clusters
+
+
+def _name_tokens(name):
+    folded = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode('ascii').lower()
+    return _NON_ALPHANUMERIC.sub(' ', folded).split()
+
+
+def _normalize(entities):
+    """
+    Adds ASCII-folded, lower-cased name tokens and email local part.
+    """
+    tokens = [_name_tokens(name) for name in entities['name']]
+    # Dots, dashes, underscores, +tags and the domain do not distinguish mailboxes
+    # of the same person (e.g. john.smith@ and johnsmith+lib@ on staff and student domains).
+    local = entities['email'].fillna('').str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii') \
+        .str.lower().str.split('@').str[0].str.split('+').str[0].str.replace(r'[._-]', '', regex=True)
+    return entities.assign(
+        # People and assets are never compared with each other.
+        kind=np.where(entities['entity_type'] == 'asset', 'asset', 'person'),
+        sorted_name=[' '.join(sorted(words)) for words in tokens],
+        first=[words[0] if words else '' for words in tokens],
+        last=[words[-1] if words else '' for words in tokens],
+        local=local,
+    )
+
+
+def _blocking_keys(entities):
+    """
+    Returns one (id, key) row per blocking key of each entity.
+    """
+    has_name = entities['sorted_name'] != ''
+    has_email = entities['local'] != ''
+    # Name prefixes rather than whole names, so a typo late in either name still shares a key.
+    keys = [
+        (has_name, 'n:' + entities['sorted_name']),
+        (has_name, 'l:' + entities['first'].str[:1] + ':' + entities['last'].str[:4]),
+        (has_name, 'f:' + entities['first'].str[:4] + ':' + entities['last'].str[:1]),
+        (has_email, 'e:' + entities['local']),
+    ]
+    return pd.concat(
+        [pd.DataFrame({'id': entities['id'][mask], 'key': entities['kind'][mask] + '|' + key[mask]})
+         for mask, key in keys],
+        ignore_index=True,
+    )
+
+
+def _candidate_pairs(keys, max_block_size, stats):
+    """
+    Pairs up the entities of every block, returning unique (a, b) rows with a < b.
+    """
+    sizes = keys['key'].map(keys['key'].value_counts())
+    stats.blocks = int(keys['key'].nunique())
+    stats.oversized_blocks = int(keys.loc[sizes > max_block_size, 'key'].nunique())
+    keys = keys[(sizes > 1) & (sizes <= max_block_size)]
+    if keys.empty:
+        return pd.DataFrame({'a': [], 'b': []}, dtype=np.int64)
+
+    width = int(keys['id'].max()) + 1
+    pairs = keys.merge(keys, on='key', suffixes=('_a', '_b'))
+    a, b = pairs['id_a'].to_numpy(np.int64), pairs['id_b'].to_numpy(np.int64)
+    # An entity pair sharing several keys is scored once.
+    codes = np.unique(a[a < b] * width + b[a < b])
+    stats.candidate_pairs = len(codes)
+    return pd.DataFrame({'a': codes // width, 'b': codes % width})
+
+
+def _bigram_sets(strings):
+    """
+    Returns the bigram set of each string as a row of packed bits, one bit per
+    possible bigram, together with the size of each set.
+    """
+    packed = np.zeros((len(strings), (BIGRAMS + 7) // 8), dtype=np.uint8)
+    for start in range(0, len(strings), PROFILE_CHUNK):
+        # Encoded here rather than by NumPy, which would fail on a non-ASCII character.
+        chunk = np.array([f' {value} '.encode('ascii', 'ignore') for value in strings[start:start + PROFILE_CHUNK]],
+                         dtype=f'S{PROFILE_WIDTH}')
+        symbols = _SYMBOLS[chunk.view(np.uint8).reshape(len(chunk), PROFILE_WIDTH)]
+        valid = (symbols[:, :-1] > 0) & (symbols[:, 1:] > 0)
+        codes = (symbols[:, :-1] - 1) * len(ALPHABET) + symbols[:, 1:] - 1
+        present = np.zeros((len(chunk), BIGRAMS), dtype=bool)
+        present[np.nonzero(valid)[0], codes[valid]] = True
+        packed[start:start + len(chunk)] = np.packbits(present, axis=1)
+    return packed, _POPCOUNT[packed].sum(axis=1, dtype=np.int32)
+
+
+def _dice(packed, sizes, a, b):
+    """
+    Dice coefficient of the bigram sets at rows `a` and `b` of `packed`, pair by pair.
+    """
+    scores = np.zeros(len(a))
+    for start in range(0, len(a), SCORE_CHUNK):
+        left, right = a[start:start + SCORE_CHUNK], b[start:start + SCORE_CHUNK]
+        common = _POPCOUNT[packed[left] & packed[right]].sum(axis=1, dtype=np.int32)
+        total = sizes[left] + sizes[right]
+        np.divide(2 * common, total, out=scores[start:start + SCORE_CHUNK], where=total > 0)
+    return scores
+
+
+def _score_pairs(entities, pairs, threshold):
+    """
+    Scores each candidate pair in [0, 1]: name similarity, blended with email
+    local-part similarity when both entities have an email. Pairs that cannot
+    reach `threshold` are not compared and score 0.
+    """
+    involved = pd.Index(np.union1d(pairs['a'], pairs['b']))
+    rows = entities.set_index('id').loc[involved]
+    a = involved.get_indexer(pairs['a'])
+    b = involved.get_indexer(pairs['b'])
+    local = rows['local'].to_numpy()
+    both_emails = (local[a] != '') & (local[b] != '')
+
+    # Dice is at most 2 * min(|A|, |B|) / (|A| + |B|), so bigram set sizes alone rule
+    # out pairs whose names are too different in length, even with identical emails.
+    name_sets, name_sizes = _bigram_sets(rows['sorted_name'].to_numpy())
+    needed = np.where(both_emails, (threshold - EMAIL_WEIGHT) / NAME_WEIGHT, threshold)
+    reachable = np.flatnonzero(
+        2 * np.minimum(name_sizes[a], name_sizes[b]) >= needed * (name_sizes[a] + name_sizes[b]))
+    a, b, both_emails = a[reachable], b[reachable], both_emails[reachable]
+
+    score = _dice(name_sets, name_sizes, a, b)
+    if both_emails.any():
+        local_sets, local_sizes = _bigram_sets(local)
+        email = _dice(local_sets, local_sizes, a[both_emails], b[both_emails])
+        score[both_emails] = NAME_WEIGHT * score[both_emails] + EMAIL_WEIGHT * email
+
+    scores = np.zeros(len(pairs))
+    scores[reachable] = score
+    return scores
+
+
+def _exclusive_identifiers(entity_ids):
+    """
+    Returns {entity_id: {identifier_type: value}} for the EXCLUSIVE_IDENTIFIER_TYPES of `entity_ids`.
+    """
+    found = {}
+    for start in range(0, len(entity_ids), LOOKUP_BATCH_SIZE):
+        rows = db.session.execute(
+            select(Identifier.entity_id, Identifier.identifier_type, Identifier.value)
+            .where(Identifier.entity_id.in_(entity_ids[start:start + LOOKUP_BATCH_SIZE]),
+                   Identifier.identifier_type.in_(EXCLUSIVE_IDENTIFIER_TYPES))
+        )
+        for entity_id, identifier_type, value in rows:
+            found.setdefault(entity_id, {})[identifier_type] = value
+    return found
+
+
+def _cluster(a, b, exclusive, stats):
+    """
+    Joins matched pairs, given best first, into clusters with a union-find.
+
+    Each cluster root carries the exclusive identifiers of its members; a pair
+    whose clusters hold different values of the same type is vetoed, so
+    transitive matches can never join, say, two different card holders.
+    """
+    parent = {}
+    held = {}
+
+    def root(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for left, right in zip(a, b):
+        left, right = root(left), root(right)
+        if left == right:
+            continue
+        left_ids = held.get(left, exclusive.get(left, {}))
+        right_ids = held.get(right, exclusive.get(right, {}))
+        if any(left_ids[key] != value for key, value in right_ids.items() if key in left_ids):
+            stats.vetoed_pairs += 1
+            continue
+        survivor, merged = min(left, right), max(left, right)
+        parent[merged] = survivor
+        held[survivor] = {**left_ids, **right_ids}
+
+    clusters = {}
+    for node in parent:
+        clusters.setdefault(root(node), []).append(node)
+    return sorted(sorted(members) for members in clusters.values() if len(members) > 1)
+
+
+def merge_entities(clusters, stats=None, progress=None):
+    """
+    Merges each cluster of entity IDs into its first (lowest) ID.
+
+    Identifiers, events and alerts of the other entities are moved to the
+    survivor with set-based updates, duplicate identifiers are dropped, the
+    survivor inherits the latest last_seen_at and, if it has none, a primary
+    email, the survivor's entity summary is recomputed, and the other
+    entities are deleted and recorded as aliases of the survivor
+    (EntityAlias), so events still carrying their IDs are written to the
+    survivor. Clusters are merged MERGE_BATCH at a time, one transaction each,
+    after which every process is told to reload its resolution index and the
+    merged IDs are recorded as aliases in the event archive, whose files keep
+    them. Afterwards the occupancy rollups of every day the merged entities had
+    events on are rebuilt, as their distinct-entity counts change.
+
+    :param progress: Optional callable invoked with the number of clusters merged so far.
+    :returns: Number of entities merged away.
+    """
+    stats = stats or DeduplicationStats()
+    days = set()
+    for start in range(0, len(clusters), MERGE_BATCH):
+        batch = clusters[start:start + MERGE_BATCH]
+        survivor_of = {member: cluster[0] for cluster in batch for member in cluster[1:]}
+        days.update(_event_days(list(survivor_of)))
+        _merge_batch(survivor_of, batch)
+        db.session.commit()
+        # Right away rather than after the last batch: until they reload, resolution indexes
+        # keep handing out the merged IDs. 'identifiers' makes every process reload its own.
+        cache.invalidate('entities', 'alerts', 'identifiers')
+        # Archived events are not moved; the archive reads them as the survivors' from now on.
+        event_archive.record_merges(survivor_of)
+        stats.merged += len(survivor_of)
+        if progress:
+            progress(start + len(batch))
+
+    if clusters:
+        rebuild_occupancy_days(sorted(days))
+    stats.tick()
+    log.info(f"Merged {stats.merged} duplicate entities into {len(clusters)} survivors.")
+    return stats.merged
+
+
+def _event_days(entity_ids):
+    day = func.date(Event.timestamp)
+    return {
+        pd.Timestamp(value).to_pydatetime()
+        for value in db.session.execute(select(day).where(Event.entity_id.in_(entity_ids)).distinct()).scalars()
+    }
+
+
+def _merge_batch(survivor_of, clusters):
+    merged = list(survivor_of)
+    survivors = sorted({cluster[0] for cluster in clusters})
+
+    # Survivors inherit the most recent activity and a primary email if they lack one.
+    members = pd.DataFrame(
+        db.session.execute(
+            select(Entity.id, Entity.primary_email, Entity.last_seen_at)
+            .where(Entity.id.in_(merged + survivors))
+        ).all(),
+        columns=['id', 'email', 'last_seen_at'],
+    ).assign(survivor=lambda df: df['id'].map(survivor_of).fillna(df['id']).astype(int))
+    by_survivor = members.sort_values('id').groupby('survivor').agg(
+        email=('email', 'first'), last_seen_at=('last_seen_at', 'max'))
+    db.session.execute(update(Entity).where(Entity.id.in_(merged)).values(primary_email=None))
+
+    db.session.execute(update(Identifier).where(Identifier.entity_id.in_(merged)).values(entity_id=case(survivor_of, value=Identifier.entity_id)))
+    db.session.execute(update(Event).where(Event.entity_id.in_(merged))
+                       .values(entity_id=case(survivor_of, value=Event.entity_id)))
+    db.session.execute(update(Alert).where(Alert.entity_id.in_(merged))
+                       .values(entity_id=case(survivor_of, value=Alert.entity_id)))
+    # Rolling rule state is per entity and cannot be combined; the survivor keeps its own.
+    db.session.execute(delete(RuleState).where(RuleState.entity_id.in_(merged)))
+    db.session.execute(delete(EntitySummary).where(EntitySummary.entity_id.in_(merged)))
+    # Aliases of the merged entities move on to the survivors, so every alias is a single hop.
+    db.session.execute(update(EntityAlias).where(EntityAlias.survivor_id.in_(merged))
+                       .values(survivor_id=case(survivor_of, value=EntityAlias.survivor_id)))
+    db.session.execute(delete(Entity).where(Entity.id.in_(merged)))
+    now = datetime.utcnow()
+    db.session.execute(insert(EntityAlias), [
+        {'merged_id': merged_id, 'survivor_id': survivor_id, 'merged_at': now}
+        for merged_id, survivor_id in survivor_of.items()
+    ])
+    db.session.execute(update(Entity), [
+        {'id': int(survivor), 'primary_email': None if pd.isna(row.email) else row.email,
+         'last_seen_at': None if pd.isna(row.last_seen_at) else row.last_seen_at.to_pydatetime()}
+        for survivor, row in by_survivor.iterrows()
+    ])
+    # The merged entities' summaries are gone; the survivors' now cover their events and alerts.
+    rebuild_summaries(survivors)
+
+    # The same identifier may now appear twice on a survivor; keep the oldest row.
+    identifiers = pd.DataFrame(
+        db.session.execute(
+            select(Identifier.id, Identifier.identifier_type, Identifier.value, Identifier.entity_id)
+            .where(Identifier.entity_id.in_(survivors))
+        ).all(),
+        columns=['id', 'identifier_type', 'value', 'entity_id'],
+    ).sort_values('id')
+    repeated = identifiers.duplicated(subset=['identifier_type', 'value', 'entity_id'])
+    if repeated.any():
+        db.session.execute(delete(Identifier).where(Identifier.id.in_(identifiers.loc[repeated, 'id'].tolist())))
+
+    # Re-publish the survivors' identifiers so this process's resolution index maps them to the survivors.
+    kept = identifiers.loc[~repeated, ['identifier_type', 'value', 'entity_id']]
+    stage_identifiers(db.session, list(kept.itertuples(index=False, name=None)))
@@ -0,0 +1,115 @@
+import csv
+import heapq
+import io
+import json
+from datetime import datetime
+from operator import itemgetter
+
+from flask import current_app, stream_with_context
+from sqlalchemy import select
+
+from ..event_archive import event_archive
+from ..models import db, Alert, Entity, Event
+
+# Content type for each supported export format
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Rows fetched from the database cursor per round trip
+FETCH_SIZE = 2000
+
+# Rows encoded into each chunk written to the response
+WRITE_BATCH = 500
+
+TIMELINE_COLUMNS = ['id', 'timestamp', 'location', 'source_type', 'description']
+ALERT_COLUMNS = ['id', 'timestamp', 'severity', 'message', 'is_acknowledged', 'entity_id', 'entity_name']
+
+
+def iter_timeline_rows(entity_id: int, since: datetime = None, until: datetime = None):
+    """
+    Streams an entity's full event history, newest first, as plain row tuples.
+
+    Rows are read through a server-side cursor FETCH_SIZE at a time, so memory
+    use does not depend on the length of the history. Archived events are
+    merged in, one archived month at a time.
+    """
+    stmt = select(Event.id, Event.timestamp, Event.location, Event.source_type, Event.description) \
+        .where(Event.entity_id == entity_id)
+    if since is not None:
+        stmt = stmt.where(Event.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(Event.timestamp < until)
+    stmt = stmt.order_by(Event.timestamp.desc(), Event.id.desc())
+    if not event_archive.covers(since):
+        return _stream(stmt)
+
+    archived = (tuple(event[name] for name in TIMELINE_COLUMNS)
+                for event in event_archive.iter_events([entity_id], since, until))
+    # Rows are keyed by (timestamp, id), the first two TIMELINE_COLUMNS.
+    return heapq.merge(_stream(stmt), archived, key=itemgetter(1, 0), reverse=True)
+
+
+def iter_alert_rows():
+    """
+    Streams the whole alert log, newest first, as plain row tuples.
+    """
+    stmt = select(Alert.id, Alert.timestamp, Alert.severity, Alert.message, Alert.is_acknowledged,
+                  Alert.entity_id, Entity.name) \
+        .join(Entity, Alert.entity_id == Entity.id) \
+        .order_by(Alert.timestamp.desc(), Alert.id.desc())
+    return _stream(stmt)
+
+
+def _stream(stmt):
+    result = db.session.execute(stmt.execution_options(yield_per=FETCH_SIZE))
+    try:
+        yield from result
+    finally:
+        result.close()
+
+
+def encode_rows(rows, columns, fmt):
+    """
+    Encodes an iterable of row tuples as NDJSON or CSV text.
+
+    Yields one string per WRITE_BATCH rows so the response can be flushed to the
+    client incrementally. CSV output starts with a header line.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+
+    count = 0
+    for row in rows:
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        if writer:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(columns, values))))
+            buffer.write('\n')
+        count += 1
+        if count % WRITE_BATCH == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(rows, columns, fmt, filename):
+    """
+    Builds a streaming HTTP response that writes `rows` as they are read.
+    """
+    response = current_app.response_class(
+        stream_with_context(encode_rows(rows, columns, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    # Ask reverse proxies (nginx) not to buffer the body, keeping time-to-first-byte low.
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
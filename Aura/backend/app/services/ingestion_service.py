@@ -0,0 +1,457 @@
+import io
+import logging
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+from flask import current_app
+from sqlalchemy import insert, select
+
+from ..cache import cache
+from ..event_stream import event_stream
+from ..models import db, Entity, EntityAlias, Identifier, Event, advance_last_seen, conflict_insert
+from .occupancy_service import record_occupancy
+from .resolution_service import resolve_identifiers, stage_identifiers
+from . import rule_service
+from .summary_service import record_activity
+
+log = logging.getLogger(__name__)
+
+# All source files use the same timestamp layout. Parsing with an explicit
+# format is an order of magnitude faster than letting pandas infer it.
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Upper bound on the number of values sent in a single `IN (...)` lookup.
+# Keeps statements well below SQLite's bound-parameter limit and avoids huge
+# query plans on PostgreSQL.
+LOOKUP_BATCH_SIZE = 5000
+
+EVENT_COLUMNS = ['timestamp', 'location', 'source_type', 'description', 'entity_id']
+
+
+class EntitySource:
+    """
+    Describes a CSV feed whose rows are people or assets.
+
+    `identifiers` is a list of (column, identifier_type) pairs. The first pair is
+    the natural key of the feed and is used to de-duplicate rows within a chunk.
+    """
+    def __init__(self, entity_type, identifiers, name_column='name', email_column='email'):
+        self.entity_type = entity_type
+        self.identifiers = identifiers
+        self.name_column = name_column
+        self.email_column = email_column
+
+    @property
+    def key_column(self):
+        return self.identifiers[0][0]
+
+
+class EventSource:
+    """
+    Describes a CSV feed whose rows are activity events.
+
+    Each row is resolved to an entity through `identifier` (a (column, identifier_type)
+    pair). `extra_identifiers` lists columns that should be attached to the resolved
+    entity as new identifiers (e.g. a Wi-Fi device hash).
+    """
+    def __init__(self, source_type, identifier, timestamp_column, location_column,
+                 describe, extra_identifiers=()):
+        self.source_type = source_type
+        self.identifier = identifier
+        self.timestamp_column = timestamp_column
+        self.location_column = location_column
+        self.describe = describe
+        self.extra_identifiers = extra_identifiers
+
+
+SOURCES = {
+    'students': EntitySource(
+        'student', [('student_id', 'student_id'), ('email', 'email'), ('card_id', 'card_id')]
+    ),
+    'staff': EntitySource(
+        'staff', [('staff_id', 'staff_id'), ('email', 'email'), ('card_id', 'card_id')]
+    ),
+    'assets': EntitySource(
+        'asset', [('asset_tag', 'asset_tag'), ('device_hash', 'device_hash')], email_column=None
+    ),
+    'swipes': EventSource(
+        'swipe', ('card_id', 'card_id'), 'timestamp', 'location_name',
+        lambda df: 'Card swipe at ' + df['location_name'] + '.',
+    ),
+    'wifi': EventSource(
+        'wifi', ('user_email', 'email'), 'timestamp', 'ap_location',
+        lambda df: 'Connected to Wi-Fi AP ' + df['ap_location'] + '.',
+        extra_identifiers=[('device_hash', 'device_hash')],
+    ),
+    'library': EventSource(
+        'library', ('student_id', 'student_id'), 'checkout_timestamp', 'location',
+        lambda df: "Checked out book: '" + df['book_title'] + "'.",
+    ),
+}
+
+
+class IngestStats:
+    """
+    Running counters for a single ingestion run.
+    """
+    def __init__(self, source):
+        self.source = source
+        self.rows_read = 0
+        self.rows_written = 0
+        self.rows_skipped = 0
+        self.chunks = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def tick(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def summary(self):
+        return (f"{self.source}: read {self.rows_read} rows in {self.chunks} chunks, "
+                f"wrote {self.rows_written}, skipped {self.rows_skipped} "
+                f"({self.elapsed:.2f}s, {self.rows_per_second:,.0f} rows/s)")
+
+
+def ingest_file(source, path_or_buffer, chunk_size=None, progress=None, evaluate_rules=True):
+    """
+    Streams a CSV source into the database in fixed-size chunks.
+
+    Every chunk is resolved against the `identifiers` table with one batched lookup
+    and a pandas join, written with bulk inserts (or COPY on PostgreSQL) and
+    committed before the next chunk is read, so memory use is bounded by
+    `chunk_size` regardless of the size of the file.
+
+    :param source: One of the keys of `SOURCES` (e.g. 'students', 'swipes').
+    :param path_or_buffer: A file path or any file-like object accepted by `pd.read_csv`.
+    :param chunk_size: Rows per chunk. Defaults to the `INGEST_CHUNK_SIZE` setting.
+    :param progress: Optional callable invoked with the `IngestStats` after each chunk.
+    :param evaluate_rules: Whether the alert rules check the events written; turn
+                           off for backfills of history nobody should be alerted about.
+    """
+    spec = SOURCES[source]
+    chunk_size = chunk_size or current_app.config['INGEST_CHUNK_SIZE']
+    stats = IngestStats(source)
+
+    reader = pd.read_csv(path_or_buffer, chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[''])
+    with reader:
+        for chunk in reader:
+            if isinstance(spec, EntitySource):
+                written = _ingest_entity_chunk(spec, chunk)
+            else:
+                written = _ingest_event_chunk(spec, chunk, evaluate_rules)
+            db.session.commit()
+            if written and isinstance(spec, EntitySource):
+                cache.invalidate('entities')
+
+            stats.chunks += 1
+            stats.rows_read += len(chunk)
+            stats.rows_written += written
+            stats.rows_skipped += len(chunk) - written
+            stats.tick()
+            log.info(stats.summary())
+            if progress:
+                progress(stats)
+
+    stats.tick()
+    return stats
+
+
+def _lookup_entity_ids(pairs):
+    """
+    Resolves a frame of (identifier_type, value) pairs to entity IDs.
+
+    Issues one `IN (...)` query per LOOKUP_BATCH_SIZE distinct values and joins
+    the result back onto `pairs`. Unresolved pairs get a null `entity_id`.
+    """
+    values = pairs['value'].dropna().unique().tolist()
+    found = []
+    for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+        batch = values[start:start + LOOKUP_BATCH_SIZE]
+        found.extend(db.session.execute(
+            select(Identifier.identifier_type, Identifier.value, Identifier.entity_id)
+            .where(Identifier.value.in_(batch))
+        ).all())
+
+    known = pd.DataFrame(found, columns=['identifier_type', 'value', 'entity_id'])
+    known = known.drop_duplicates(subset=['identifier_type', 'value'])
+    return pairs.merge(known, on=['identifier_type', 'value'], how='left')
+
+
+def _remap_merged(entity_ids):
+    """
+    Replaces the IDs of entities merged away by deduplication with their
+    survivors' in a Series of entity IDs, so events resolved before a merge
+    are written to the survivor instead of failing on the deleted entity.
+    """
+    ids = entity_ids.unique().tolist()
+    survivor_of = {}
+    for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+        survivor_of.update(db.session.execute(
+            select(EntityAlias.merged_id, EntityAlias.survivor_id)
+            .where(EntityAlias.merged_id.in_(ids[start:start + LOOKUP_BATCH_SIZE]))
+        ).all())
+    return entity_ids.replace(survivor_of) if survivor_of else entity_ids
+
+
+def _insert_identifiers(frame):
+    """
+    Inserts the (identifier_type, value, entity_id) rows of `frame` that are not
+    already present in the `identifiers` table.
+    """
+    frame = frame.dropna(subset=['value']).drop_duplicates(subset=['identifier_type', 'value'])
+    if frame.empty:
+        return
+    existing = _lookup_entity_ids(frame[['identifier_type', 'value']])
+    missing = frame[existing['entity_id'].isna().to_numpy()]
+    if missing.empty:
+        return
+    records = missing[['identifier_type', 'value', 'entity_id']].astype({'entity_id': int}).to_dict('records')
+    db.session.execute(insert(Identifier), records)
+    stage_identifiers(db.session, [(r['identifier_type'], r['value'], r['entity_id']) for r in records])
+
+
+def _ingest_entity_chunk(spec, chunk):
+    chunk = chunk.dropna(subset=[spec.key_column]).drop_duplicates(subset=[spec.key_column])
+    if spec.email_column in chunk:
+        # primary_email is unique, so two rows sharing an email must become one entity.
+        chunk = chunk[chunk[spec.email_column].isna() | ~chunk[spec.email_column].duplicated()]
+    if chunk.empty:
+        return 0
+
+    # Long form: one row per (chunk row, identifier), keyed by the chunk's index.
+    long = pd.concat(
+        [
+            pd.DataFrame({'row': chunk.index, 'identifier_type': id_type, 'value': chunk[column].to_numpy()})
+            for column, id_type in spec.identifiers
+        ],
+        ignore_index=True,
+    ).dropna(subset=['value'])
+
+    resolved = _lookup_entity_ids(long)
+    row_entity = resolved.dropna(subset=['entity_id']).groupby('row')['entity_id'].first()
+
+    new_rows = chunk[~chunk.index.isin(row_entity.index)]
+    if not new_rows.empty:
+        records = pd.DataFrame({
+            'name': new_rows[spec.name_column],
+            'entity_type': spec.entity_type,
+            'primary_email': new_rows[spec.email_column] if spec.email_column in new_rows else None,
+        }).astype(object).where(lambda df: df.notna(), None).to_dict('records')
+        new_ids = db.session.execute(
+            insert(Entity).returning(Entity.id, sort_by_parameter_order=True), records
+        ).scalars().all()
+        row_entity = pd.concat([row_entity, pd.Series(new_ids, index=new_rows.index)])
+
+    long['entity_id'] = long['row'].map(row_entity)
+    _insert_identifiers(long)
+    return len(new_rows)
+
+
+def _ingest_event_chunk(spec, chunk, evaluate_rules=True):
+    column, id_type = spec.identifier
+    pairs = pd.DataFrame({'identifier_type': id_type, 'value': chunk[column].to_numpy()}, index=chunk.index)
+    entity_ids = _lookup_entity_ids(pairs)['entity_id'].to_numpy()
+
+    chunk = chunk.assign(
+        entity_id=entity_ids,
+        timestamp=pd.to_datetime(chunk[spec.timestamp_column], format=TIMESTAMP_FORMAT, errors='coerce'),
+    ).dropna(subset=['entity_id', 'timestamp'])
+    if chunk.empty:
+        return 0
+    chunk = chunk.astype({'entity_id': int})
+    chunk['entity_id'] = _remap_merged(chunk['entity_id'])
+
+    events = pd.DataFrame({
+        'timestamp': chunk['timestamp'],
+        'location': chunk[spec.location_column],
+        'source_type': spec.source_type,
+        'description': spec.describe(chunk),
+        'entity_id': chunk['entity_id'],
+    })[EVENT_COLUMNS]
+    _write_events(events, evaluate_rules)
+
+    for extra_column, extra_type in spec.extra_identifiers:
+        _insert_identifiers(pd.DataFrame({
+            'identifier_type': extra_type,
+            'value': chunk[extra_column].to_numpy(),
+            'entity_id': chunk['entity_id'].to_numpy(),
+        }))
+
+    return len(events)
+
+
+def _write_events(events, evaluate_rules=True):
+    """
+    Bulk-writes a frame of events. Uses COPY on PostgreSQL and a batched
+    executemany insert everywhere else, then advances each touched entity's
+    last_seen_at with one update per distinct entity in the chunk, folds
+    the chunk into the occupancy rollups and entity summaries and, unless
+    `evaluate_rules` is off, evaluates the alert rules on it.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        _copy_events(events)
+    else:
+        records = events.astype(object).where(events.notna(), None).to_dict('records')
+        db.session.execute(insert(Event), records)
+
+    last_seen = events.groupby('entity_id')['timestamp'].max()
+    advance_last_seen(db.session.connection(), [
+        {'b_entity_id': int(entity_id), 'b_seen_at': seen_at.to_pydatetime()}
+        for entity_id, seen_at in last_seen.items()
+    ])
+    record_occupancy(db.session.connection(), events)
+    record_activity(db.session.connection(), events)
+    if evaluate_rules:
+        rule_service.evaluate_rules(db.session, events)
+
+
+def _copy_events(events):
+    # COPY bypasses SQLAlchemy's column defaults, so updated_at is written explicitly.
+    events = events.assign(updated_at=datetime.utcnow())
+    buffer = io.StringIO()
+    events.to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S.%f')
+    buffer.seek(0)
+
+    # Run COPY on the session's own connection so it shares the chunk transaction.
+    dbapi_connection = db.session.connection().connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY events ({', '.join(events.columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+# --- Live ingestion ---
+# Events pushed by card readers and Wi-Fi controllers are validated and resolved
+# on arrival, buffered in the event stream and written in micro-batches by the
+# `tasks.drain_event_stream` consumer.
+
+# Fields of a live event, and the maximum length of the string fields.
+LIVE_EVENT_FIELDS = ['identifier_type', 'identifier', 'timestamp', 'location', 'source_type',
+                     'description', 'idempotency_key']
+LIVE_REQUIRED_FIELDS = ['identifier_type', 'identifier', 'timestamp', 'source_type']
+LIVE_FIELD_LENGTHS = {'identifier_type': 50, 'identifier': 255, 'location': 255, 'source_type': 50,
+                      'idempotency_key': 128}
+
+# Timestamps travel through the stream in this layout (naive UTC, microseconds).
+STREAM_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+class Backpressure(Exception):
+    """
+    Raised when the event stream backlog is too large to accept more events.
+    """
+    def __init__(self, backlog, retry_after):
+        super().__init__(f"Event backlog is full ({backlog} events waiting); retry in {retry_after}s.")
+        self.backlog = backlog
+        self.retry_after = retry_after
+
+
+def accept_live_events(payloads):
+    """
+    Validates, resolves and enqueues a batch of live events.
+
+    Every payload is checked for required fields, field lengths and an ISO 8601
+    timestamp, and its (identifier_type, identifier) pair is resolved to an entity
+    through the resolution index. Accepted events are appended to the event stream
+    with their idempotency key, or a generated one, so that redelivered stream
+    entries are written only once.
+
+    :returns: (accepted, rejected), where `rejected` lists {'index', 'error'} for
+              each payload that was not enqueued.
+    :raises Backpressure: If the stream already holds EVENT_STREAM_MAX_BACKLOG events.
+    """
+    backlog = event_stream.length()
+    if backlog + len(payloads) > current_app.config['EVENT_STREAM_MAX_BACKLOG']:
+        raise Backpressure(backlog, current_app.config['EVENT_STREAM_RETRY_AFTER'])
+
+    errors = pd.Series([None if isinstance(p, dict) else 'Event must be a JSON object' for p in payloads],
+                       dtype=object)
+    frame = pd.DataFrame.from_records([p if isinstance(p, dict) else {} for p in payloads],
+                                      columns=LIVE_EVENT_FIELDS).astype(object)
+    frame = frame.where(frame.notna(), None)
+
+    def reject(mask, message):
+        errors[mask & errors.isna()] = message
+
+    for column in LIVE_REQUIRED_FIELDS:
+        reject(frame[column].map(lambda value: value in (None, '')), f"'{column}' is required")
+    for column, max_length in LIVE_FIELD_LENGTHS.items():
+        reject(frame[column].map(lambda value: value is not None and (not isinstance(value, str) or len(value) > max_length)),
+               f"'{column}' must be a string of at most {max_length} characters")
+    timestamps = pd.to_datetime(frame['timestamp'], format='ISO8601', utc=True, errors='coerce')
+    reject(timestamps.isna(), "'timestamp' must be an ISO 8601 date-time")
+
+    valid = errors.isna()
+    entity_ids = pd.Series(None, index=frame.index, dtype=object)
+    if valid.any():
+        pairs = list(zip(frame.loc[valid, 'identifier_type'], frame.loc[valid, 'identifier']))
+        entity_ids[valid] = resolve_identifiers(pairs)
+        reject(valid & entity_ids.isna(), 'Unknown identifier')
+
+    accepted = frame[errors.isna()]
+    if not accepted.empty:
+        keys = accepted['idempotency_key'].map(lambda key: key or uuid.uuid4().hex)
+        event_stream.append([
+            {
+                'entity_id': str(entity_id),
+                'timestamp': timestamp.strftime(STREAM_TIMESTAMP_FORMAT),
+                'location': location or '',
+                'source_type': source_type,
+                'description': description or '',
+                'ingest_key': key,
+            }
+            for entity_id, timestamp, location, source_type, description, key in zip(
+                entity_ids[accepted.index], timestamps[accepted.index].dt.tz_localize(None),
+                accepted['location'], accepted['source_type'], accepted['description'], keys,
+            )
+        ])
+
+    rejected = [{'index': int(index), 'error': error} for index, error in errors.dropna().items()]
+    return len(accepted), rejected
+
+
+def write_stream_events(entries):
+    """
+    Writes a micro-batch of (entry_id, fields) pairs read from the event stream.
+
+    Entries are de-duplicated on their ingest key within the batch and against
+    events already stored (INSERT ... ON CONFLICT DO NOTHING on the ingest key
+    and timestamp, both of which a redelivered entry repeats), so replaying a
+    batch after a crash is harmless. Events of entities merged away since they
+    were accepted are written to the survivor. Only the events actually
+    written are passed to the alert rules. Does not commit.
+
+    :returns: (written, duplicates)
+    """
+    frame = pd.DataFrame([fields for _, fields in entries]).drop_duplicates(subset=['ingest_key'])
+    frame = frame.assign(
+        # Entries resolved before a merge committed carry the merged entity's ID.
+        entity_id=_remap_merged(frame['entity_id'].astype(int)),
+        timestamp=pd.to_datetime(frame['timestamp'], format=STREAM_TIMESTAMP_FORMAT),
+    ).replace({'location': {'': None}, 'description': {'': None}})
+    records = frame[EVENT_COLUMNS + ['ingest_key']].astype(object).to_dict('records')
+    for record in records:
+        record['timestamp'] = record['timestamp'].to_pydatetime()
+
+    connection = db.session.connection()
+    stmt = conflict_insert(connection, Event).on_conflict_do_nothing(index_elements=['ingest_key', 'timestamp'])
+    written = db.session.execute(
+        stmt.returning(Event.entity_id, Event.timestamp, Event.location, Event.source_type), records
+    ).all()
+    if written:
+        written_events = pd.DataFrame(written, columns=['entity_id', 'timestamp', 'location', 'source_type'])
+        last_seen = written_events.groupby('entity_id')['timestamp'].max()
+        advance_last_seen(connection, [
+            {'b_entity_id': int(entity_id), 'b_seen_at': seen_at.to_pydatetime()}
+            for entity_id, seen_at in last_seen.items()
+        ])
+        record_occupancy(connection, written_events)
+        record_activity(connection, written_events)
+        rule_service.evaluate_rules(db.session, written_events)
+    return len(written), len(entries) - len(written)
@@ -0,0 +1,231 @@
+import logging
+from datetime import datetime, timedelta
+
+import pandas as pd
+from flask import current_app
+from sqlalchemy import delete, distinct, event, func, insert, literal, select
+
+from ..event_archive import event_archive
+from ..models import db, Event, HourlyOccupancy, DailyOccupancy, OccupancyPresence, conflict_insert
+
+log = logging.getLogger(__name__)
+
+# Rollup granularities: the rollup table and the pandas frequency each bucket is floored to.
+GRANULARITIES = {
+    'hour': (HourlyOccupancy, 'h'),
+    'day': (DailyOccupancy, 'D'),
+}
+
+BUCKET_KEYS = ['location', 'source_type', 'bucket']
+
+
+def record_occupancy(connection, events):
+    """
+    Folds a frame of newly written events into the hourly and daily rollups.
+
+    `events` needs entity_id, timestamp, location and source_type columns;
+    events without a location are not counted. For every granularity the
+    (bucket, entity) pairs are inserted into `occupancy_presence`, skipping
+    pairs already counted, and each bucket's entity_count grows by the number of
+    pairs that were new while its event_count grows by its number of events.
+    Both steps are single upserts, so concurrent writers never lose updates.
+    """
+    events = events.dropna(subset=['location'])
+    if events.empty:
+        return
+
+    for granularity, (model, frequency) in GRANULARITIES.items():
+        frame = events[['entity_id', 'location', 'source_type']].assign(
+            bucket=pd.to_datetime(events['timestamp']).dt.floor(frequency)
+        )
+        presence = frame.drop_duplicates().sort_values(BUCKET_KEYS + ['entity_id'])
+        new_pairs = connection.execute(
+            conflict_insert(connection, OccupancyPresence).on_conflict_do_nothing().returning(
+                OccupancyPresence.location, OccupancyPresence.source_type, OccupancyPresence.bucket,
+            ),
+            [
+                {'granularity': granularity, 'location': location, 'source_type': source_type,
+                 'bucket': bucket.to_pydatetime(), 'entity_id': int(entity_id)}
+                for entity_id, location, source_type, bucket in presence.itertuples(index=False)
+            ],
+        ).all()
+        new_entities = pd.DataFrame(new_pairs, columns=BUCKET_KEYS).assign(bucket=lambda df: pd.to_datetime(df['bucket']))
+
+        counts = frame.groupby(BUCKET_KEYS).size().rename('event_count').reset_index().merge(
+            new_entities.groupby(BUCKET_KEYS).size().rename('entity_count').reset_index(),
+            on=BUCKET_KEYS, how='left',
+        ).fillna({'entity_count': 0})
+
+        stmt = conflict_insert(connection, model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=BUCKET_KEYS,
+            set_={
+                'entity_count': model.entity_count + stmt.excluded.entity_count,
+                'event_count': model.event_count + stmt.excluded.event_count,
+            },
+        )
+        connection.execute(stmt, [
+            {'location': location, 'source_type': source_type, 'bucket': bucket.to_pydatetime(),
+             'event_count': int(event_count), 'entity_count': int(entity_count)}
+            for location, source_type, bucket, event_count, entity_count in counts.itertuples(index=False)
+        ])
+
+
+@event.listens_for(Event, 'after_insert')
+def _record_event_occupancy(mapper, connection, target):
+    # Keep the rollups current for events written through the ORM.
+    # Bulk writers call record_occupancy() themselves.
+    record_occupancy(connection, pd.DataFrame([{
+        'entity_id': target.entity_id, 'timestamp': target.timestamp,
+        'location': target.location, 'source_type': target.source_type,
+    }]))
+
+
+def _bucket(column, granularity, dialect):
+    """
+    SQL expression truncating a timestamp column to the start of its bucket.
+    """
+    if dialect == 'postgresql':
+        return func.date_trunc(granularity, column)
+    if dialect == 'sqlite':
+        # Matches the text layout SQLAlchemy uses for DateTime values on SQLite.
+        layout = '%Y-%m-%d %H:00:00.000000' if granularity == 'hour' else '%Y-%m-%d 00:00:00.000000'
+        return func.strftime(layout, column)
+    raise NotImplementedError(f"Occupancy backfill is not supported on {dialect}.")
+
+
+def backfill_occupancy(since: datetime = None, until: datetime = None, progress=None):
+    """
+    Rebuilds the occupancy rollups from the events table for whole UTC days.
+
+    Covers the days overlapping [since, until), defaulting to the full event
+    history. Each day is recomputed with set-based INSERT ... SELECT statements
+    and committed on its own, so the job can be interrupted and re-run. Events
+    written for a day while it is being rebuilt may be counted twice; backfill
+    history before live writers reach it, or while ingestion is paused.
+
+    :param progress: Optional callable invoked with each completed day.
+    :returns: Number of days rebuilt.
+    """
+    if since is None or until is None:
+        first, last = db.session.query(func.min(Event.timestamp), func.max(Event.timestamp)).one()
+        if first is None:
+            return 0
+        since = since or first
+        until = until or last + timedelta(microseconds=1)
+
+    day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+    days = []
+    while day < until:
+        days.append(day)
+        day += timedelta(days=1)
+    return rebuild_occupancy_days(days, progress)
+
+
+def rebuild_occupancy_days(days, progress=None):
+    """
+    Rebuilds the occupancy rollups for each UTC day (a midnight datetime) in `days`.
+
+    Each day is recomputed from the events table and committed on its own.
+    Days before the archive horizon are skipped: their events may have left the
+    table, and the rollups still count them.
+
+    :param progress: Optional callable invoked with each completed day.
+    :returns: Number of days rebuilt.
+    """
+    horizon = event_archive.horizon()
+    if horizon is not None:
+        archived = [day for day in days if day < horizon]
+        if archived:
+            log.warning(f"Skipping {len(archived)} occupancy days before the archive horizon {horizon:%Y-%m-%d}.")
+            days = [day for day in days if day >= horizon]
+
+    dialect = db.session.get_bind().dialect.name
+    cutoff = presence_cutoff()
+    for day in days:
+        _rebuild_day(day, day + timedelta(days=1), dialect, with_presence=day + timedelta(days=1) > cutoff)
+        db.session.commit()
+        if progress:
+            progress(day)
+    log.info(f"Rebuilt occupancy rollups for {len(days)} days.")
+    return len(days)
+
+
+def _rebuild_day(start, end, dialect, with_presence=True):
+    in_day = (Event.timestamp >= start, Event.timestamp < end, Event.location.isnot(None))
+    db.session.execute(delete(OccupancyPresence).where(OccupancyPresence.bucket >= start, OccupancyPresence.bucket < end))
+
+    for granularity, (model, _) in GRANULARITIES.items():
+        db.session.execute(delete(model).where(model.bucket >= start, model.bucket < end))
+        bucket = _bucket(Event.timestamp, granularity, dialect)
+        # Days already past the presence cutoff would only be pruned again.
+        if with_presence:
+            db.session.execute(insert(OccupancyPresence).from_select(
+                ['granularity', 'location', 'source_type', 'bucket', 'entity_id'],
+                select(literal(granularity), Event.location, Event.source_type, bucket, Event.entity_id)
+                .where(*in_day).distinct(),
+            ))
+        db.session.execute(insert(model).from_select(
+            ['location', 'source_type', 'bucket', 'entity_count', 'event_count'],
+            select(Event.location, Event.source_type, bucket, func.count(distinct(Event.entity_id)), func.count())
+            .where(*in_day).group_by(Event.location, Event.source_type, bucket),
+        ))
+
+
+def presence_cutoff(now: datetime = None):
+    """
+    Returns the midnight before which `occupancy_presence` rows are pruned:
+    OCCUPANCY_PRESENCE_RETENTION_DAYS before today, so it always covers the
+    longest bucket (one day) that live events can still add to.
+    """
+    today = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=current_app.config['OCCUPANCY_PRESENCE_RETENTION_DAYS'])
+
+
+def prune_occupancy_presence(progress=None):
+    """
+    Deletes the `occupancy_presence` rows of buckets before `presence_cutoff()`,
+    one day per transaction. The rollups of those buckets are kept; an event
+    arriving for one of them later may count its entity again, until the day
+    is rebuilt with `backfill_occupancy`.
+
+    :param progress: Optional callable invoked with each pruned day.
+    :returns: Number of rows deleted.
+    """
+    cutoff = presence_cutoff()
+    deleted = 0
+    while True:
+        # The oldest bucket left: one probe of the bucket index, skipping days without rows.
+        first = db.session.query(func.min(OccupancyPresence.bucket)).filter(OccupancyPresence.bucket < cutoff).scalar()
+        if first is None:
+            break
+        day = first.replace(hour=0, minute=0, second=0, microsecond=0)
+        deleted += db.session.execute(delete(OccupancyPresence).where(
+            OccupancyPresence.bucket >= day, OccupancyPresence.bucket < min(day + timedelta(days=1), cutoff),
+        )).rowcount
+        db.session.commit()
+        if progress:
+            progress(day)
+    db.session.rollback()
+    log.info(f"Pruned {deleted} occupancy presence rows before {cutoff:%Y-%m-%d}.")
+    return deleted
+
+
+def get_occupancy(granularity: str, since: datetime, until: datetime, locations=None, source_types=None,
+                  limit: int = 10000, columns=None):
+    """
+    Returns rollup rows for buckets in [since, until), ordered by bucket, location and source.
+
+    Counts are per (location, source_type, bucket). Event counts may be summed
+    across sources; entity counts may not, as one person can appear in several.
+    At most `limit` rows are returned. When `columns` is given, only those
+    columns are selected as plain row tuples.
+    """
+    model, _ = GRANULARITIES[granularity]
+    query = db.session.query(*columns) if columns else model.query
+    query = query.filter(model.bucket >= since, model.bucket < until)
+    if locations:
+        query = query.filter(model.location.in_(locations))
+    if source_types:
+        query = query.filter(model.source_type.in_(source_types))
+    return query.order_by(model.bucket, model.location, model.source_type).limit(limit).all()
@@ -0,0 +1,105 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import tuple_
+
+from ..database import db_router
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a client-supplied pagination cursor cannot be decoded.
+    """
+
+
+class Page:
+    """
+    A single page of a keyset-paginated result.
+
+    `next_cursor` is None when there are no further rows.
+    """
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """
+    Encodes a (timestamp, id) position as an opaque, URL-safe cursor string.
+    """
+    raw = f'{timestamp.isoformat()}|{row_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Decodes a cursor produced by `encode_cursor` back into (timestamp, id).
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}') from exc
+
+
+def encode_value_cursor(value, row_id: int) -> str:
+    """
+    Encodes a (sort value, id) position as an opaque cursor, for lists sorted by
+    a column other than a timestamp. `value` may be a datetime, an int or None.
+    """
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_value_cursor(cursor: str, parse=int):
+    """
+    Decodes a cursor produced by `encode_value_cursor` back into (value, id),
+    converting a non-null value with `parse` (e.g. datetime.fromisoformat).
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (None if value is None else parse(value)), int(row_id)
+    except (ValueError, TypeError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}') from exc
+
+
+def sync_watermark(overlap_seconds: float) -> str:
+    """
+    Returns the watermark a delta-sync client passes back as `changed_since`.
+
+    It is the current time (naive UTC, ISO 8601) less `overlap_seconds`, so rows
+    stamped by write transactions that were still in flight are not missed. Rows
+    in the overlap are sent again by the next request; clients upsert them by ID.
+    While reads may be served by the read replica, the time of the last
+    transaction it has replayed stands in for the current time, so rows it has
+    not received yet are not skipped however far it lags. Read it before
+    running the query whose results it accompanies.
+    """
+    now = datetime.utcnow()
+    replayed = db_router.replayed_until()
+    if replayed is not None:
+        now = min(now, replayed)
+    return (now - timedelta(seconds=overlap_seconds)).isoformat()
+
+
+def keyset_paginate(query, timestamp_column, id_column, cursor=None, limit=100):
+    """
+    Applies newest-first keyset pagination on (timestamp, id) to `query`.
+
+    Rows strictly after the cursor position are fetched in (timestamp DESC, id DESC)
+    order. One extra row is read to decide whether another page exists, so the
+    cost of a page is independent of how deep into the result it is.
+    """
+    if cursor:
+        query = query.filter(tuple_(timestamp_column, id_column) < tuple_(*decode_cursor(cursor)))
+
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows)
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return Page(rows, encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key)))
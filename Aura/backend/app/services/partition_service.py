@@ -0,0 +1,195 @@
+import logging
+import re
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import text
+
+from ..models import db
+
+log = logging.getLogger(__name__)
+
+# Monthly partitions are named events_pYYYY_MM; events outside all of them land in the default one.
+PARTITION_NAME_FORMAT = 'events_p%Y_%m'
+PARTITION_NAME = re.compile(r'^events_p(\d{4})_(\d{2})$')
+DEFAULT_PARTITION = 'events_default'
+
+
+def partition_name(month: datetime):
+    return month.strftime(PARTITION_NAME_FORMAT)
+
+
+def month_start(value: datetime):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(month: datetime):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def is_partitioned(connection):
+    """
+    True if the events table is a partitioned PostgreSQL table (migration 0011).
+    Tables made by db.create_all() and SQLite databases are not, and every
+    function here leaves them alone.
+    """
+    if connection.dialect.name != 'postgresql':
+        return False
+    return connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'events'::regclass)"
+    )).scalar()
+
+
+def list_partitions(connection):
+    """
+    Returns the months of the attached monthly partitions, oldest first.
+    """
+    names = connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = 'events'::regclass"
+    )).scalars()
+    return sorted(datetime(int(match[1]), int(match[2]), 1) for match in map(PARTITION_NAME.match, names) if match)
+
+
+def ensure_partitions(months_ahead: int = None):
+    """
+    Creates the monthly partitions missing from this month to `months_ahead`
+    (EVENT_PARTITION_MONTHS_AHEAD) months from now, one transaction each.
+
+    Each partition is created as a plain table with a CHECK constraint matching
+    its bounds and then attached, which takes a SHARE UPDATE EXCLUSIVE lock on
+    events (CREATE TABLE ... PARTITION OF would block readers and writers) and
+    spares PostgreSQL a scan of the new table. ATTACH still takes an ACCESS
+    EXCLUSIVE lock on the default partition and scans it for rows of the new
+    range, blocking reads and writes of it meanwhile, bounded only by
+    EVENT_PARTITION_LOCK_TIMEOUT_MS; run `split_default_partition` first, so it
+    is nearly empty. Rows of the month that reached it since are moved into the
+    new partition before it is attached.
+
+    :returns: Names of the partitions created.
+    """
+    if months_ahead is None:
+        months_ahead = current_app.config['EVENT_PARTITION_MONTHS_AHEAD']
+    if not is_partitioned(db.session.connection()):
+        db.session.rollback()
+        return []
+
+    existing = set(list_partitions(db.session.connection()))
+    created, month = [], month_start(datetime.utcnow())
+    for _ in range(months_ahead + 1):
+        if month not in existing:
+            _create_partition(month)
+            db.session.commit()
+            created.append(partition_name(month))
+        month = next_month(month)
+    db.session.rollback()
+    if created:
+        log.info(f"Created event partitions {', '.join(created)}.")
+    return created
+
+
+def split_default_partition():
+    """
+    Moves the events caught by the default partition (months without a
+    partition of their own when they were written, e.g. a backfill of old
+    history) into new monthly partitions, one month per transaction.
+
+    :returns: Number of events moved.
+    """
+    if not is_partitioned(db.session.connection()):
+        db.session.rollback()
+        return 0
+
+    months = db.session.execute(text(
+        f"SELECT DISTINCT date_trunc('month', \"timestamp\") FROM {DEFAULT_PARTITION} ORDER BY 1"
+    )).scalars().all()
+    db.session.rollback()
+
+    moved = 0
+    for month in months:
+        moved += _create_partition(month)
+        db.session.commit()
+        log.info(f"Moved events of {month:%Y-%m} out of {DEFAULT_PARTITION} into {partition_name(month)}.")
+    return moved
+
+
+def partitions_before(before: datetime):
+    """
+    Returns the months of the monthly partitions lying wholly before `before`, oldest first.
+    """
+    if not is_partitioned(db.session.connection()):
+        return []
+    return [month for month in list_partitions(db.session.connection()) if next_month(month) <= before]
+
+
+def lock_partition(month: datetime):
+    """
+    Blocks writes to the partition of `month` until the caller's transaction
+    ends, so rows read from it can be archived before it is dropped without
+    missing any written in between. Reads carry on. Does not commit.
+    """
+    _set_lock_timeout()
+    db.session.execute(text(f'LOCK TABLE {partition_name(month)} IN SHARE MODE'))
+
+
+def drop_partition(month: datetime):
+    """
+    Detaches and drops the partition of `month`, in the caller's transaction.
+    Does not commit.
+
+    DETACH takes an ACCESS EXCLUSIVE lock on events, which blocks its readers
+    and writers until the transaction ends; EVENT_PARTITION_LOCK_TIMEOUT_MS
+    bounds the wait for it. DETACH ... CONCURRENTLY would not block them, but
+    cannot run inside the transaction that archived and locked the partition.
+    """
+    name = partition_name(month)
+    _set_lock_timeout()
+    db.session.execute(text(f'ALTER TABLE events DETACH PARTITION {name}'))
+    db.session.execute(text(f'DROP TABLE {name}'))
+
+
+def _create_partition(month):
+    """
+    Creates and attaches the partition of `month`, first moving the month's
+    events out of the default partition, as ATTACH fails while it holds any.
+    Does not commit.
+
+    :returns: Number of events moved.
+    """
+    name, bounds = partition_name(month), {'start': month, 'end': next_month(month)}
+    _set_lock_timeout()
+    # Holds off writes of the month to the default partition until the new one takes them.
+    db.session.execute(text(f'LOCK TABLE {DEFAULT_PARTITION} IN SHARE MODE'))
+    db.session.execute(text(f'CREATE TABLE {name} (LIKE events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    db.session.execute(text(
+        f'INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} '
+        f'WHERE "timestamp" >= :start AND "timestamp" < :end'
+    ), bounds)
+    moved = db.session.execute(text(
+        f'DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" >= :start AND "timestamp" < :end'
+    ), bounds).rowcount
+    _attach(month)
+    return moved
+
+
+def _attach(month):
+    # ATTACH itself only takes a SHARE UPDATE EXCLUSIVE lock on events, but with a default
+    # partition it also takes an ACCESS EXCLUSIVE lock on that, to check it holds no rows of the
+    # new range, so writes to events that would land in the default partition wait meanwhile.
+    name = partition_name(month)
+    # DDL takes no bind parameters; the bounds are rendered from datetimes.
+    start, end = (f"'{value:%Y-%m-%d %H:%M:%S}'" for value in (month, next_month(month)))
+    db.session.execute(text(
+        f'ALTER TABLE {name} ADD CONSTRAINT {name}_bounds '
+        f'CHECK ("timestamp" IS NOT NULL AND "timestamp" >= {start} AND "timestamp" < {end})'
+    ))
+    db.session.execute(text(f'ALTER TABLE events ATTACH PARTITION {name} FOR VALUES FROM ({start}) TO ({end})'))
+    # Only needed to spare ATTACH a validating scan; the partition bound now does its job.
+    db.session.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT {name}_bounds'))
+
+
+def _set_lock_timeout():
+    # Partition DDL queues behind long-running queries on events, and everything else then
+    # queues behind it; give up quickly instead and let the next run try again.
+    db.session.execute(text(f"SET LOCAL lock_timeout = {int(current_app.config['EVENT_PARTITION_LOCK_TIMEOUT_MS'])}"))
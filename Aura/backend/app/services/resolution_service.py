@@ -1,10 +1,176 @@
-from ..models import Entity
+import logging
+import threading
+from datetime import datetime
 
-def get_all_entities():
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from ..cache import cache
+from ..database import primary_reads, replica_reads
+from ..models import db, Entity, EntityAlias, Identifier
+
+log = logging.getLogger(__name__)
+
+# Upper bound on the number of values sent in a single `IN (...)` fallback lookup.
+LOOKUP_BATCH_SIZE = 5000
+
+@replica_reads()
+def get_all_entities(columns=None, changed_since: datetime = None):
     """
     Retrieves all entities from the database.
 
     This service function encapsulates the database query to fetch all records
-    from the Entity table.
+    from the Entity table. When `columns` is given, only those columns are
+    selected and plain row tuples are returned instead of ORM objects. With
+    `changed_since`, only entities created or changed at or after that time are
+    returned, read through the updated_at index. Served by the read replica
+    when one is configured.
+    """
+    query = db.session.query(*columns) if columns else Entity.query
+    if changed_since is not None:
+        query = query.filter(Entity.updated_at >= changed_since)
+    return query.all()
+
+
+@replica_reads()
+def get_merged_entities(changed_since: datetime):
+    """
+    Returns {'id', 'survivor_id'} for each entity merged into another at or
+    after `changed_since`, read through the merged_at index, so delta sync
+    clients can drop the merged entities they still hold. Served by the read
+    replica when one is configured.
+    """
+    return [{'id': merged_id, 'survivor_id': survivor_id} for merged_id, survivor_id in db.session.execute(
+        select(EntityAlias.merged_id, EntityAlias.survivor_id)
+        .where(EntityAlias.merged_at >= changed_since).order_by(EntityAlias.merged_id)
+    )]
+
+
+class ResolutionIndex:
+    """
+    In-memory map from (identifier_type, value) to entity ID.
+
+    Entries are stored as one dict per identifier type, so each identifier costs a
+    single dict slot rather than a tuple key. The index is loaded from the
+    `identifiers` table by `warm()`, kept current as identifiers are created in
+    this process, and falls back to the database for keys it has not seen (e.g.
+    identifiers written by another process), caching whatever it finds. When
+    identifiers move between entities (see deduplication_service) the
+    'identifiers' cache namespace is invalidated and every process reloads.
     """
-    return Entity.query.all()
\ No newline at end of file
+    def __init__(self):
+        self._by_type = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self.loaded = False
+
+    def __len__(self):
+        return sum(len(values) for values in self._by_type.values())
+
+    def warm(self, batch_size=50000):
+        """
+        (Re)loads the whole `identifiers` table, streaming it in batches.
+        """
+        by_type = {}
+        rows = db.session.execute(
+            select(Identifier.identifier_type, Identifier.value, Identifier.entity_id)
+            .execution_options(yield_per=batch_size)
+        )
+        for identifier_type, value, entity_id in rows:
+            by_type.setdefault(identifier_type, {}).setdefault(value, entity_id)
+
+        with self._lock:
+            self._by_type = by_type
+            self.loaded = True
+        log.info(f"Resolution index loaded with {len(self)} identifiers.")
+
+    def ensure_loaded(self):
+        version = cache.version('identifiers')
+        if not self.loaded or (version is not None and version != self._version):
+            with primary_reads():  # a replica may not have the identifier moves yet
+                self.warm()
+            self._version = version
+
+    def add_many(self, rows):
+        """
+        Adds or replaces (identifier_type, value, entity_id) entries.
+        """
+        with self._lock:
+            for identifier_type, value, entity_id in rows:
+                self._by_type.setdefault(identifier_type, {})[value] = entity_id
+
+    def resolve_many(self, pairs):
+        """
+        Resolves a list of (identifier_type, value) pairs to entity IDs.
+
+        Returns a list aligned with `pairs`, holding None for identifiers that do
+        not belong to any entity. Keys missing from the index are looked up with
+        one batched query per LOOKUP_BATCH_SIZE values.
+        """
+        self.ensure_loaded()
+        results = [self._by_type.get(identifier_type, {}).get(value) for identifier_type, value in pairs]
+
+        missing = {pair for pair, entity_id in zip(pairs, results) if entity_id is None}
+        if missing:
+            found = self._lookup(missing)
+            if found:
+                self.add_many((identifier_type, value, entity_id) for (identifier_type, value), entity_id in found.items())
+                results = [entity_id if entity_id is not None else found.get(pair)
+                           for pair, entity_id in zip(pairs, results)]
+        return results
+
+    @staticmethod
+    def _lookup(pairs):
+        values = sorted({value for _, value in pairs})
+        found = {}
+        for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+            rows = db.session.execute(
+                select(Identifier.identifier_type, Identifier.value, Identifier.entity_id)
+                .where(Identifier.value.in_(values[start:start + LOOKUP_BATCH_SIZE]))
+            )
+            for identifier_type, value, entity_id in rows:
+                if (identifier_type, value) in pairs:
+                    found.setdefault((identifier_type, value), entity_id)
+        return found
+
+
+resolution_index = ResolutionIndex()
+
+
+def resolve_identifiers(pairs):
+    """
+    Resolves many (identifier_type, value) pairs to entity IDs in one call.
+    """
+    return resolution_index.resolve_many(pairs)
+
+
+# --- Incremental maintenance ---
+# New identifiers are staged on the session and published to the index only
+# once the transaction commits, so rolled-back rows never become resolvable.
+
+def stage_identifiers(session, rows):
+    """
+    Queues (identifier_type, value, entity_id) rows written in `session` for
+    addition to the resolution index when the session commits. Bulk writers that
+    bypass the ORM call this directly.
+    """
+    session.info.setdefault('new_identifiers', []).extend(rows)
+
+
+@event.listens_for(Identifier, 'after_insert')
+def _stage_identifier(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        stage_identifiers(session, [(target.identifier_type, target.value, target.entity_id)])
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_identifiers(session):
+    staged = session.info.pop('new_identifiers', None)
+    if staged and resolution_index.loaded:
+        resolution_index.add_many(staged)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_identifiers(session):
+    session.info.pop('new_identifiers', None)
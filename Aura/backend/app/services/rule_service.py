@@ -0,0 +1,110 @@
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+from flask import current_app
+from sqlalchemy import insert, select
+
+from ..metrics import RULE_ALERTS, RULE_EVENTS, RULE_LATENCY
+from ..models import Alert, RuleState, conflict_insert
+from ..rules import rule_engine
+from .alert_service import stage_alerts
+from .summary_service import adjust_open_alerts
+
+# Upper bound on the number of entity IDs sent in a single `IN (...)` state lookup.
+LOOKUP_BATCH_SIZE = 5000
+
+# (state, alerted_at) of an entity a rule has not seen yet.
+NO_STATE = (None, None)
+
+
+def evaluate_rules(session, events):
+    """
+    Evaluates the enabled alert rules (ALERT_RULES) against a frame of newly
+    written events and records the alerts they raise.
+
+    `events` needs entity_id, timestamp, location and source_type columns. The
+    rules' state for the entities in the batch is read with one locking query,
+    every rule is evaluated on the whole batch at once, and the new state and
+    the alerts are written with one upsert and one insert. A rule
+    raises at most one alert per entity per batch, and none for an entity it
+    alerted on within ALERT_RULE_COOLDOWN_MINUTES (in event time). Events older
+    than ALERT_RULE_MAX_EVENT_AGE_HOURS are skipped: alerting on history that
+    arrives late, e.g. a backfill, would only page someone about the past.
+    Alerts are published once `session` commits. Does not commit.
+
+    :returns: Number of alerts created.
+    """
+    max_age = current_app.config['ALERT_RULE_MAX_EVENT_AGE_HOURS']
+    if max_age:
+        events = events[events['timestamp'] >= datetime.utcnow() - timedelta(hours=max_age)]
+    if events.empty:
+        return 0
+    batches = list(rule_engine.batches(events))
+    if not batches:
+        return 0
+
+    connection = session.connection()
+    entity_ids = sorted({int(entity_id) for _, batch in batches for entity_id in batch['entity_id'].unique()})
+    saved = _load_state(connection, [rule.name for rule, _ in batches], entity_ids)
+    cooldown = timedelta(minutes=current_app.config['ALERT_RULE_COOLDOWN_MINUTES'])
+    now = datetime.utcnow()
+
+    alerts, states = [], []
+    for rule, batch in batches:
+        started = time.perf_counter()
+        previous = saved.get(rule.name, {})
+        hits, new_state = rule.evaluate(batch, {entity_id: state for entity_id, (state, _) in previous.items()
+                                                if state is not None})
+
+        alerted_at = pd.to_datetime(hits['entity_id'].map(lambda entity_id: previous.get(entity_id, NO_STATE)[1]))
+        hits = rule_engine.first_hits(hits[alerted_at.isna() | ((hits['timestamp'] - alerted_at).abs() >= cooldown)])
+        RULE_LATENCY.labels(rule.name).observe(time.perf_counter() - started)
+        RULE_EVENTS.labels(rule.name).inc(len(batch))
+        RULE_ALERTS.labels(rule.name).inc(len(hits))
+
+        raised = {int(entity_id): timestamp.to_pydatetime()
+                  for entity_id, timestamp in zip(hits['entity_id'], hits['timestamp'])}
+        alerts.extend(
+            {'timestamp': timestamp.to_pydatetime(), 'severity': rule.severity, 'message': message,
+             'is_acknowledged': False, 'entity_id': int(entity_id), 'updated_at': now}
+            for entity_id, timestamp, message in zip(hits['entity_id'], hits['timestamp'], hits['message'])
+        )
+        states.extend(
+            {'rule': rule.name, 'entity_id': entity_id,
+             'state': new_state.get(entity_id, previous.get(entity_id, NO_STATE)[0]),
+             'alerted_at': raised.get(entity_id, previous.get(entity_id, NO_STATE)[1]),
+             'updated_at': now}
+            for entity_id in new_state.keys() | raised.keys()
+        )
+
+    if states:
+        stmt = conflict_insert(connection, RuleState)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=['rule', 'entity_id'],
+            set_={'state': stmt.excluded.state, 'alerted_at': stmt.excluded.alerted_at,
+                  'updated_at': stmt.excluded.updated_at},
+        ), states)
+    if alerts:
+        created_ids = session.execute(insert(Alert).returning(Alert.id), alerts).scalars().all()
+        adjust_open_alerts(connection, [alert['entity_id'] for alert in alerts])
+        stage_alerts(session, created_ids)
+    return len(alerts)
+
+
+def _load_state(connection, rule_names, entity_ids):
+    """
+    Returns {rule: {entity_id: (state, alerted_at)}}, locking the rows read so
+    concurrent writers evaluating the same entities take turns.
+    """
+    saved = {}
+    for start in range(0, len(entity_ids), LOOKUP_BATCH_SIZE):
+        rows = connection.execute(
+            select(RuleState.rule, RuleState.entity_id, RuleState.state, RuleState.alerted_at)
+            .where(RuleState.rule.in_(rule_names), RuleState.entity_id.in_(entity_ids[start:start + LOOKUP_BATCH_SIZE]))
+            .order_by(RuleState.rule, RuleState.entity_id)
+            .with_for_update()
+        )
+        for rule, entity_id, state, alerted_at in rows:
+            saved.setdefault(rule, {})[entity_id] = (state, alerted_at)
+    return saved
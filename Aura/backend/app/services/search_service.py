@@ -0,0 +1,274 @@
+import bisect
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, func, literal, or_, select, true, union_all
+
+from ..cache import cache
+from ..database import primary_reads
+from ..models import db, Entity, Identifier
+
+log = logging.getLogger(__name__)
+
+# Upper bound on the number of entity IDs sent in a single `IN (...)` lookup.
+LOOKUP_BATCH_SIZE = 5000
+
+# Refreshes changing at most this many keys update the sorted lists in place; larger ones merge them.
+REFRESH_IN_PLACE_MAX = 1000
+
+# Queries shorter than this only match prefixes; trigram similarity needs a few characters to be useful.
+TRIGRAM_MIN_LENGTH = 3
+
+# Relevance bonuses added to the similarity score: exact matches first, then prefix matches.
+EXACT_MATCH = 3.0
+PREFIX_MATCH = 2.0
+WORD_PREFIX_MATCH = 1.5
+
+
+def search_entities(query: str, limit: int = 10):
+    """
+    Finds entities whose name, primary email or identifier values match `query`.
+
+    On PostgreSQL, prefix and fuzzy (pg_trgm word similarity) matches are
+    answered from trigram GIN indexes. Other databases use the in-process
+    `PrefixIndex`, which matches prefixes of those values and of each word of
+    the name. Results are ranked exact match, prefix match, then similarity.
+
+    :returns: Up to `limit` dicts with id, name, entity_type, primary_email and score.
+    """
+    query = query.strip().lower()
+    if not query:
+        return []
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return _trigram_search(query, limit)
+    return prefix_index.search(query, limit)
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _trigram_search(query, limit):
+    prefix = _escape_like(query) + '%'
+    word_prefix = '% ' + prefix
+    branches = []
+    for column, entity_id in ((Entity.name, Entity.id), (Entity.primary_email, Entity.id),
+                              (Identifier.value, Identifier.entity_id)):
+        value = func.lower(column)
+        matches = value.like(prefix, escape='\\')
+        if column is Entity.name:
+            matches = or_(matches, value.like(word_prefix, escape='\\'))
+        if len(query) >= TRIGRAM_MIN_LENGTH:
+            # `<%` is pg_trgm's word-similarity operator, served by the trigram index.
+            matches = or_(matches, literal(query).op('<%')(value))
+        score = case(
+            (value == query, EXACT_MATCH),
+            (value.like(prefix, escape='\\'), PREFIX_MATCH),
+            (value.like(word_prefix, escape='\\'), WORD_PREFIX_MATCH),
+            else_=0.0,
+        ) + func.word_similarity(query, value)
+        branches.append(select(entity_id.label('entity_id'), score.label('score')).where(matches))
+
+    hits = union_all(*branches).subquery()
+    best = select(hits.c.entity_id, func.max(hits.c.score).label('score')) \
+        .group_by(hits.c.entity_id) \
+        .order_by(func.max(hits.c.score).desc(), hits.c.entity_id) \
+        .limit(limit) \
+        .subquery()
+    rows = db.session.query(Entity.id, Entity.name, Entity.entity_type, Entity.primary_email, best.c.score) \
+        .join(best, best.c.entity_id == Entity.id) \
+        .order_by(best.c.score.desc(), Entity.name) \
+        .all()
+    return [
+        {'id': id_, 'name': name, 'entity_type': entity_type, 'primary_email': email, 'score': round(float(score), 3)}
+        for id_, name, entity_type, email, score in rows
+    ]
+
+
+class PrefixIndex:
+    """
+    In-memory sorted index of lower-cased search keys for databases without pg_trgm.
+
+    Each entity contributes its full name, every word of its name, its primary
+    email and its identifier values. Keys are held in one sorted list, so a
+    prefix lookup is a binary search followed by a scan of the matching run.
+
+    The index is built once and then refreshed incrementally, including for
+    writes made by other processes: when the 'entities' cache namespace
+    version changes (every entity write bumps it, see app.cache), or at most
+    SEARCH_INDEX_REFRESH_SECONDS after the last refresh, the entities updated
+    since then and the owners of identifiers added since then are reloaded and
+    their keys replaced. Merges move and delete identifiers and bump the
+    'identifiers' namespace, which rebuilds the whole index.
+    """
+    def __init__(self, max_scan=5000):
+        self.max_scan = max_scan
+        self._keys = []
+        self._entries = []
+        self._entities = {}
+        self._by_entity = {}
+        self._versions = None
+        self._refreshed_at = 0.0
+        self._changed_since = None
+        self._last_identifier_id = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def build(self):
+        """
+        Loads every entity and identifier into a new index and swaps it in.
+        """
+        started = datetime.utcnow()
+        last_identifier_id = db.session.query(func.max(Identifier.id)).scalar() or 0
+        entities, entries = self._load(true(), Identifier.id <= last_identifier_id)
+        entries.sort()
+        by_entity = {}
+        for entry in entries:
+            by_entity.setdefault(entry[1], []).append(entry)
+        with self._lock:
+            self._entities = entities
+            self._entries = entries
+            self._keys = [key for key, _, _ in entries]
+            self._by_entity = by_entity
+            self._changed_since = started
+            self._last_identifier_id = last_identifier_id
+            self.loaded = True
+        log.info(f"Search prefix index built with {len(entries)} keys for {len(entities)} entities.")
+
+    def refresh(self):
+        """
+        Replaces the keys of the entities updated, or given identifiers, since the
+        last build or refresh. Reading from the changes' timestamps a little in the
+        past (SYNC_WATERMARK_OVERLAP_SECONDS) picks up writes committed late.
+        """
+        started = datetime.utcnow()
+        since = self._changed_since - timedelta(seconds=current_app.config['SYNC_WATERMARK_OVERLAP_SECONDS'])
+        changed = set(db.session.execute(select(Entity.id).where(Entity.updated_at >= since)).scalars())
+        last_identifier_id = self._last_identifier_id
+        for identifier_id, entity_id in db.session.execute(
+            select(Identifier.id, Identifier.entity_id).where(Identifier.id > self._last_identifier_id)
+        ):
+            changed.add(entity_id)
+            last_identifier_id = max(last_identifier_id, identifier_id)
+        self._changed_since, self._last_identifier_id = started, last_identifier_id
+        if not changed:
+            return
+
+        loaded, fresh = {}, []
+        ids = sorted(changed)
+        for offset in range(0, len(ids), LOOKUP_BATCH_SIZE):
+            batch = ids[offset:offset + LOOKUP_BATCH_SIZE]
+            entities, entries = self._load(Entity.id.in_(batch), Identifier.entity_id.in_(batch))
+            loaded.update(entities)
+            fresh.extend(entries)
+        fresh.sort()
+
+        stale = [entry for entity_id in changed for entry in self._by_entity.get(entity_id, ())]
+        by_entity = dict(self._by_entity)
+        for entity_id in changed:
+            by_entity.pop(entity_id, None)
+        for entry in fresh:
+            by_entity.setdefault(entry[1], []).append(entry)
+
+        if len(stale) + len(fresh) <= REFRESH_IN_PLACE_MAX:
+            # A few keys: move them with binary searches on copies of the lists.
+            entries, keys = list(self._entries), list(self._keys)
+            for entry in stale:
+                position = bisect.bisect_left(entries, entry)
+                del entries[position], keys[position]
+            for entry in fresh:
+                position = bisect.bisect_left(entries, entry)
+                entries.insert(position, entry)
+                keys.insert(position, entry[0])
+        else:
+            entries = list(heapq.merge((entry for entry in self._entries if entry[1] not in changed), fresh))
+            keys = [key for key, _, _ in entries]
+
+        entities = {**self._entities, **loaded}
+        for entity_id in changed.difference(loaded):
+            entities.pop(entity_id, None)  # deleted
+        with self._lock:
+            self._entities, self._entries, self._keys, self._by_entity = entities, entries, keys, by_entity
+        log.info(f"Search prefix index refreshed {len(changed)} entities.")
+
+    @staticmethod
+    def _load(entity_filter, identifier_filter):
+        """
+        Returns ({entity_id: (name, entity_type, email)}, unsorted entries) of the matching rows.
+        """
+        entities = {}
+        entries = []
+        for id_, name, entity_type, email in db.session.execute(
+            select(Entity.id, Entity.name, Entity.entity_type, Entity.primary_email).where(entity_filter)
+        ):
+            entities[id_] = (name, entity_type, email)
+            words = name.lower().split()
+            entries.append((' '.join(words), id_, PREFIX_MATCH))
+            # Later words start their own keys, so "smi" finds "John Smith".
+            entries.extend((' '.join(words[i:]), id_, WORD_PREFIX_MATCH) for i in range(1, len(words)))
+            if email:
+                entries.append((email.lower(), id_, PREFIX_MATCH))
+        for value, entity_id in db.session.execute(
+            select(Identifier.value, Identifier.entity_id).where(identifier_filter)
+        ):
+            entries.append((value.lower(), entity_id, PREFIX_MATCH))
+        return entities, entries
+
+    def ensure_current(self):
+        """
+        Rebuilds the index if identifiers were moved since it was built, and
+        refreshes it if entities changed or it is due. If the cache is
+        unreachable, the index is refreshed on the timer alone.
+        """
+        versions = (cache.version('entities'), cache.version('identifiers'))
+        due = time.monotonic() - self._refreshed_at >= current_app.config['SEARCH_INDEX_REFRESH_SECONDS']
+        if self.loaded and not due and (None in versions or versions == self._versions):
+            return
+        # One rebuild or refresh at a time; searches keep using the current index. Both read the
+        # primary, as a replica may not have the writes that moved the versions or watermark yet.
+        with self._refresh_lock, primary_reads():
+            if not self.loaded or (versions[1] is not None and self._versions and versions[1] != self._versions[1]):
+                self.build()
+            else:
+                self.refresh()
+            self._versions = versions
+            self._refreshed_at = time.monotonic()
+
+    def search(self, query, limit):
+        """
+        Returns up to `limit` entities with a key starting with `query`, best first.
+
+        At most `max_scan` keys are examined, which bounds the cost of one- or
+        two-letter queries. An exact match sorts first in its run of keys, so
+        it is never cut off.
+        """
+        self.ensure_current()
+        with self._lock:
+            keys, entries, entities = self._keys, self._entries, self._entities
+
+        scores = {}
+        start = bisect.bisect_left(keys, query)
+        for key, entity_id, bonus in entries[start:start + self.max_scan]:
+            if not key.startswith(query):
+                break
+            # Exact matches rank first, then closer matches (shorter keys) within a tier.
+            score = (EXACT_MATCH if key == query else bonus) + len(query) / len(key)
+            scores[entity_id] = max(score, scores.get(entity_id, 0.0))
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], entities[item[0]][0], item[0]))[:limit]
+        return [
+            {'id': entity_id, 'name': entities[entity_id][0], 'entity_type': entities[entity_id][1],
+             'primary_email': entities[entity_id][2], 'score': round(score, 3)}
+            for entity_id, score in ranked
+        ]
+
+
+prefix_index = PrefixIndex()
@@ -0,0 +1,330 @@
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, bindparam, delete, false, func, select, tuple_, update
+
+from ..database import replica_reads
+from ..models import db, Alert, Entity, EntitySummary, Event, conflict_insert
+from .pagination import Page, decode_value_cursor, encode_value_cursor
+
+log = logging.getLogger(__name__)
+
+# Upper bound on the number of entity IDs sent in a single `IN (...)` lookup.
+LOOKUP_BATCH_SIZE = 5000
+
+# Columns the summary list can be sorted by, and how their cursor values are parsed.
+SORT_COLUMNS = {
+    'last_event_at': (EntitySummary.last_event_at, datetime.fromisoformat),
+    'events_today': (EntitySummary.events_today, int),
+    'events_window': (EntitySummary.events_window, int),
+    'open_alerts': (EntitySummary.open_alerts, int),
+}
+
+# Columns written by the event path; open_alerts belongs to the alert path.
+ACTIVITY_COLUMNS = ('last_event_at', 'last_location', 'last_source_type', 'daily_counts',
+                    'events_today', 'events_window', 'counted_on', 'updated_at')
+
+
+def _window(today: date = None):
+    """
+    Returns (today, first day of the window) as ISO date strings, the keys of daily_counts.
+    """
+    today = today or datetime.utcnow().date()
+    first_day = today - timedelta(days=current_app.config['ENTITY_SUMMARY_WINDOW_DAYS'] - 1)
+    return today.isoformat(), first_day.isoformat()
+
+
+def _totals(daily_counts, today, first_day):
+    """
+    Returns (events today, events in the window, per-source counts today, per-source counts in the window).
+    """
+    sources_today, sources_window = Counter(daily_counts.get(today, {})), Counter()
+    for day, sources in daily_counts.items():
+        if first_day <= day <= today:
+            sources_window.update(sources)
+    return sum(sources_today.values()), sum(sources_window.values()), dict(sources_today), dict(sources_window)
+
+
+def record_activity(connection, events):
+    """
+    Folds a frame of newly written events into the entity summaries.
+
+    `events` needs entity_id, timestamp, location and source_type columns. The
+    summaries of the entities in the frame are created if missing and read
+    with one locking query,
+    their latest event moves forward (never back, so historical backfills leave
+    it alone) and events within the window are added to the daily counts;
+    older events only count toward the latest event. Written with one upsert.
+    Does not commit.
+    """
+    if events.empty:
+        return
+    today, first_day = _window()
+    now = datetime.utcnow()
+
+    latest = events.sort_values(['entity_id', 'timestamp'], kind='stable').drop_duplicates('entity_id', keep='last')
+    days = events['timestamp'].dt.strftime('%Y-%m-%d')
+    in_window = (days >= first_day) & (days <= today)
+    counts = {}
+    for (entity_id, day, source_type), count in events[in_window].groupby(
+            ['entity_id', days[in_window], 'source_type']).size().items():
+        counts.setdefault(int(entity_id), {}).setdefault(day, {})[source_type] = int(count)
+
+    saved = _load_summaries(connection, sorted(latest['entity_id'].tolist()), now)
+    locations = latest['location'].astype(object).where(latest['location'].notna(), None)
+    rows = []
+    for entity_id, timestamp, location, source_type in zip(latest['entity_id'].tolist(), latest['timestamp'],
+                                                           locations, latest['source_type']):
+        previous = saved.get(entity_id)
+        daily = {day: dict(sources) for day, sources in (previous.daily_counts if previous else {}).items()
+                 if day >= first_day}
+        for day, sources in counts.get(entity_id, {}).items():
+            merged = daily.setdefault(day, {})
+            for name, count in sources.items():
+                merged[name] = merged.get(name, 0) + count
+
+        timestamp = timestamp.to_pydatetime()
+        if previous is not None and previous.last_event_at is not None and previous.last_event_at > timestamp:
+            timestamp, location, source_type = previous.last_event_at, previous.last_location, previous.last_source_type
+        events_today, events_window, _, _ = _totals(daily, today, first_day)
+        rows.append({
+            'entity_id': entity_id, 'last_event_at': timestamp, 'last_location': location,
+            'last_source_type': source_type, 'daily_counts': daily, 'events_today': events_today,
+            'events_window': events_window, 'counted_on': date.fromisoformat(today), 'open_alerts': 0,
+            'updated_at': now,
+        })
+
+    stmt = conflict_insert(connection, EntitySummary)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=['entity_id'],
+        set_={name: stmt.excluded[name] for name in ACTIVITY_COLUMNS},
+    ), rows)
+
+
+def _load_summaries(connection, entity_ids, now):
+    """
+    Returns {entity_id: row} of the summaries of `entity_ids`, locking them so
+    concurrent writers for the same entities take turns. Missing summaries are
+    first inserted empty: a lock only covers rows that exist, and two writers
+    both reading none would each write their own counts over the other's.
+    """
+    saved = {}
+    for start in range(0, len(entity_ids), LOOKUP_BATCH_SIZE):
+        batch = entity_ids[start:start + LOOKUP_BATCH_SIZE]
+        connection.execute(conflict_insert(connection, EntitySummary).on_conflict_do_nothing(), [
+            {'entity_id': entity_id, 'daily_counts': {}, 'events_today': 0, 'events_window': 0,
+             'open_alerts': 0, 'updated_at': now}
+            for entity_id in batch
+        ])
+        rows = connection.execute(
+            select(EntitySummary.entity_id, EntitySummary.last_event_at, EntitySummary.last_location,
+                   EntitySummary.last_source_type, EntitySummary.daily_counts)
+            .where(EntitySummary.entity_id.in_(batch))
+            .order_by(EntitySummary.entity_id)
+            .with_for_update()
+        )
+        saved.update((row.entity_id, row) for row in rows)
+    return saved
+
+
+def adjust_open_alerts(connection, entity_ids, delta: int = 1):
+    """
+    Adds `delta` to the open-alert count of the summary of each entity in
+    `entity_ids`, once per occurrence (so pass one ID per alert). Applied as
+    an atomic increment, so concurrent alert writers need no locking. The
+    count never drops below zero, e.g. for an alert raised before its entity
+    was summarized. Does not commit.
+    """
+    counts = Counter(int(entity_id) for entity_id in entity_ids)
+    if not counts:
+        return
+    now = datetime.utcnow()
+    greatest = func.greatest if connection.dialect.name == 'postgresql' else func.max
+    stmt = conflict_insert(connection, EntitySummary)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=['entity_id'],
+        set_={'open_alerts': greatest(EntitySummary.open_alerts + bindparam('b_delta'), 0), 'updated_at': now},
+    ), [
+        {'entity_id': entity_id, 'open_alerts': max(count * delta, 0), 'b_delta': count * delta,
+         'daily_counts': {}, 'events_today': 0, 'events_window': 0, 'updated_at': now}
+        for entity_id, count in sorted(counts.items())
+    ])
+
+
+def rebuild_summaries(entity_ids):
+    """
+    Recomputes the summaries of `entity_ids` from the events and alerts
+    tables, e.g. after entity merges. Entities with no events in the table,
+    no last_seen_at and no open alerts lose their summary. Does not commit.
+
+    The summaries are locked before anything is counted, so event and alert
+    writers for the same entities wait for the rebuild instead of having
+    their additions overwritten by counts read before they committed.
+    """
+    today, first_day = _window()
+    now = datetime.utcnow()
+    connection = db.session.connection()
+    for start in range(0, len(entity_ids), LOOKUP_BATCH_SIZE):
+        batch = sorted(int(entity_id) for entity_id in entity_ids[start:start + LOOKUP_BATCH_SIZE])
+        _load_summaries(connection, batch, now)
+
+        # The latest event is the one at last_seen_at: a probe of the (entity_id, timestamp) index.
+        # Entities whose latest event has been archived keep its time without a location.
+        latest = {entity_id: (seen_at, None, None) for entity_id, seen_at in db.session.execute(
+            select(Entity.id, Entity.last_seen_at).where(Entity.id.in_(batch), Entity.last_seen_at.isnot(None)))}
+        for entity_id, timestamp, location, source_type in db.session.execute(
+                select(Event.entity_id, Event.timestamp, Event.location, Event.source_type)
+                .join(Entity, and_(Event.entity_id == Entity.id, Event.timestamp == Entity.last_seen_at))
+                .where(Entity.id.in_(batch)).order_by(Event.id)):
+            latest[entity_id] = (timestamp, location, source_type)
+
+        daily = {}
+        day = func.date(Event.timestamp)
+        for entity_id, event_day, source_type, count in db.session.execute(
+                select(Event.entity_id, day, Event.source_type, func.count())
+                .where(Event.entity_id.in_(batch), Event.timestamp >= datetime.fromisoformat(first_day),
+                       Event.timestamp < datetime.fromisoformat(today) + timedelta(days=1))
+                .group_by(Event.entity_id, day, Event.source_type)):
+            daily.setdefault(entity_id, {}).setdefault(str(event_day), {})[source_type] = count
+
+        open_alerts = dict(db.session.execute(
+            select(Alert.entity_id, func.count())
+            .where(Alert.entity_id.in_(batch), Alert.is_acknowledged == false())
+            .group_by(Alert.entity_id)
+        ).all())
+
+        rows = []
+        for entity_id in sorted(latest.keys() | daily.keys() | open_alerts.keys()):
+            timestamp, location, source_type = latest.get(entity_id, (None, None, None))
+            counts = daily.get(entity_id, {})
+            events_today, events_window, _, _ = _totals(counts, today, first_day)
+            rows.append({
+                'entity_id': entity_id, 'last_event_at': timestamp, 'last_location': location,
+                'last_source_type': source_type, 'daily_counts': counts, 'events_today': events_today,
+                'events_window': events_window, 'counted_on': date.fromisoformat(today),
+                'open_alerts': open_alerts.get(entity_id, 0), 'updated_at': now,
+            })
+
+        summarized = {row['entity_id'] for row in rows}
+        empty = [entity_id for entity_id in batch if entity_id not in summarized]
+        if empty:
+            connection.execute(delete(EntitySummary).where(EntitySummary.entity_id.in_(empty)))
+        if rows:
+            stmt = conflict_insert(connection, EntitySummary)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=['entity_id'],
+                set_={name: stmt.excluded[name] for name in ACTIVITY_COLUMNS + ('open_alerts',)},
+            ), rows)
+
+
+def rebuild_all_summaries(batch_size: int = LOOKUP_BATCH_SIZE, progress=None):
+    """
+    Recomputes every entity summary, `batch_size` entities per transaction,
+    so the job can be interrupted and re-run.
+
+    :param progress: Optional callable invoked with the number of entities processed so far.
+    :returns: Number of entities processed.
+    """
+    done, last_id = 0, 0
+    while True:
+        entity_ids = db.session.execute(
+            select(Entity.id).where(Entity.id > last_id).order_by(Entity.id).limit(batch_size)
+        ).scalars().all()
+        if not entity_ids:
+            return done
+        rebuild_summaries(entity_ids)
+        db.session.commit()
+        done, last_id = done + len(entity_ids), entity_ids[-1]
+        if progress:
+            progress(done)
+
+
+def roll_entity_summaries(batch_size: int = LOOKUP_BATCH_SIZE):
+    """
+    Brings the stored today and window totals of every summary counted on an
+    earlier day up to date, dropping days that have left the window.
+
+    Only summaries with events in their window need it; the others already
+    read zero. Runs `batch_size` summaries per transaction.
+
+    :returns: Number of summaries rolled.
+    """
+    today, first_day = _window()
+    rolled, last_id = 0, 0
+    while True:
+        rows = db.session.execute(
+            select(EntitySummary.entity_id, EntitySummary.daily_counts)
+            .where(EntitySummary.counted_on < date.fromisoformat(today), EntitySummary.events_window > 0,
+                   EntitySummary.entity_id > last_id)
+            .order_by(EntitySummary.entity_id).limit(batch_size)
+            .with_for_update()
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for entity_id, daily_counts in rows:
+            daily = {day: sources for day, sources in daily_counts.items() if day >= first_day}
+            events_today, events_window, _, _ = _totals(daily, today, first_day)
+            updates.append({'entity_id': entity_id, 'daily_counts': daily, 'events_today': events_today,
+                            'events_window': events_window, 'counted_on': date.fromisoformat(today)})
+        db.session.execute(update(EntitySummary), updates)
+        db.session.commit()
+        rolled, last_id = rolled + len(rows), rows[-1].entity_id
+    log.info(f"Rolled {rolled} entity summaries forward to {today}.")
+    return rolled
+
+
+@replica_reads()
+def get_entity_summaries(sort: str = 'last_event_at', descending: bool = True, limit: int = 100,
+                         cursor: str = None):
+    """
+    Retrieves one page of entity summaries joined to their entities.
+
+    Pages are sorted by `sort` (a key of SORT_COLUMNS), then entity ID, and
+    addressed with a keyset cursor on both, so each page is a range scan of the
+    matching summary index. Summaries without a last event (entities only
+    known from their alerts) come after all others in either direction.
+    Counts are reported relative to the current day, whether or not the daily
+    roll has run yet. Served by the read replica when one is configured.
+
+    Returns a `Page` of dicts shaped like EntityDto.summary.
+    """
+    column, parse = SORT_COLUMNS[sort]
+    position = decode_value_cursor(cursor, parse) if cursor else None
+    key = EntitySummary.entity_id
+    after = (lambda left, right: left < right) if descending else (lambda left, right: left > right)
+    ordered = (lambda expression: expression.desc()) if descending else (lambda expression: expression.asc())
+
+    query = select(EntitySummary, Entity.name, Entity.entity_type).join(Entity, Entity.id == EntitySummary.entity_id)
+    rows = []
+    if position is None or position[0] is not None:
+        valued = query.where(column.isnot(None))
+        if position:
+            valued = valued.where(after(tuple_(column, key), tuple_(*position)))
+        rows = db.session.execute(valued.order_by(ordered(column), ordered(key)).limit(limit + 1)).all()
+    if len(rows) <= limit and column.nullable:
+        unvalued = query.where(column.is_(None))
+        if position and position[0] is None:
+            unvalued = unvalued.where(after(key, position[1]))
+        rows += db.session.execute(unvalued.order_by(ordered(key)).limit(limit + 1 - len(rows))).all()
+
+    today, first_day = _window()
+    items = [_summary(summary, name, entity_type, today, first_day) for summary, name, entity_type in rows[:limit]]
+    if len(rows) <= limit:
+        return Page(items)
+    last = rows[limit - 1].EntitySummary
+    return Page(items, encode_value_cursor(getattr(last, column.key), last.entity_id))
+
+
+def _summary(summary, name, entity_type, today, first_day):
+    events_today, events_window, sources_today, sources_window = _totals(summary.daily_counts, today, first_day)
+    return {
+        'entity_id': summary.entity_id, 'name': name, 'entity_type': entity_type,
+        'last_event_at': summary.last_event_at, 'last_location': summary.last_location,
+        'last_source_type': summary.last_source_type,
+        'events_today': events_today, 'events_window': events_window,
+        'sources_today': sources_today, 'sources_window': sources_window,
+        'open_alerts': summary.open_alerts,
+    }
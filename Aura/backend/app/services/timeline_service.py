@@ -1,10 +1,178 @@
-from ..models import Event
+import heapq
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from operator import attrgetter
 
-def get_timeline_for_entity(entity_id: int):
+from sqlalchemy import func, select, tuple_, union_all
+
+from ..database import replica_reads
+from ..event_archive import event_archive
+from ..models import db, Event
+from .pagination import Page, decode_cursor, encode_cursor
+
+# Columns of a merged timeline row when the caller does not choose them.
+TIMELINE_BATCH_COLUMNS = (Event.id, Event.entity_id, Event.timestamp, Event.location, Event.source_type,
+                          Event.description)
+
+@replica_reads()
+def get_timeline_for_entity(entity_id: int, since: datetime = None, until: datetime = None,
+                            limit: int = 100, cursor: str = None, changed_since: datetime = None, columns=None):
+    """
+    Retrieves one page of the event timeline for a specific entity.
+
+    Events are returned newest first and can be restricted to the half-open
+    window [since, until). Pages are addressed with an opaque keyset cursor on
+    (timestamp, id), so every page is a range scan of the
+    (entity_id, timestamp, id) index rather than a sort of the entity's history.
+    With `changed_since`, only events written or changed at or after that time
+    are returned. Pages reaching back past the archive horizon also include
+    archived events (see app.event_archive), merged in order. Reads are served
+    by the read replica when one is configured (see app.database).
+
+    When `columns` is given (it must include `timestamp` and `id`), only those
+    columns are selected and the page holds plain row tuples.
+
+    Returns a `Page` whose `next_cursor` is None on the last page.
+    """
+    query = db.session.query(*columns) if columns else Event.query
+    query = query.filter(Event.entity_id == entity_id)
+    if since is not None:
+        query = query.filter(Event.timestamp >= since)
+    if until is not None:
+        query = query.filter(Event.timestamp < until)
+    if changed_since is not None:
+        query = query.filter(Event.updated_at >= changed_since)
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        query = query.filter(tuple_(Event.timestamp, Event.id) < tuple_(*position))
+
+    rows = query.order_by(Event.timestamp.desc(), Event.id.desc()).limit(limit + 1).all()
+    return _page(_merge_runs([rows], limit, [entity_id], since, until, position, changed_since, columns), limit)
+
+
+@replica_reads()
+def get_timeline_for_entities(entity_ids, since: datetime = None, until: datetime = None,
+                              limit: int = 100, cursor: str = None, changed_since: datetime = None,
+                              columns=None):
+    """
+    Retrieves one page of the merged event timeline of several entities.
+
+    Each entity's page is read by its own branch of a single UNION ALL query:
+    a keyset range scan of the (entity_id, timestamp, id) index, stopped after
+    `limit` + 1 rows. The newest `limit` + 1 rows overall are among those, so
+    the per-entity runs are combined with a k-way merge (heapq.merge) instead
+    of sorting everything fetched. The cursor is the same (timestamp, id)
+    cursor as for a single timeline, since event IDs are unique across entities.
+    `changed_since` and archived events are handled as in `get_timeline_for_entity`.
+
+    When `columns` is given it must include `id`, `entity_id` and `timestamp`,
+    labelled with those names.
+
+    Returns a `Page` of row tuples, newest first, whose `next_cursor` is None
+    on the last page.
+    """
+    columns = columns or TIMELINE_BATCH_COLUMNS
+    position = decode_cursor(cursor) if cursor else None
+
+    branches = []
+    for entity_id in dict.fromkeys(entity_ids):
+        branch = select(*columns).where(Event.entity_id == entity_id)
+        if since is not None:
+            branch = branch.where(Event.timestamp >= since)
+        if until is not None:
+            branch = branch.where(Event.timestamp < until)
+        if changed_since is not None:
+            branch = branch.where(Event.updated_at >= changed_since)
+        if position:
+            branch = branch.where(tuple_(Event.timestamp, Event.id) < tuple_(*position))
+        # Wrapped in a subquery: SQLite does not accept ORDER BY/LIMIT on a compound member.
+        branch = branch.order_by(Event.timestamp.desc(), Event.id.desc()).limit(limit + 1).subquery()
+        branches.append(select(branch))
+    if not branches:
+        return Page([])
+
+    runs = defaultdict(list)
+    for row in db.session.execute(union_all(*branches)):
+        runs[row.entity_id].append(row)
+
+    # UNION ALL does not promise to keep each branch's order; re-sorting a run that
+    # is already in order is linear, so this costs nothing when it was kept.
+    for run in runs.values():
+        run.sort(key=_position, reverse=True)
+    rows = _merge_runs(runs.values(), limit, entity_ids, since, until, position, changed_since, columns)
+    return _page(rows, limit)
+
+
+_position = attrgetter('timestamp', 'id')
+
+
+def _merge_runs(runs, limit, entity_ids, since, until, position, changed_since, columns):
+    """
+    K-way merges newest-first runs of database rows into the first `limit` + 1
+    rows, folding in archived events when those rows reach the archive horizon.
+    """
+    rows = list(islice(heapq.merge(*runs, key=_position, reverse=True), limit + 1))
+    oldest = rows[-1].timestamp if len(rows) > limit else None
+    if not event_archive.covers(since, oldest):
+        return rows
+
+    archived = _archived_rows(event_archive.read(entity_ids, since=since, until=until, position=position,
+                                                 changed_since=changed_since, limit=limit + 1), columns)
+    merged = heapq.merge(rows, archived, key=_position, reverse=True)
+    return list(islice(_unique_ids(merged), limit + 1))
+
+
+def _unique_ids(rows):
+    # An event caught in both tiers by an interrupted archive run comes out twice, side by side.
+    previous = None
+    for row in rows:
+        if previous is None or row.id != previous.id:
+            yield row
+        previous = row
+
+
+def _archived_rows(events, columns):
+    """
+    Shapes archived event dicts like the database rows they are merged with.
+    """
+    if not columns:
+        return [Event(**event) for event in events]
+    row_type = _row_type(tuple(column.key for column in columns))
+    return [row_type(*(event[name] for name in row_type._fields)) for event in events]
+
+
+@lru_cache(maxsize=None)
+def _row_type(names):
+    return namedtuple('ArchivedEvent', names)
+
+
+def _page(rows, limit):
+    if len(rows) <= limit:
+        return Page(rows)
+    rows = rows[:limit]
+    return Page(rows, encode_cursor(rows[-1].timestamp, rows[-1].id))
+
+
+@replica_reads()
+def timeline_version(entity_ids):
     """
-    Retrieves the event timeline for a specific entity from the database.
+    Returns (entity_id, event count, latest event ID, latest `updated_at`) for
+    each of `entity_ids` that has events, in entity order.
 
-    This service function encapsulates the database query to fetch all event
-    records associated with a given entity_id, sorted by timestamp.
+    Read by one grouped query over the entities' index entries. Any commit
+    that adds, moves, archives or changes an entity's events changes this
+    value, so it identifies a version of their timelines cheaply enough to
+    serve ETags. `updated_at` alone would not: it is stamped before commit, so
+    a transaction committing after a newer one can add events without moving
+    the entity's latest `updated_at`, while it always moves the count.
     """
-    return Event.query.filter_by(entity_id=entity_id).order_by(Event.timestamp.desc()).all()
\ No newline at end of file
+    entity_ids = sorted(set(entity_ids))
+    if not entity_ids:
+        return []
+    return [tuple(row) for row in db.session.execute(
+        select(Event.entity_id, func.count(), func.max(Event.id), func.max(Event.updated_at))
+        .where(Event.entity_id.in_(entity_ids))
+        .group_by(Event.entity_id).order_by(Event.entity_id)
+    )]
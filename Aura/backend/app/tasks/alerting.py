@@ -1,58 +1,123 @@
 import logging
+import time
 from datetime import datetime, timedelta
-from celery import shared_task
-from ..models import db, Event, Entity, Alert
+from celery import chord, shared_task
+from flask import current_app
+from sqlalchemy import and_, exists, false, func, insert, literal, or_, select
+from ..cache import cache
+from ..models import db, Entity, Alert
+from ..services.alert_service import publish_alerts
+from ..services.summary_service import adjust_open_alerts
 
 log = logging.getLogger(__name__)
 
+# Celery tasks run inside the Flask app context pushed by celery_worker.ContextTask,
+# so they share the worker's app and engine instead of building their own per run.
+
 @shared_task(name='tasks.check_inactive_entities')
-def check_inactive_entities():
+def check_inactive_entities(threshold_hours=None, severity=None, shard_size=None):
     """
-    Queries for inactive entities and creates an Alert record for each one found.
+    Fans the inactivity scan out over entity-ID range shards.
+
+    Splits [min(id), max(id)] into ranges of `shard_size` IDs, runs
+    `scan_inactive_shard` for each range in parallel as a Celery chord, and lets
+    `merge_inactivity_results` report the outcome once every shard has finished.
+    All shards share one reference time so they agree on the cutoff.
+
+    :param threshold_hours: Hours without events before an entity counts as inactive.
+                            Defaults to the INACTIVITY_THRESHOLD_HOURS setting.
+    :param severity: Severity of the created alerts. Defaults to INACTIVITY_ALERT_SEVERITY.
+    :param shard_size: Entity IDs per shard. Defaults to INACTIVITY_SHARD_SIZE.
     """
-    from app import create_app
-    app = create_app()
-    with app.app_context():
-        log.info("Running periodic check for inactive entities...")
-
-        twelve_hours_ago = datetime.utcnow() - timedelta(hours=12)
-
-        last_event_subquery = db.session.query(
-            Event.entity_id,
-            db.func.max(Event.timestamp).label('last_event_ts')
-        ).group_by(Event.entity_id).subquery()
-
-        inactive_entities = db.session.query(
-            Entity
-        ).outerjoin(
-            last_event_subquery, Entity.id == last_event_subquery.c.entity_id
-        ).filter(
-            (last_event_subquery.c.last_event_ts < twelve_hours_ago) |
-            (last_event_subquery.c.last_event_ts == None)
-        ).all()
-
-        if not inactive_entities:
-            log.info("SUCCESS: No inactive entities found.")
-            return "Task completed. No inactive entities."
-
-        log.warning(f"ALERT: Found {len(inactive_entities)} inactive entities. Creating alerts...")
-        
-        for entity in inactive_entities:
-            # Check if an unacknowledged alert for this entity already exists to avoid duplicates
-            existing_alert = Alert.query.filter_by(entity_id=entity.id, is_acknowledged=False).first()
-            
-            if not existing_alert:
-                message = f"Entity '{entity.name}' has not been observed in the last 12 hours."
-                alert = Alert(
-                    entity_id=entity.id,
-                    severity='medium',
-                    message=message,
-                    is_acknowledged=False
-                )
-                db.session.add(alert)
-                log.info(f"Created alert for entity: {entity.name} (ID: {entity.id})")
-
-        db.session.commit()
-
-        return f"Task completed. {len(inactive_entities)} inactive entities processed."
+    log.info("Running periodic check for inactive entities...")
+
+    threshold_hours = threshold_hours or current_app.config['INACTIVITY_THRESHOLD_HOURS']
+    severity = severity or current_app.config['INACTIVITY_ALERT_SEVERITY']
+    shard_size = shard_size or current_app.config['INACTIVITY_SHARD_SIZE']
+
+    low, high = db.session.query(func.min(Entity.id), func.max(Entity.id)).one()
+    if low is None:
+        log.info("SUCCESS: No entities to check.")
+        return "Task completed. No entities."
+
+    now = datetime.utcnow().isoformat()
+    shards = [
+        scan_inactive_shard.s(start, min(start + shard_size, high + 1), now, threshold_hours, severity)
+        for start in range(low, high + 1, shard_size)
+    ]
+    chord(shards)(merge_inactivity_results.s(time.time()))
+
+    log.info(f"Dispatched {len(shards)} inactivity shards over entity IDs {low}-{high}.")
+    return f"Task dispatched. {len(shards)} shards."
+
+
+@shared_task(name='tasks.scan_inactive_shard')
+def scan_inactive_shard(id_start, id_end, now, threshold_hours, severity):
+    """
+    Creates inactivity alerts for entities with IDs in [id_start, id_end).
+
+    Inactivity is read from the maintained `Entity.last_seen_at` column, and all
+    missing alerts in the shard are created with a single INSERT ... SELECT that
+    skips entities which already have an unacknowledged alert.
+    """
+    started = time.perf_counter()
+    now = datetime.fromisoformat(now)
+    cutoff = now - timedelta(hours=threshold_hours)
+
+    open_alert_exists = exists().where(and_(Alert.entity_id == Entity.id, Alert.is_acknowledged == false()))
+    inactive_without_alert = select(
+        literal(now),
+        literal(severity),
+        literal("Entity '") + Entity.name + literal(f"' has not been observed in the last {threshold_hours:g} hours."),
+        false(),
+        Entity.id,
+        literal(datetime.utcnow()),  # INSERT ... SELECT does not apply Python-side column defaults
+    ).where(
+        Entity.id >= id_start,
+        Entity.id < id_end,
+        or_(Entity.last_seen_at < cutoff, Entity.last_seen_at.is_(None)),
+        ~open_alert_exists,
+    )
+
+    created = db.session.execute(
+        insert(Alert).from_select(
+            ['timestamp', 'severity', 'message', 'is_acknowledged', 'entity_id', 'updated_at'],
+            inactive_without_alert,
+        ).returning(Alert.id, Alert.entity_id)
+    ).all()
+    created_ids = [alert_id for alert_id, _ in created]
+    adjust_open_alerts(db.session.connection(), [entity_id for _, entity_id in created])
+    db.session.commit()
+    if created_ids:
+        cache.invalidate('alerts')
+        publish_alerts(created_ids)
+
+    return {
+        'shard': [id_start, id_end],
+        'created': len(created_ids),
+        'seconds': round(time.perf_counter() - started, 4),
+    }
+
+
+@shared_task(name='tasks.merge_inactivity_results')
+def merge_inactivity_results(shard_results, dispatched_at):
+    """
+    Chord callback: totals the alerts created by every shard and logs per-shard timings.
+    """
+    created = sum(r['created'] for r in shard_results)
+    wall_time = time.time() - dispatched_at
+
+    for r in sorted(shard_results, key=lambda r: r['shard']):
+        log.info(f"Shard {r['shard'][0]}-{r['shard'][1]}: {r['created']} alerts in {r['seconds']:.3f}s")
+
+    if created:
+        log.warning(f"ALERT: Created {created} inactivity alerts across {len(shard_results)} shards in {wall_time:.2f}s.")
+    else:
+        log.info(f"SUCCESS: No new inactive entities found across {len(shard_results)} shards in {wall_time:.2f}s.")
 
+    return {
+        'shards': len(shard_results),
+        'created': created,
+        'wall_seconds': round(wall_time, 4),
+        'slowest_shard_seconds': max((r['seconds'] for r in shard_results), default=0),
+    }
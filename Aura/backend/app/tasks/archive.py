@@ -0,0 +1,19 @@
+import logging
+from datetime import datetime
+from celery import shared_task
+from ..services.archive_service import archive_events
+
+log = logging.getLogger(__name__)
+
+
+@shared_task(name='tasks.archive_old_events')
+def archive_old_events(before=None):
+    """
+    Moves events older than the retention period into the Parquet archive.
+
+    :param before: ISO 8601 cutoff; defaults to midnight EVENT_RETENTION_DAYS ago.
+    """
+    return archive_events(
+        before=datetime.fromisoformat(before) if before else None,
+        progress=lambda archived: log.info(f"Archived {archived} events so far."),
+    )
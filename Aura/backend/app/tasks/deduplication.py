@@ -0,0 +1,21 @@
+import logging
+from celery import shared_task
+from ..services.deduplication_service import DeduplicationStats, find_duplicate_entities, merge_entities
+
+log = logging.getLogger(__name__)
+
+
+@shared_task(name='tasks.merge_duplicate_entities')
+def merge_duplicate_entities(threshold=None, dry_run=False):
+    """
+    Finds duplicate entities and merges each group into its oldest entity.
+
+    :param threshold: Minimum pair similarity. Defaults to DEDUP_MATCH_THRESHOLD.
+    :param dry_run: Only report the groups that would be merged.
+    """
+    stats = DeduplicationStats()
+    clusters = find_duplicate_entities(threshold=threshold, stats=stats)
+    if not dry_run:
+        merge_entities(clusters, stats=stats)
+    log.info(f"Duplicate merge{' (dry run)' if dry_run else ''}: {stats.summary()}")
+    return {'clusters': clusters if dry_run else len(clusters), 'merged': stats.merged}
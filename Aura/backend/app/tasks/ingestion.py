@@ -0,0 +1,111 @@
+import logging
+import os
+import socket
+import time
+from celery import shared_task
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+from ..event_stream import event_stream, entry_time
+from ..metrics import EVENT_BATCH_SIZE, EVENT_LAG, EVENTS_DROPPED, EVENTS_DUPLICATE, EVENTS_WRITTEN
+from ..models import db
+from ..services.ingestion_service import write_stream_events
+
+log = logging.getLogger(__name__)
+
+
+@shared_task(name='tasks.drain_event_stream')
+def drain_event_stream(max_seconds=None, batch_size=None, max_wait_ms=None):
+    """
+    Consumes the live event stream in micro-batches for up to `max_seconds`.
+
+    A batch is closed once it holds `batch_size` entries or `max_wait_ms` has
+    passed since its first entry arrived, whichever comes first. It is then
+    written in one transaction and acknowledged only after the commit, so a
+    crash mid-batch leaves the entries pending; they are reclaimed by the next
+    run (from any worker) once idle for EVENT_STREAM_CLAIM_IDLE_MS and
+    de-duplicated on their idempotency keys. Runs are scheduled back to back by
+    Celery Beat, and several can drain the stream in parallel.
+
+    :param max_seconds: How long to keep draining. Defaults to EVENT_STREAM_DRAIN_SECONDS.
+    :param batch_size: Maximum entries per batch. Defaults to EVENT_WRITE_BATCH_SIZE.
+    :param max_wait_ms: Maximum time to fill a batch. Defaults to EVENT_WRITE_MAX_WAIT_MS.
+    """
+    config = current_app.config
+    max_seconds = max_seconds or config['EVENT_STREAM_DRAIN_SECONDS']
+    batch_size = batch_size or config['EVENT_WRITE_BATCH_SIZE']
+    max_wait_ms = max_wait_ms or config['EVENT_WRITE_MAX_WAIT_MS']
+    consumer = f'{socket.gethostname()}-{os.getpid()}'
+    deadline = time.monotonic() + max_seconds
+    totals = {'batches': 0, 'written': 0, 'duplicates': 0, 'dropped': 0}
+
+    # Entries left behind by consumers that died before acknowledging them go first.
+    entries = event_stream.claim_stale(consumer, config['EVENT_STREAM_CLAIM_IDLE_MS'], batch_size)
+    while entries or time.monotonic() < deadline:
+        entries = entries or _collect_batch(consumer, batch_size, max_wait_ms, deadline)
+        if entries:
+            _write_batch(entries, totals)
+        entries = []
+
+    if totals['batches']:
+        log.info(f"Drained {totals['written']} events in {totals['batches']} batches "
+                 f"({totals['duplicates']} duplicates, {totals['dropped']} dropped).")
+    return totals
+
+
+def _collect_batch(consumer, batch_size, max_wait_ms, deadline):
+    """
+    Reads until the batch is full or `max_wait_ms` has passed since its first entry.
+    """
+    entries = event_stream.read(consumer, batch_size, _remaining_ms(deadline))
+    if not entries:
+        return entries
+    closes = min(time.monotonic() + max_wait_ms / 1000, deadline)
+    while len(entries) < batch_size and time.monotonic() < closes:
+        more = event_stream.read(consumer, batch_size - len(entries), _remaining_ms(closes))
+        if not more:
+            break
+        entries.extend(more)
+    return entries
+
+
+def _remaining_ms(until):
+    return max(1, int((until - time.monotonic()) * 1000))
+
+
+def _write_batch(entries, totals):
+    ids = [entry_id for entry_id, _ in entries]
+    try:
+        written, duplicates = write_stream_events(entries)
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        log.exception(f"Could not write a batch of {len(entries)} stream events; retrying them one by one.")
+        written, duplicates = _write_one_by_one(entries, totals)
+    event_stream.ack(ids)
+
+    totals['batches'] += 1
+    totals['written'] += written
+    totals['duplicates'] += duplicates
+    EVENT_BATCH_SIZE.observe(len(entries))
+    EVENTS_WRITTEN.inc(written)
+    EVENTS_DUPLICATE.inc(duplicates)
+    EVENT_LAG.observe(max(0.0, time.time() - entry_time(ids[0])))
+
+
+def _write_one_by_one(entries, totals):
+    # Isolates entries that can never be written (e.g. their entity was deleted without
+    # being merged into another) so they do not block the stream; they are logged and discarded.
+    written = duplicates = 0
+    for entry in entries:
+        try:
+            entry_written, entry_duplicates = write_stream_events([entry])
+            db.session.commit()
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            log.error(f"Dropping stream event {entry[0]} {entry[1]}: {exc}")
+            totals['dropped'] += 1
+            EVENTS_DROPPED.inc()
+            continue
+        written += entry_written
+        duplicates += entry_duplicates
+    return written, duplicates
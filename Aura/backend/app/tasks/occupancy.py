@@ -0,0 +1,30 @@
+import logging
+from datetime import datetime
+from celery import shared_task
+from ..services.occupancy_service import backfill_occupancy, prune_occupancy_presence
+
+log = logging.getLogger(__name__)
+
+
+@shared_task(name='tasks.backfill_occupancy')
+def backfill_occupancy_task(since=None, until=None):
+    """
+    Rebuilds the occupancy rollups for the UTC days overlapping [since, until).
+
+    :param since: ISO 8601 start of the window; defaults to the first event.
+    :param until: ISO 8601 end of the window; defaults to just after the last event.
+    """
+    days = backfill_occupancy(
+        since=datetime.fromisoformat(since) if since else None,
+        until=datetime.fromisoformat(until) if until else None,
+        progress=lambda day: log.info(f"Rebuilt occupancy for {day:%Y-%m-%d}."),
+    )
+    return {'days': days}
+
+
+@shared_task(name='tasks.prune_occupancy_presence')
+def prune_occupancy_presence_task():
+    """
+    Deletes the occupancy presence rows of buckets no live event adds to any more.
+    """
+    return {'deleted': prune_occupancy_presence()}
@@ -0,0 +1,22 @@
+import logging
+from celery import shared_task
+from ..services.archive_service import archive_expired_partitions
+from ..services.partition_service import ensure_partitions, split_default_partition
+
+log = logging.getLogger(__name__)
+
+
+@shared_task(name='tasks.maintain_event_partitions')
+def maintain_event_partitions():
+    """
+    Keeps the monthly partitions of the events table in shape: moves stray
+    events out of the default partition, creates the coming months' partitions,
+    and archives and drops partitions past the retention period.
+    """
+    # Splitting first empties the default partition, which creating partitions then scans.
+    moved = split_default_partition()
+    created = ensure_partitions()
+    expired = archive_expired_partitions()
+    log.info(f"Event partitions: {len(created)} created, {moved} events moved out of the default partition, "
+             f"{expired['dropped']} archived and dropped.")
+    return {'created': created, 'moved': moved, **expired}
@@ -0,0 +1,14 @@
+import logging
+from celery import shared_task
+from ..services.summary_service import roll_entity_summaries
+
+log = logging.getLogger(__name__)
+
+
+@shared_task(name='tasks.roll_entity_summaries')
+def roll_entity_summaries_task():
+    """
+    Moves the stored today and rolling-window event counts of the entity
+    summaries on to the new UTC day, so the summary list sorts by current counts.
+    """
+    return {'rolled': roll_entity_summaries()}
@@ -1,6 +1,10 @@
+import logging
 import os
 from app import create_app, db
+from app.metrics import clear_multiprocess_dir, mark_process_dead, metrics
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 
 def make_celery(app):
     """
@@ -11,9 +15,15 @@ def make_celery(app):
         app.import_name,
         backend=app.config['CELERY_RESULT_BACKEND'],
         broker=app.config['CELERY_BROKER_URL'],
-        include=['app.tasks.alerting'] # Tell Celery where to find tasks
+        include=['app.tasks.alerting', 'app.tasks.archive', 'app.tasks.deduplication', 'app.tasks.ingestion', 'app.tasks.occupancy', 'app.tasks.partitions', 'app.tasks.summaries'] # Tell Celery where to find tasks
+    )
+    # Only hand Celery its own settings, using the new lowercase names. Dumping the
+    # whole Flask config mixes old-style CELERY_* keys with the new-style keys set
+    # below, which Celery rejects with ImproperlyConfigured when it finalizes.
+    celery.conf.update(
+        broker_url=app.config['CELERY_BROKER_URL'],
+        result_backend=app.config['CELERY_RESULT_BACKEND'],
     )
-    celery.conf.update(app.config)
 
     # --- Configure the periodic task schedule (Celery Beat) ---
     celery.conf.beat_schedule = {
@@ -21,17 +31,81 @@ def make_celery(app):
             'task': 'tasks.check_inactive_entities',
             'schedule': 3600.0,  # Time in seconds (3600s = 1 hour)
         },
+        # Each run drains the live event stream for EVENT_STREAM_DRAIN_SECONDS, so
+        # consecutive runs keep it drained continuously. Runs not started within one
+        # interval are dropped instead of piling up behind a busy worker.
+        'drain-event-stream': {
+            'task': 'tasks.drain_event_stream',
+            'schedule': app.config['EVENT_STREAM_DRAIN_SECONDS'],
+            'options': {'expires': app.config['EVENT_STREAM_DRAIN_SECONDS']},
+        },
+        # Starts the entity summaries' event counts afresh just after midnight UTC.
+        'roll-entity-summaries-daily': {
+            'task': 'tasks.roll_entity_summaries',
+            'schedule': crontab(hour=0, minute=1),
+        },
+        # Forgets which entities were counted in occupancy buckets older than yesterday.
+        'prune-occupancy-presence-daily': {
+            'task': 'tasks.prune_occupancy_presence',
+            'schedule': crontab(hour=0, minute=15),
+        },
+        # Creates upcoming monthly event partitions and drops expired ones (PostgreSQL).
+        # Runs before the archive job, which then only has the current month's tail to move.
+        'maintain-event-partitions-daily': {
+            'task': 'tasks.maintain_event_partitions',
+            'schedule': crontab(hour=3, minute=0),
+        },
+        # Moves events past EVENT_RETENTION_DAYS into the Parquet archive once a day.
+        'archive-old-events-daily': {
+            'task': 'tasks.archive_old_events',
+            'schedule': crontab(hour=3, minute=30),
+        },
     }
     celery.conf.timezone = 'UTC'
 
+    # Every task runs inside the one Flask app created at worker start-up, so the
+    # app, its configuration and its SQLAlchemy engine are reused across task runs.
+    # Each run is timed and its SQL statements are attributed to it.
     class ContextTask(celery.Task):
         def __call__(self, *args, **kwargs):
-            with app.app_context():
+            with app.app_context(), metrics.track_task(self.name):
                 return self.run(*args, **kwargs)
 
     celery.Task = ContextTask
+
+    @worker_init.connect
+    def reset_metrics(**kwargs):
+        # Runs in the main worker process before the pool starts: metric files of
+        # the previous run's children would otherwise be reported forever.
+        clear_multiprocess_dir()
+
+    @worker_process_shutdown.connect
+    def retire_metrics(pid, **kwargs):
+        mark_process_dead(pid)
+
+    @worker_process_init.connect
+    def reset_engine_pool(**kwargs):
+        # Prefork children inherit the parent's connection pools; give each child
+        # its own connections instead of sharing sockets across processes.
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+    @worker_process_init.connect
+    def warm_resolution_index(**kwargs):
+        # Load identifier -> entity lookups once per worker process instead of on first use.
+        if not app.config['RESOLUTION_INDEX_WARM_ON_START']:
+            return
+        from app.services.resolution_service import resolution_index
+        with app.app_context():
+            try:
+                resolution_index.warm()
+            except Exception:
+                logging.getLogger(__name__).exception("Could not warm the resolution index; it will load on first use.")
+
     return celery
 
-# Create the Flask app and then the Celery instance
+# Create the Flask app and then the Celery instance. Workers run with the default
+# 'worker' PROCESS_ROLE; the beat service sets PROCESS_ROLE=beat.
 flask_app = create_app()
 celery = make_celery(flask_app)
\ No newline at end of file
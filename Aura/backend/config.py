@@ -26,6 +26,40 @@ class Config:
     # Disable SQLAlchemy event system to save resources as it's not needed by default
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Read replica connection string; when set, GET requests and timeline/entity reads use it
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL') or None
+
+    # Seconds reads stay on the primary after the replica could not be reached
+    DATABASE_REPLICA_RETRY_SECONDS = int(os.getenv('DATABASE_REPLICA_RETRY_SECONDS', 30))
+
+    # Kind of process the app runs in: 'api' (gunicorn), 'worker' (Celery workers, CLI commands)
+    # or 'beat'. Selects the connection pool settings below; run.py always uses 'api'.
+    PROCESS_ROLE = os.getenv('PROCESS_ROLE', 'worker')
+
+    # Connection pool per process role: connections kept open, extra connections allowed
+    # under load, seconds to wait for a free connection, and the PostgreSQL statement
+    # timeout in milliseconds (0 = none). API processes serve 16 request threads each;
+    # worker processes run one task at a time, and beat only schedules tasks.
+    DB_POOL_SETTINGS = {
+        role: {
+            'pool_size': int(os.getenv(f'DB_{role.upper()}_POOL_SIZE', pool_size)),
+            'max_overflow': int(os.getenv(f'DB_{role.upper()}_MAX_OVERFLOW', max_overflow)),
+            'pool_timeout': int(os.getenv(f'DB_{role.upper()}_POOL_TIMEOUT', pool_timeout)),
+            'statement_timeout_ms': int(os.getenv(f'DB_{role.upper()}_STATEMENT_TIMEOUT_MS', statement_timeout_ms)),
+        }
+        for role, (pool_size, max_overflow, pool_timeout, statement_timeout_ms) in {
+            'api': (16, 8, 10, 30000),
+            'worker': (2, 2, 30, 0),
+            'beat': (1, 0, 30, 0),
+        }.items()
+    }
+
+    # Test pooled connections before handing them out, replacing those the server dropped
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+    # Pooled connections older than this many seconds are replaced
+    DB_POOL_RECYCLE_SECONDS = int(os.getenv('DB_POOL_RECYCLE_SECONDS', 1800))
+
     # --- Celery (Background Task Queue) Settings ---
 
     # URL for the message broker (Redis)
@@ -33,3 +67,213 @@ class Config:
 
     # URL for the result backend (Redis)
     CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+
+    # --- Ingestion Settings ---
+
+    # Number of CSV rows read, resolved and written per transaction by the ingestion engine
+    INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 50000))
+
+    # --- API Pagination Settings ---
+
+    # Default and maximum number of rows returned per page by paginated endpoints
+    API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 100))
+    API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 1000))
+
+    # Maximum number of entities whose timelines one batch timeline request can merge
+    TIMELINE_BATCH_MAX_ENTITIES = int(os.getenv('TIMELINE_BATCH_MAX_ENTITIES', 50))
+
+    # --- Delta Sync Settings ---
+
+    # Sync watermarks are set this many seconds in the past, so rows written by transactions
+    # still in flight when a response was built are picked up by the next changed_since request
+    SYNC_WATERMARK_OVERLAP_SECONDS = float(os.getenv('SYNC_WATERMARK_OVERLAP_SECONDS', 60))
+
+    # --- Alerting Settings ---
+
+    # An entity with no events for this many hours is reported as inactive
+    INACTIVITY_THRESHOLD_HOURS = float(os.getenv('INACTIVITY_THRESHOLD_HOURS', 12))
+
+    # Severity assigned to inactivity alerts (e.g., low, medium, high, critical)
+    INACTIVITY_ALERT_SEVERITY = os.getenv('INACTIVITY_ALERT_SEVERITY', 'medium')
+
+    # Number of entity IDs scanned by each parallel inactivity shard task
+    INACTIVITY_SHARD_SIZE = int(os.getenv('INACTIVITY_SHARD_SIZE', 10000))
+
+    # --- Alert Rule Settings ---
+
+    # Rules evaluated against every batch of written events (comma-separated); empty disables them
+    ALERT_RULES = [name.strip() for name in os.getenv('ALERT_RULES', 'impossible_travel,after_hours,failed_swipes').split(',')
+                   if name.strip()]
+
+    # A rule raises at most one alert per entity within this many minutes (of event time)
+    ALERT_RULE_COOLDOWN_MINUTES = float(os.getenv('ALERT_RULE_COOLDOWN_MINUTES', 60))
+
+    # Events older than this many hours when written are not checked by the rules (0 checks all)
+    ALERT_RULE_MAX_EVENT_AGE_HOURS = float(os.getenv('ALERT_RULE_MAX_EVENT_AGE_HOURS', 24))
+
+    # Impossible travel: sightings at two different locations less than this many minutes apart
+    RULE_TRAVEL_MIN_MINUTES = float(os.getenv('RULE_TRAVEL_MIN_MINUTES', 5))
+    RULE_TRAVEL_SOURCE_TYPES = os.getenv('RULE_TRAVEL_SOURCE_TYPES', 'swipe')
+    RULE_TRAVEL_SEVERITY = os.getenv('RULE_TRAVEL_SEVERITY', 'high')
+
+    # After-hours access: events between START and END o'clock, local time (END < START spans midnight)
+    RULE_AFTER_HOURS_START = int(os.getenv('RULE_AFTER_HOURS_START', 22))
+    RULE_AFTER_HOURS_END = int(os.getenv('RULE_AFTER_HOURS_END', 6))
+    RULE_AFTER_HOURS_TIMEZONE = os.getenv('RULE_AFTER_HOURS_TIMEZONE', 'UTC')
+    RULE_AFTER_HOURS_SOURCE_TYPES = os.getenv('RULE_AFTER_HOURS_SOURCE_TYPES', 'swipe')
+    RULE_AFTER_HOURS_SEVERITY = os.getenv('RULE_AFTER_HOURS_SEVERITY', 'medium')
+
+    # Repeated failed swipes: COUNT events of these source types within WINDOW minutes
+    RULE_FAILED_SWIPE_SOURCE_TYPES = os.getenv('RULE_FAILED_SWIPE_SOURCE_TYPES', 'swipe_denied')
+    RULE_FAILED_SWIPE_COUNT = int(os.getenv('RULE_FAILED_SWIPE_COUNT', 5))
+    RULE_FAILED_SWIPE_WINDOW_MINUTES = float(os.getenv('RULE_FAILED_SWIPE_WINDOW_MINUTES', 10))
+    RULE_FAILED_SWIPE_SEVERITY = os.getenv('RULE_FAILED_SWIPE_SEVERITY', 'high')
+
+    # --- Response Cache Settings ---
+
+    # Redis instance used to cache serialized API responses. When unset, an
+    # in-process cache is used instead (suitable for tests and local runs).
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', os.getenv('REDIS_URL'))
+
+    # Seconds a cached response may be served before it is rebuilt
+    CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', 300))
+
+    # --- Identifier Resolution Settings ---
+
+    # Load the in-memory identifier -> entity index when a Celery worker process starts
+    RESOLUTION_INDEX_WARM_ON_START = os.getenv('RESOLUTION_INDEX_WARM_ON_START', 'true').lower() == 'true'
+
+    # Maximum number of identifiers accepted by a single POST /api/entity/resolve call
+    RESOLVE_MAX_BATCH = int(os.getenv('RESOLVE_MAX_BATCH', 10000))
+
+    # Maximum number of alert IDs accepted by a single PATCH /api/alert/bulk call
+    ALERT_BULK_MAX = int(os.getenv('ALERT_BULK_MAX', 10000))
+
+    # --- Live Alert Stream Settings ---
+
+    # Redis instance and channel used to push new alerts to Server-Sent Events clients.
+    # When unset, an in-process hub is used (only reaches clients of the same process).
+    ALERT_STREAM_REDIS_URL = os.getenv('ALERT_STREAM_REDIS_URL', os.getenv('REDIS_URL'))
+    ALERT_STREAM_CHANNEL = os.getenv('ALERT_STREAM_CHANNEL', 'aura:alerts')
+
+    # Seconds of silence before a keep-alive comment is sent
+    ALERT_STREAM_HEARTBEAT = float(os.getenv('ALERT_STREAM_HEARTBEAT', 15))
+
+    # Seconds a stream stays open before the client is asked to reconnect
+    ALERT_STREAM_MAX_SECONDS = float(os.getenv('ALERT_STREAM_MAX_SECONDS', 300))
+
+    # Client reconnection delay (milliseconds) and alerts read per query when replaying missed alerts on resume
+    ALERT_STREAM_RETRY_MS = int(os.getenv('ALERT_STREAM_RETRY_MS', 3000))
+    ALERT_STREAM_REPLAY_LIMIT = int(os.getenv('ALERT_STREAM_REPLAY_LIMIT', 1000))
+
+    # --- Live Event Ingestion Settings ---
+
+    # Redis stream that buffers events posted to /api/events, and the consumer group
+    # draining it. When unset, an in-process buffer is used (tests and local runs only).
+    EVENT_STREAM_REDIS_URL = os.getenv('EVENT_STREAM_REDIS_URL', os.getenv('REDIS_URL'))
+    EVENT_STREAM_KEY = os.getenv('EVENT_STREAM_KEY', 'aura:events')
+    EVENT_STREAM_GROUP = os.getenv('EVENT_STREAM_GROUP', 'aura:event-writers')
+
+    # Backpressure: posts are refused with 503 once this many events are waiting,
+    # and clients are asked to retry after this many seconds
+    EVENT_STREAM_MAX_BACKLOG = int(os.getenv('EVENT_STREAM_MAX_BACKLOG', 1000000))
+    EVENT_STREAM_RETRY_AFTER = int(os.getenv('EVENT_STREAM_RETRY_AFTER', 5))
+
+    # Maximum number of events accepted by a single POST /api/events call
+    EVENT_POST_MAX = int(os.getenv('EVENT_POST_MAX', 5000))
+
+    # Micro-batches are written once they hold this many events, or this many
+    # milliseconds after their first event arrived
+    EVENT_WRITE_BATCH_SIZE = int(os.getenv('EVENT_WRITE_BATCH_SIZE', 5000))
+    EVENT_WRITE_MAX_WAIT_MS = int(os.getenv('EVENT_WRITE_MAX_WAIT_MS', 500))
+
+    # Seconds each scheduled consumer run drains the stream for; runs are scheduled
+    # back to back, so this is also the beat interval
+    EVENT_STREAM_DRAIN_SECONDS = float(os.getenv('EVENT_STREAM_DRAIN_SECONDS', 5))
+
+    # Events left unacknowledged this long by a consumer are reclaimed by another one
+    EVENT_STREAM_CLAIM_IDLE_MS = int(os.getenv('EVENT_STREAM_CLAIM_IDLE_MS', 60000))
+
+    # --- Occupancy Settings ---
+
+    # Days covered by the occupancy endpoint when no 'since' is given
+    OCCUPANCY_DEFAULT_DAYS = int(os.getenv('OCCUPANCY_DEFAULT_DAYS', 7))
+
+    # Maximum number of rollup buckets returned by a single occupancy request
+    OCCUPANCY_MAX_BUCKETS = int(os.getenv('OCCUPANCY_MAX_BUCKETS', 10000))
+
+    # Days before today for which occupancy buckets remember the entities already counted; older ones are pruned
+    OCCUPANCY_PRESENCE_RETENTION_DAYS = int(os.getenv('OCCUPANCY_PRESENCE_RETENTION_DAYS', 1))
+
+    # --- Duplicate Entity Settings ---
+
+    # Minimum similarity (0-1) for two entities to be merged as duplicates
+    DEDUP_MATCH_THRESHOLD = float(os.getenv('DEDUP_MATCH_THRESHOLD', 0.9))
+
+    # Blocking keys shared by more entities than this (e.g. very common names) are not compared
+    DEDUP_MAX_BLOCK_SIZE = int(os.getenv('DEDUP_MAX_BLOCK_SIZE', 200))
+
+    # --- Entity Search Settings ---
+
+    # Shortest query the typeahead search answers; shorter queries return no matches
+    SEARCH_MIN_QUERY_LENGTH = int(os.getenv('SEARCH_MIN_QUERY_LENGTH', 2))
+
+    # Matches returned per search by default, and at most
+    SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', 10))
+    SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', 50))
+
+    # Without pg_trgm: seconds after which the in-process search index picks up changes it was not told about
+    SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv('SEARCH_INDEX_REFRESH_SECONDS', 5))
+
+    # --- Co-location Settings ---
+
+    # Minutes between two events at one location for them to count as together, by default
+    COLOCATION_DEFAULT_WINDOW_MINUTES = int(os.getenv('COLOCATION_DEFAULT_WINDOW_MINUTES', 15))
+
+    # Largest window a co-location request may ask for
+    COLOCATION_MAX_WINDOW_MINUTES = int(os.getenv('COLOCATION_MAX_WINDOW_MINUTES', 240))
+
+    # Days of the subject's history searched when no 'since' is given, and the longest range allowed
+    COLOCATION_DEFAULT_DAYS = int(os.getenv('COLOCATION_DEFAULT_DAYS', 7))
+    COLOCATION_MAX_DAYS = int(os.getenv('COLOCATION_MAX_DAYS', 31))
+
+    # --- Entity Summary Settings ---
+
+    # Days, today included, covered by the rolling event counts of the entity summaries
+    ENTITY_SUMMARY_WINDOW_DAYS = int(os.getenv('ENTITY_SUMMARY_WINDOW_DAYS', 7))
+
+    # --- Event Archive Settings ---
+
+    # Directory holding archived events as Parquet files; shared by the API and the workers
+    EVENT_ARCHIVE_PATH = os.getenv('EVENT_ARCHIVE_PATH', os.path.join(basedir, 'archive'))
+
+    # Events older than this many days are moved from the database to the archive
+    EVENT_RETENTION_DAYS = int(os.getenv('EVENT_RETENTION_DAYS', 180))
+
+    # Entity buckets each archived month is split into; fixed once the archive has files
+    EVENT_ARCHIVE_BUCKETS = int(os.getenv('EVENT_ARCHIVE_BUCKETS', 16))
+
+    # Events moved per delete/write/commit step of an archive run
+    EVENT_ARCHIVE_BATCH_SIZE = int(os.getenv('EVENT_ARCHIVE_BATCH_SIZE', 200000))
+
+    # --- Event Partition Settings ---
+
+    # Months after the current one that always have an events partition (PostgreSQL)
+    EVENT_PARTITION_MONTHS_AHEAD = int(os.getenv('EVENT_PARTITION_MONTHS_AHEAD', 3))
+
+    # Partition maintenance gives up after waiting this many milliseconds for a lock on events
+    EVENT_PARTITION_LOCK_TIMEOUT_MS = int(os.getenv('EVENT_PARTITION_LOCK_TIMEOUT_MS', 5000))
+
+    # --- Performance Metrics Settings ---
+
+    # SQL statements slower than this many milliseconds are counted, logged and sampled
+    METRICS_SLOW_QUERY_MS = float(os.getenv('METRICS_SLOW_QUERY_MS', 200))
+
+    # Number of recent slow-query samples kept per process (served at /metrics/slow-queries)
+    METRICS_SLOW_QUERY_SAMPLES = int(os.getenv('METRICS_SLOW_QUERY_SAMPLES', 50))
+
+    # Requests or tasks issuing more SQL statements than this are logged as possible N+1 patterns
+    METRICS_QUERY_COUNT_WARN = int(os.getenv('METRICS_QUERY_COUNT_WARN', 50))
+
+    # Add a Server-Timing header (database and total time) to every API response
+    METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'false').lower() == 'true'
@@ -0,0 +1,17 @@
+# Gunicorn settings for the API (`gunicorn --config gunicorn.conf.py run:app`, see the Dockerfile).
+from app.metrics import clear_multiprocess_dir, mark_process_dead
+
+bind = '0.0.0.0:5000'
+# Threaded workers keep long-lived Server-Sent Events connections (/api/alert/stream)
+# from tying up a whole process.
+worker_class = 'gthread'
+threads = 16
+
+
+def on_starting(server):
+    # Metric files of the previous run's workers would otherwise be reported forever.
+    clear_multiprocess_dir()
+
+
+def child_exit(server, worker):
+    mark_process_dead(worker.pid)
@@ -0,0 +1,30 @@
+"""events entity timeline index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 04:21:07.413259
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Composite index backing keyset pagination of /timeline/<entity_id>.
+    op.create_index(
+        'ix_events_entity_id_timestamp_id',
+        'events',
+        ['entity_id', sa.text('timestamp DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_events_entity_id_timestamp_id', table_name='events')
@@ -0,0 +1,34 @@
+"""entity last_seen_at
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 04:38:52.106214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('entities', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_entities_last_seen_at'), ['last_seen_at'], unique=False)
+
+    # Backfill from existing history; from here on the value is maintained on write.
+    op.execute(
+        'UPDATE entities SET last_seen_at = '
+        '(SELECT max(events.timestamp) FROM events WHERE events.entity_id = entities.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('entities', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_entities_last_seen_at'))
+        batch_op.drop_column('last_seen_at')
@@ -0,0 +1,38 @@
+"""alert feed indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 05:02:41.557310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    open_only = sa.text('is_acknowledged = false')
+    op.create_index(
+        'ix_alerts_open_timestamp_id', 'alerts', [sa.text('timestamp DESC'), sa.text('id DESC')],
+        unique=False, postgresql_where=open_only, sqlite_where=open_only,
+    )
+    op.create_index(
+        'ix_alerts_open_entity_id', 'alerts', ['entity_id'],
+        unique=False, postgresql_where=open_only, sqlite_where=open_only,
+    )
+    op.create_index(
+        'ix_alerts_entity_id_timestamp_id', 'alerts', ['entity_id', sa.text('timestamp DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_alerts_entity_id_timestamp_id', table_name='alerts')
+    op.drop_index('ix_alerts_open_entity_id', table_name='alerts')
+    op.drop_index('ix_alerts_open_timestamp_id', table_name='alerts')
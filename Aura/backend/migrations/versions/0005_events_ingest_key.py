@@ -0,0 +1,28 @@
+"""events ingest key
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 06:12:09.418233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ingest_key', sa.String(length=128), nullable=True))
+        batch_op.create_index('ux_events_ingest_key', ['ingest_key'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ux_events_ingest_key')
+        batch_op.drop_column('ingest_key')
@@ -0,0 +1,30 @@
+"""events location timestamp index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 07:21:09.448170
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Composite index backing the per-location time-window scans of the co-location service.
+    op.create_index(
+        'ix_events_location_timestamp_entity_id',
+        'events',
+        ['location', 'timestamp', 'entity_id'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_events_location_timestamp_entity_id', table_name='events')
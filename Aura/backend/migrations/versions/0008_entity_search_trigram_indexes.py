@@ -0,0 +1,40 @@
+"""entity search trigram indexes
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 08:02:57.118904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+# (index name, table, column) of the trigram indexes behind the typeahead search.
+TRIGRAM_INDEXES = [
+    ('ix_entities_name_trgm', 'entities', 'name'),
+    ('ix_entities_primary_email_trgm', 'entities', 'primary_email'),
+    ('ix_identifiers_value_trgm', 'identifiers', 'value'),
+]
+
+
+def upgrade():
+    # pg_trgm is PostgreSQL only; other databases use the in-process prefix index.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(name, table, [sa.text(f'lower({column}) gin_trgm_ops')], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, _ in reversed(TRIGRAM_INDEXES):
+        op.drop_index(name, table_name=table)
+    # The pg_trgm extension is left installed; other objects may depend on it.
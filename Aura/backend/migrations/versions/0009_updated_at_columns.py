@@ -0,0 +1,49 @@
+"""updated_at columns for delta sync
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 09:12:40.551307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+TABLES = ['entities', 'events', 'alerts']
+
+
+def upgrade():
+    # Existing rows are stamped with the upgrade time; new values are set by the application.
+    if op.get_bind().dialect.name == 'postgresql':
+        # A column added with a stable default is a catalog change on PostgreSQL 11+,
+        # so the events table is not rewritten.
+        for table in TABLES:
+            op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                           server_default=sa.text("timezone('utc', now())")))
+            op.alter_column(table, 'updated_at', server_default=None)
+    else:
+        # SQLite only adds NOT NULL columns with a constant default in place; a batch
+        # rebuild would drop the descending order of the existing indexes.
+        for table in TABLES:
+            op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                           server_default=sa.text("'1970-01-01 00:00:00'")))
+            op.execute(f'UPDATE {table} SET updated_at = CURRENT_TIMESTAMP')
+
+    op.create_index('ix_entities_updated_at', 'entities', ['updated_at'], unique=False)
+    op.create_index('ix_alerts_updated_at', 'alerts', ['updated_at'], unique=False)
+    op.create_index('ix_events_entity_id_updated_at', 'events', ['entity_id', 'updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_events_entity_id_updated_at', table_name='events')
+    op.drop_index('ix_alerts_updated_at', table_name='alerts')
+    op.drop_index('ix_entities_updated_at', table_name='entities')
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
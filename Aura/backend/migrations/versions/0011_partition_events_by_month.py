@@ -0,0 +1,111 @@
+"""partition events by month
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 12:21:44.870153
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+# Months after the current one given a partition up front; later ones are created by
+# the tasks.maintain_event_partitions beat task.
+MONTHS_AHEAD = 3
+
+# Secondary indexes of events, created on the partitioned table (and so on every partition).
+INDEXES = [
+    ('ix_events_timestamp', ['timestamp'], False),
+    ('ix_events_entity_id_timestamp_id', ['entity_id', sa.text('timestamp DESC'), sa.text('id DESC')], False),
+    ('ix_events_location_timestamp_entity_id', ['location', 'timestamp', 'entity_id'], False),
+    ('ix_events_entity_id_updated_at', ['entity_id', 'updated_at'], False),
+]
+
+COLUMNS = 'id, "timestamp", location, source_type, description, entity_id, ingest_key, updated_at'
+
+
+def upgrade():
+    # A unique index on a partitioned table must include the partition key, so live-event
+    # idempotency keys are unique per timestamp; a redelivered event carries both unchanged.
+    # SQLite is not partitioned but gets the same index, so ON CONFLICT targets match.
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ux_events_ingest_key', table_name='events')
+        op.create_index('ux_events_ingest_key', 'events', ['ingest_key', 'timestamp'], unique=True)
+        return
+
+    # Move the old table aside. Its indexes go now so their names can be reused; the
+    # table is only read from here on.
+    op.execute('ALTER TABLE events RENAME TO events_unpartitioned')
+    op.execute('ALTER TABLE events_unpartitioned DROP CONSTRAINT events_pkey')
+    for name, _, _ in INDEXES:
+        op.drop_index(name, table_name='events_unpartitioned')
+    op.drop_index('ux_events_ingest_key', table_name='events_unpartitioned')
+
+    op.execute(f'''
+        CREATE TABLE events (
+            id INTEGER NOT NULL DEFAULT nextval('events_id_seq'),
+            "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            location VARCHAR(255),
+            source_type VARCHAR(50) NOT NULL,
+            description TEXT,
+            entity_id INTEGER NOT NULL REFERENCES entities (id),
+            ingest_key VARCHAR(128),
+            updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        ) PARTITION BY RANGE ("timestamp")
+    ''')
+    # Catches events outside every monthly partition (e.g. a backfill of older history);
+    # maintenance moves them into partitions of their own.
+    op.execute('CREATE TABLE events_default PARTITION OF events DEFAULT')
+    # One partition per month from the oldest event to MONTHS_AHEAD months from now.
+    op.execute(f'''
+        DO $$
+        DECLARE
+            month_start timestamp := date_trunc('month', coalesce((SELECT min("timestamp") FROM events_unpartitioned), now()));
+            last_month timestamp := date_trunc('month', greatest(
+                (SELECT max("timestamp") FROM events_unpartitioned), now() + interval '{MONTHS_AHEAD} months'));
+        BEGIN
+            WHILE month_start <= last_month LOOP
+                EXECUTE 'CREATE TABLE ' || quote_ident('events_p' || to_char(month_start, 'YYYY_MM'))
+                    || ' PARTITION OF events FOR VALUES FROM (' || quote_literal(month_start)
+                    || ') TO (' || quote_literal(month_start + interval '1 month') || ')';
+                month_start := month_start + interval '1 month';
+            END LOOP;
+        END $$
+    ''')
+
+    # Copy before indexing; each partition's indexes are then built in one pass.
+    op.execute(f'INSERT INTO events ({COLUMNS}) SELECT {COLUMNS} FROM events_unpartitioned')
+    op.execute('ALTER TABLE events ADD CONSTRAINT events_pkey PRIMARY KEY (id, "timestamp")')
+    op.create_index('ux_events_ingest_key', 'events', ['ingest_key', 'timestamp'], unique=True)
+    for name, columns, unique in INDEXES:
+        op.create_index(name, 'events', columns, unique=unique)
+
+    # The id sequence belongs to the old table's column; hand it over before dropping it.
+    op.execute('ALTER SEQUENCE events_id_seq OWNED BY events.id')
+    op.execute('DROP TABLE events_unpartitioned')
+    op.execute('ANALYZE events')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ux_events_ingest_key', table_name='events')
+        op.create_index('ux_events_ingest_key', 'events', ['ingest_key'], unique=True)
+        return
+
+    op.execute('CREATE TABLE events_unpartitioned (LIKE events INCLUDING DEFAULTS)')
+    op.execute(f'INSERT INTO events_unpartitioned ({COLUMNS}) SELECT {COLUMNS} FROM events')
+    op.execute('ALTER SEQUENCE events_id_seq OWNED BY events_unpartitioned.id')
+    op.execute('DROP TABLE events')
+    op.execute('ALTER TABLE events_unpartitioned RENAME TO events')
+
+    op.execute('ALTER TABLE events ADD CONSTRAINT events_pkey PRIMARY KEY (id)')
+    op.create_foreign_key('events_entity_id_fkey', 'events', 'entities', ['entity_id'], ['id'])
+    op.create_index('ux_events_ingest_key', 'events', ['ingest_key'], unique=True)
+    for name, columns, unique in INDEXES:
+        op.create_index(name, 'events', columns, unique=unique)
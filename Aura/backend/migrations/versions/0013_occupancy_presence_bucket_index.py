@@ -0,0 +1,27 @@
+"""occupancy presence bucket index
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 16:20:44.093512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The primary key leads with granularity and location, so day rebuilds and the
+    # nightly prune, which select by bucket alone, need an index of their own.
+    op.create_index('ix_occupancy_presence_bucket', 'occupancy_presence', ['bucket'], unique=False)
+    # Existing presence rows of old buckets are deleted by the first `tasks.prune_occupancy_presence` run.
+
+
+def downgrade():
+    op.drop_index('ix_occupancy_presence_bucket', table_name='occupancy_presence')
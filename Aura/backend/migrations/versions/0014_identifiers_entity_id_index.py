@@ -0,0 +1,28 @@
+"""identifiers entity_id index
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 16:58:12.640731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Lets the search prefix index reload the identifiers of a few changed entities,
+    # and merges find the identifiers of the entities they merge, without a table scan.
+    with op.batch_alter_table('identifiers', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_identifiers_entity_id'), ['entity_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('identifiers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_identifiers_entity_id'))
@@ -0,0 +1,43 @@
+"""never reuse entity ids on sqlite
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-18 23:05:12.318840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0017'
+down_revision = '0016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite hands out max(id) + 1, so a merged entity holding the highest ID had it reused by
+    # the next new entity, and entity_aliases then redirected that entity's events to the
+    # survivor. PostgreSQL sequences never go back, and are left alone.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # Aliases of IDs that were handed out again describe the new entity, not a merged one.
+    op.execute('DELETE FROM entity_aliases WHERE merged_id IN (SELECT id FROM entities)')
+    with op.batch_alter_table('entities', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+    # Start above every ID used so far, merged ones included.
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'entities'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'entities', max(id) FROM "
+        "(SELECT coalesce(max(id), 0) AS id FROM entities UNION ALL SELECT max(merged_id) FROM entity_aliases)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('entities', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
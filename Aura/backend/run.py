@@ -0,0 +1,8 @@
+from app import create_app
+
+# WSGI entry point for gunicorn (`run:app`, see the Dockerfile). Serves the API,
+# so the app is configured with the 'api' process role's connection pools.
+app = create_app(role='api')
+
+if __name__ == '__main__':
+    app.run()
@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# -- Path Setup --
+# Makes the script runnable from the backend directory, like seed_database.py.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# -- End Path Setup --
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the co-location service against a naive self-join of the events table.")
+    parser.add_argument('--events', type=int, default=2_000_000, help="Events to generate.")
+    parser.add_argument('--entities', type=int, default=20_000, help="Entities the events are spread over.")
+    parser.add_argument('--locations', type=int, default=300, help="Distinct locations.")
+    parser.add_argument('--days', type=int, default=30, help="Days of activity the events are spread over.")
+    parser.add_argument('--range-days', type=int, default=7, help="Days of each subject's history searched.")
+    parser.add_argument('--window', type=int, default=15, help="Co-location window in minutes.")
+    parser.add_argument('--subjects', type=int, default=20, help="Subjects to look up.")
+    parser.add_argument('--naive-subjects', type=int, default=3,
+                        help="Subjects also looked up with the naive self-join (0 to skip it; it is slow).")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the generated data.")
+    parser.add_argument('--database-url',
+                        help="Database to benchmark against, e.g. a local PostgreSQL. ALL TABLES IN IT ARE DROPPED. "
+                             "Defaults to a throwaway SQLite file.")
+    parser.add_argument('--output', help="Optional path of a JSON results file.")
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# Must be set before the app config is imported.
+os.environ['DATABASE_URL'] = args.database_url or \
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='aura-bench-'), 'bench.db')}"
+
+from sqlalchemy import insert, text
+
+from app import create_app
+from app.models import db, Entity, Event
+from app.services.colocation_service import find_colocated_entities
+
+START = datetime(2023, 10, 1)
+INSERT_CHUNK = 100_000
+
+# The co-location question answered by joining each of the subject's events to every
+# event at the same location, as a query would without the windowing done by the service.
+NAIVE_QUERIES = {
+    'postgresql': """
+        SELECT o.entity_id, count(*) FROM events s
+        JOIN events o ON o.location = s.location
+                     AND o.timestamp BETWEEN s.timestamp - make_interval(mins => :window)
+                                         AND s.timestamp + make_interval(mins => :window)
+        WHERE s.entity_id = :entity_id AND o.entity_id <> :entity_id
+          AND s.timestamp >= :since AND s.timestamp < :until
+        GROUP BY o.entity_id
+    """,
+    'sqlite': """
+        SELECT o.entity_id, count(*) FROM events s
+        JOIN events o ON o.location = s.location
+                     AND abs(julianday(o.timestamp) - julianday(s.timestamp)) * 1440 <= :window
+        WHERE s.entity_id = :entity_id AND o.entity_id <> :entity_id
+          AND s.timestamp >= :since AND s.timestamp < :until
+        GROUP BY o.entity_id
+    """,
+}
+
+
+def populate(rng):
+    """
+    Bulk inserts entities and events. Each entity keeps to a handful of favourite
+    locations and is active during the day, so locations see realistic clusters.
+    """
+    db.session.execute(insert(Entity), [
+        {'name': f'Entity {i}', 'entity_type': 'student'} for i in range(1, args.entities + 1)
+    ])
+    favourites = rng.integers(0, args.locations, size=(args.entities, 5))
+    written = 0
+    while written < args.events:
+        size = min(INSERT_CHUNK, args.events - written)
+        entity_index = rng.integers(0, args.entities, size=size)
+        locations = favourites[entity_index, rng.integers(0, 5, size=size)]
+        seconds = rng.integers(0, args.days, size=size) * 86400 + rng.integers(7 * 3600, 22 * 3600, size=size)
+        db.session.execute(insert(Event), [
+            {'entity_id': int(entity) + 1, 'timestamp': START + timedelta(seconds=int(offset)),
+             'location': f'Building {location}', 'source_type': 'swipe'}
+            for entity, location, offset in zip(entity_index, locations, seconds)
+        ])
+        db.session.commit()
+        written += size
+        print(f"Inserted {written}/{args.events} events...")
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'runs': len(timings),
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        'max_ms': round(timings[-1], 2),
+    }
+
+
+def main():
+    rng = np.random.default_rng(args.seed)
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        # Loading tens of millions of rows is much faster with the event indexes built afterwards.
+        indexes = sorted(Event.__table__.indexes, key=lambda index: index.name)
+        for index in indexes:
+            index.drop(db.engine)
+        populate(rng)
+        for index in indexes:
+            index.create(db.engine)
+        print(f"Populated in {time.perf_counter() - started:.1f}s")
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text('ANALYZE events'))
+            db.session.commit()
+
+        since = START + timedelta(days=args.days // 2)
+        until = since + timedelta(days=args.range_days)
+        window = timedelta(minutes=args.window)
+        subjects = [int(s) for s in rng.choice(np.arange(1, args.entities + 1), size=args.subjects, replace=False)]
+
+        service_timings, contacts = [], []
+        for subject in subjects:
+            (found, _), elapsed = timed(lambda: find_colocated_entities(subject, since, until, window, limit=100))
+            service_timings.append(elapsed)
+            contacts.append(len(found))
+
+        naive_timings, mismatches = [], 0
+        naive_sql = text(NAIVE_QUERIES[db.engine.dialect.name])
+        for subject in subjects[:args.naive_subjects]:
+            rows, elapsed = timed(lambda: db.session.execute(naive_sql, {
+                'entity_id': subject, 'since': since, 'until': until, 'window': args.window,
+            }).all())
+            naive_timings.append(elapsed)
+            found, _ = find_colocated_entities(subject, since, until, window, limit=args.entities)
+            mismatches += {row[0] for row in rows} != {contact['entity_id'] for contact in found}
+
+        results = {
+            'dialect': db.engine.dialect.name,
+            'events': args.events,
+            'entities': args.entities,
+            'locations': args.locations,
+            'window_minutes': args.window,
+            'range_days': args.range_days,
+            'median_contacts': statistics.median(contacts),
+            'service': summarize(service_timings),
+        }
+        if naive_timings:
+            results['naive_self_join'] = summarize(naive_timings)
+            results['contact_set_mismatches'] = mismatches
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# -- Path Setup --
+# Makes the script runnable from the backend directory, like seed_database.py.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# -- End Path Setup --
+
+# The benchmark always runs against a throwaway SQLite database so it can never
+# touch a real deployment. This must be set before the app config is imported.
+_workdir = tempfile.mkdtemp(prefix='aura-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'bench.db')}"
+
+from flask_restx import marshal
+from sqlalchemy import insert
+
+from app import create_app
+from app.api.dto import EntityDto, EventDto, AlertDto
+from app.api.serializers import entity_serializer, event_serializer, alert_serializer
+from app.models import db, Entity, Event, Alert
+from app.services.alert_service import get_alert_feed
+from app.services.resolution_service import get_all_entities
+from app.services.timeline_service import get_timeline_for_entity
+
+
+def populate(entities, events_per_entity, alerts):
+    """
+    Bulk inserts synthetic entities, events for the first entity and alerts.
+    """
+    start = datetime(2023, 10, 1)
+    db.session.execute(insert(Entity), [
+        {'name': f'Entity {i}', 'entity_type': 'student', 'primary_email': f'entity{i}@university.edu'}
+        for i in range(1, entities + 1)
+    ])
+    db.session.execute(insert(Event), [
+        {'entity_id': 1, 'timestamp': start + timedelta(minutes=i), 'location': f'Building {i % 40}',
+         'source_type': 'swipe', 'description': f'Card swipe at Building {i % 40}.'}
+        for i in range(events_per_entity)
+    ])
+    db.session.execute(insert(Alert), [
+        {'entity_id': random.randint(1, entities), 'timestamp': start + timedelta(seconds=i),
+         'severity': 'medium', 'message': f'Synthetic alert {i}.', 'is_acknowledged': False}
+        for i in range(alerts)
+    ])
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    """
+    Returns the best wall-clock time of `repeat` runs, in milliseconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run(args):
+    cases = {
+        'entities': (
+            lambda: json.dumps(marshal(get_all_entities(), EntityDto.entity, envelope='entities')),
+            lambda: entity_serializer.dumps(get_all_entities(columns=entity_serializer.columns), 'entities'),
+        ),
+        'timeline': (
+            lambda: json.dumps({'events': marshal(get_timeline_for_entity(1, limit=args.page_size).items, EventDto.event)}),
+            lambda: event_serializer.dumps(
+                get_timeline_for_entity(1, limit=args.page_size, columns=event_serializer.columns).items, 'events'),
+        ),
+        'alerts': (
+            lambda: json.dumps({'alerts': marshal(get_alert_feed(limit=args.page_size).items, AlertDto.alert)}),
+            lambda: alert_serializer.dumps(
+                get_alert_feed(limit=args.page_size, columns=alert_serializer.columns).items, 'alerts'),
+        ),
+    }
+
+    results = {}
+    for name, (baseline, fast) in cases.items():
+        marshal_ms = timed(baseline, args.repeat)
+        fast_ms = timed(fast, args.repeat)
+        results[name] = {
+            'marshal_ms': round(marshal_ms, 2),
+            'fast_ms': round(fast_ms, 2),
+            'speedup': round(marshal_ms / fast_ms, 2) if fast_ms else None,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare marshal() against the column-only fast serializers.")
+    parser.add_argument('--entities', type=int, default=20000, help="Number of entities to generate.")
+    parser.add_argument('--events', type=int, default=5000, help="Number of events for the benchmarked timeline.")
+    parser.add_argument('--alerts', type=int, default=5000, help="Number of alerts to generate.")
+    parser.add_argument('--page-size', type=int, default=1000, help="Page size for the timeline and alert feeds.")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per case; the best time is reported.")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        populate(args.entities, args.events, args.alerts)
+        results = run(args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'endpoint':<10} {'marshal (ms)':>14} {'fast (ms)':>12} {'speedup':>9}")
+    for name, result in results.items():
+        print(f"{name:<10} {result['marshal_ms']:>14.2f} {result['fast_ms']:>12.2f} {result['speedup']:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# -- Path Setup --
+# Makes the script runnable from the backend directory, like seed_database.py.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# -- End Path Setup --
+
+# Entity counts per dataset size: (students, staff, assets).
+SIZES = {
+    'small': (1000, 100, 50),
+    'medium': (10000, 1000, 500),
+    'large': (100000, 10000, 5000),
+}
+
+# Feeds in the order they must be ingested: entities before the events that reference them.
+INGEST_ORDER = ['students', 'staff', 'assets', 'swipes', 'wifi', 'library']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="End-to-end benchmark of ingestion, the list endpoints and the inactivity task.")
+    parser.add_argument('--sizes', default='small,medium',
+                        help=f"Comma-separated dataset sizes to run ({', '.join(SIZES)}).")
+    parser.add_argument('--days', type=int, default=7, help="Days of generated activity per dataset.")
+    parser.add_argument('--events-per-day', type=float, default=6.0, help="Average events per person per day.")
+    parser.add_argument('--repeat', type=int, default=20, help="Requests per endpoint measurement.")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the generated data.")
+    parser.add_argument('--database-url',
+                        help="Database to benchmark against, e.g. a local PostgreSQL. ALL TABLES IN IT ARE DROPPED. "
+                             "Defaults to a throwaway SQLite file.")
+    parser.add_argument('--output', default='benchmark_results.json', help="Path of the JSON results file.")
+    return parser.parse_args()
+
+
+args = parse_args()
+_workdir = tempfile.mkdtemp(prefix='aura-bench-')
+
+# Point the app and Celery at the benchmark database and run tasks in-process.
+# These must be set before the app config is imported.
+os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(_workdir, 'bench.db')}"
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+from celery_worker import celery, flask_app as app
+from app.cache import cache
+from app.models import db, Entity, Event, Alert
+from app.services.ingestion_service import ingest_file
+from app.tasks.alerting import check_inactive_entities
+from generate_synthetic_data import generate
+
+celery.conf.task_always_eager = True
+celery.conf.task_eager_propagates = True
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=project_root,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain'], cwd=project_root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {'commit': revision, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def measure(client, url, repeat, before=None):
+    """
+    Requests `url` `repeat` times and returns latency percentiles in milliseconds.
+    `before` runs ahead of every request, outside the timed section.
+    """
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}: {response.data[:200]!r}")
+    timings.sort()
+    return {
+        'url': url,
+        'requests': repeat,
+        'bytes': len(response.data),
+        'min_ms': round(timings[0], 2),
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+    }
+
+
+def run_size(name):
+    students, staff, assets = SIZES[name]
+    data_dir = os.path.join(_workdir, name)
+    print(f"[{name}] generating {students} students, {staff} staff, {assets} assets over {args.days} days...")
+    started = time.perf_counter()
+    files = generate(data_dir, students=students, staff=staff, assets=assets, days=args.days,
+                     events_per_day=args.events_per_day, seed=args.seed)
+    generated = time.perf_counter() - started
+
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    cache.invalidate('entities', 'alerts')
+
+    # --- Ingestion ---
+    ingest = {}
+    for source in INGEST_ORDER:
+        path, rows = files[source]
+        # Bulk loads of generated history; the rules would alert on all of it.
+        stats = ingest_file(source, path, evaluate_rules=False)
+        ingest[source] = {
+            'rows': rows,
+            'written': stats.rows_written,
+            'seconds': round(stats.elapsed, 3),
+            'rows_per_second': round(stats.rows_per_second),
+        }
+        print(f"[{name}] {stats.summary()}")
+
+    # --- Inactivity task ---
+    started = time.perf_counter()
+    check_inactive_entities.delay()
+    inactivity = {
+        'seconds': round(time.perf_counter() - started, 3),
+        'alerts_created': db.session.query(Alert).count(),
+    }
+    print(f"[{name}] inactivity scan: {inactivity['alerts_created']} alerts in {inactivity['seconds']}s")
+
+    # --- Endpoints ---
+    client = app.test_client()
+    busiest = db.session.query(Event.entity_id).group_by(Event.entity_id) \
+        .order_by(db.func.count().desc()).limit(1).scalar()
+    deep_cursor = None
+    for _ in range(5):
+        page = client.get(f'/api/timeline/{busiest}?limit=20' + (f'&cursor={deep_cursor}' if deep_cursor else '')).get_json()
+        deep_cursor = page['next_cursor'] or deep_cursor
+
+    endpoints = {
+        'entity_list_cold': measure(client, '/api/entity', args.repeat, before=lambda: cache.invalidate('entities')),
+        'entity_list_warm': measure(client, '/api/entity', args.repeat),
+        'timeline_first_page': measure(client, f'/api/timeline/{busiest}', args.repeat),
+        'timeline_deep_page': measure(client, f'/api/timeline/{busiest}?limit=20&cursor={deep_cursor}', args.repeat),
+        'alert_feed_cold': measure(client, '/api/alert/?is_acknowledged=false', args.repeat,
+                                   before=lambda: cache.invalidate('alerts')),
+        'alert_feed_warm': measure(client, '/api/alert/?is_acknowledged=false', args.repeat),
+        'colocation': measure(client, f'/api/entity/{busiest}/colocated?limit=50', args.repeat),
+    }
+    for endpoint, result in endpoints.items():
+        print(f"[{name}] {endpoint}: median {result['median_ms']}ms, p95 {result['p95_ms']}ms")
+
+    return {
+        'size': name,
+        'entities': db.session.query(Entity).count(),
+        'events': db.session.query(Event).count(),
+        'generate_seconds': round(generated, 3),
+        'ingest': ingest,
+        'inactivity': inactivity,
+        'endpoints': endpoints,
+    }
+
+
+def main():
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = set(sizes) - set(SIZES)
+    if unknown:
+        sys.exit(f"Unknown sizes: {', '.join(sorted(unknown))}. Choose from {', '.join(SIZES)}.")
+
+    with app.app_context():
+        results = {
+            'meta': {
+                **git_revision(),
+                'started_at': datetime.utcnow().isoformat(),
+                'dialect': db.engine.dialect.name,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'days': args.days,
+                'events_per_day': args.events_per_day,
+                'seed': args.seed,
+            },
+            'runs': [run_size(size) for size in sizes],
+        }
+
+    with open(args.output, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
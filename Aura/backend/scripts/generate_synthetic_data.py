@@ -0,0 +1,213 @@
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# -- Path Setup --
+# Makes the script runnable from the backend directory, like seed_database.py.
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+# -- End Path Setup --
+
+from app.services.ingestion_service import TIMESTAMP_FORMAT
+
+# --- Vocabulary ---
+FIRST_NAMES = [
+    'Alice', 'Bob', 'Charlie', 'Diana', 'Edward', 'Fatima', 'George', 'Hannah', 'Ibrahim', 'Julia',
+    'Kenji', 'Laura', 'Mohammed', 'Nina', 'Oscar', 'Priya', 'Quentin', 'Rosa', 'Samuel', 'Tara',
+    'Umar', 'Valentina', 'William', 'Xin', 'Yusuf', 'Zoe', 'Arjun', 'Mei', 'Lucas', 'Amara',
+]
+LAST_NAMES = [
+    'Johnson', 'Williams', 'Brown', 'Prince', 'Nygma', 'Khan', 'Garcia', 'Muller', 'Rossi', 'Tanaka',
+    'Singh', 'Okafor', 'Nguyen', 'Kowalski', 'Silva', 'Sharma', 'Dubois', 'Haddad', 'Larsen', 'Chen',
+]
+DEPARTMENTS = ['History', 'Computer Science', 'Physics', 'Mathematics', 'Biology', 'Facilities', 'Administration']
+ASSET_KINDS = ['Projector', 'Laptop', 'Tablet', 'Camera', 'Microscope', '3D Printer']
+BUILDINGS = [
+    'Main Library', 'Science Building', 'Engineering Hall', 'Student Union', 'Cafeteria', 'Gymnasium',
+    'Arts Center', 'History Building', 'Staff Lounge', 'Residence Hall A', 'Residence Hall B', 'Medical Center',
+]
+LIBRARIES = ['Main Library', 'Science Library', 'Law Library']
+BOOK_TITLES = [
+    'The Great Gatsby', 'Data Structures in Python', 'A Brief History of Time', 'Organic Chemistry',
+    'Linear Algebra Done Right', 'The Art of Computer Programming', 'Pride and Prejudice', 'Principles of Economics',
+]
+
+SWIPE_LOCATIONS = np.array([f'{building} Entrance' for building in BUILDINGS], dtype=object)
+AP_LOCATIONS = np.array([f"{building.replace(' ', '_')}_AP{n}" for building in BUILDINGS for n in range(1, 4)], dtype=object)
+
+# Share of each person's daily events that come from each feed. Library checkouts
+# are only generated for students; staff get the remainder as swipes.
+SOURCE_MIX = {'swipes': 0.5, 'wifi': 0.45, 'library': 0.05}
+
+# Events are spread over waking hours, peaking around midday.
+DAY_MEAN_HOUR = 13.0
+DAY_STDDEV_HOURS = 3.5
+
+
+def _names(rng, count):
+    first = rng.choice(FIRST_NAMES, count)
+    last = rng.choice(LAST_NAMES, count)
+    return pd.Series(first, dtype=object) + ' ' + pd.Series(last, dtype=object)
+
+
+def _people(rng, count, prefix, id_prefix, card_offset):
+    numbers = pd.Series(np.arange(1, count + 1)).astype(str).str.zfill(7)
+    names = _names(rng, count)
+    return pd.DataFrame({
+        id_prefix: prefix + numbers,
+        'name': names,
+        'email': names.str.lower().str.replace(' ', '.', regex=False) + '.' + prefix.lower() + numbers + '@university.edu',
+        'card_id': 'C' + pd.Series(np.arange(1, count + 1) + card_offset).astype(str),
+    })
+
+
+def _activity_weights(rng, count):
+    # A few people are on campus far more often than others.
+    weights = rng.lognormal(mean=0.0, sigma=0.75, size=count)
+    return weights / weights.sum()
+
+
+def _timestamps(rng, day_start, count, end):
+    hours = rng.normal(DAY_MEAN_HOUR, DAY_STDDEV_HOURS, count)
+    # Nobody is on campus overnight; redraw those uniformly over the open hours.
+    closed = (hours < 6.0) | (hours > 23.5)
+    hours[closed] = rng.uniform(6.0, 23.5, closed.sum())
+    stamps = pd.Timestamp(day_start) + pd.to_timedelta(np.round(hours * 3600), unit='s')
+    return stamps, stamps <= pd.Timestamp(end)
+
+
+def generate(output_dir, students=1000, staff=100, assets=50, days=7, events_per_day=6.0,
+             inactive_fraction=0.02, seed=42, end=None, progress=None):
+    """
+    Writes a synthetic campus dataset as CSV files in the layout of the ingestion SOURCES.
+
+    Students, staff and assets are generated first; swipe, Wi-Fi and library
+    events are then written one day at a time so memory use is bounded by a
+    single day of activity. Each person produces on average `events_per_day`
+    events, skewed so that some people are much busier than others, and
+    `inactive_fraction` of them stop appearing two days before `end` so the
+    inactivity task has work to do.
+
+    :returns: A dict mapping each source name to (path, row count), in ingestion order.
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    first_day = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    os.makedirs(output_dir, exist_ok=True)
+    files = {}
+
+    def write(source, frame, header=True):
+        path = os.path.join(output_dir, f'{source}.csv')
+        frame.to_csv(path, index=False, header=header, mode='w' if header else 'a')
+        _, count = files.get(source, (path, 0))
+        files[source] = (path, count + len(frame))
+
+    # --- Entities ---
+    student_rows = _people(rng, students, 'S', 'student_id', 100000000)
+    staff_rows = _people(rng, staff, 'T', 'staff_id', 200000000)
+    staff_rows['department'] = rng.choice(DEPARTMENTS, staff)
+    asset_numbers = pd.Series(np.arange(1, assets + 1)).astype(str).str.zfill(6)
+    asset_rows = pd.DataFrame({
+        'asset_tag': 'A' + asset_numbers,
+        'name': pd.Series(rng.choice(ASSET_KINDS, assets), dtype=object) + ' ' + asset_numbers,
+        'device_hash': 'hash_asset_' + asset_numbers,
+    })
+    write('students', student_rows)
+    write('staff', staff_rows)
+    write('assets', asset_rows)
+
+    # --- People shared by the event feeds ---
+    people = pd.concat([
+        student_rows[['card_id', 'email']].assign(student_id=student_rows['student_id']),
+        staff_rows[['card_id', 'email']].assign(student_id=None),
+    ], ignore_index=True)
+    is_student = people['student_id'].notna().to_numpy()
+    weights = _activity_weights(rng, len(people))
+    inactive = rng.random(len(people)) < inactive_fraction
+    devices = np.array(['phone', 'laptop'], dtype=object)
+
+    # --- Events, one day at a time ---
+    for day in range(days + 1):
+        day_start = first_day + timedelta(days=day)
+        if day_start > end:
+            break
+        day_weights = weights.copy()
+        if day_start >= end - timedelta(days=2):
+            day_weights[inactive] = 0.0
+        day_weights /= day_weights.sum()
+        total = rng.poisson(events_per_day * len(people))
+
+        for source, share in SOURCE_MIX.items():
+            count = rng.poisson(total * share)
+            who = rng.choice(len(people), count, p=day_weights)
+            if source == 'library':
+                who = who[is_student[who]]
+            elif source == 'swipes':
+                # Staff do not borrow books; their share of library activity becomes swipes.
+                extra = rng.choice(len(people), rng.poisson(total * SOURCE_MIX['library']), p=day_weights)
+                who = np.concatenate([who, extra[~is_student[extra]]])
+            stamps, keep = _timestamps(rng, day_start, len(who), end)
+            who, stamps = who[keep], stamps[keep]
+            order = np.argsort(stamps.to_numpy(), kind='stable')
+            who, stamps = who[order], stamps[order].strftime(TIMESTAMP_FORMAT)
+            selected = people.iloc[who]
+
+            if source == 'swipes':
+                frame = pd.DataFrame({
+                    'card_id': selected['card_id'].to_numpy(),
+                    'timestamp': stamps,
+                    'location_name': rng.choice(SWIPE_LOCATIONS, len(who)),
+                })
+            elif source == 'wifi':
+                handles = selected['email'].str.split('@').str[0].to_numpy()
+                frame = pd.DataFrame({
+                    'device_hash': 'hash_' + handles + '_' + rng.choice(devices, len(who)),
+                    'user_email': selected['email'].to_numpy(),
+                    'ap_location': rng.choice(AP_LOCATIONS, len(who)),
+                    'timestamp': stamps,
+                })
+            else:
+                frame = pd.DataFrame({
+                    'student_id': selected['student_id'].to_numpy(),
+                    'book_title': rng.choice(BOOK_TITLES, len(who)),
+                    'checkout_timestamp': stamps,
+                    'location': rng.choice(LIBRARIES, len(who)),
+                })
+            write(source, frame, header=source not in files)
+
+        if progress:
+            progress(day_start, files)
+
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic campus dataset for `flask ingest`.")
+    parser.add_argument('output_dir', help="Directory the CSV files are written to.")
+    parser.add_argument('--students', type=int, default=1000, help="Number of students.")
+    parser.add_argument('--staff', type=int, default=100, help="Number of staff members.")
+    parser.add_argument('--assets', type=int, default=50, help="Number of tracked assets.")
+    parser.add_argument('--days', type=int, default=7, help="Days of activity to generate, ending now.")
+    parser.add_argument('--events-per-day', type=float, default=6.0, help="Average events per person per day.")
+    parser.add_argument('--inactive-fraction', type=float, default=0.02,
+                        help="Share of people with no events in the last two days.")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed; the same seed gives the same data.")
+    args = parser.parse_args()
+
+    files = generate(
+        args.output_dir, students=args.students, staff=args.staff, assets=args.assets, days=args.days,
+        events_per_day=args.events_per_day, inactive_fraction=args.inactive_fraction, seed=args.seed,
+        progress=lambda day, files: print(f"Generated {day:%Y-%m-%d}"),
+    )
+    for source, (path, count) in files.items():
+        print(f"{source}: {count} rows -> {path}")
+    print("Load the files in this order with `flask ingest <source> <path>`.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,5 @@
 import os
 import sys
-import pandas as pd
-from datetime import datetime
 from io import StringIO
 
 # -- Path Setup --
@@ -13,12 +11,16 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 # -- End Path Setup --
 
+from flask_migrate import upgrade
+from sqlalchemy import text
+
 from app import create_app
 from app.models import db, Entity, Identifier, Event
+from app.services.ingestion_service import ingest_file
 
 # --- Synthetic CSV Data ---
-# In a real-world scenario, you would read these from actual files:
-# e.g., students_df = pd.read_csv('data/students.csv')
+# In a real-world scenario, you would load these from actual files:
+# e.g., flask ingest students data/students.csv
 
 students_csv = """student_id,name,email,card_id
 S001,Alice Johnson,alice.j@university.edu,C1001
@@ -54,126 +56,38 @@ S003,Data Structures in Python,2023-10-26 11:45:00,Science Library
 def seed_database():
     """
     Reads synthetic data, performs entity resolution, and populates the database.
+
+    The inline CSV feeds are loaded through the same chunked ingestion engine used
+    by the `flask ingest` command, entity feeds first so that event feeds can be
+    resolved against their identifiers.
     """
     app = create_app()
     with app.app_context():
         print("Dropping all data from the database...")
         db.drop_all()
+        db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+        db.session.commit()
+        # Created by the migrations rather than db.create_all(), so that on PostgreSQL the
+        # events table is partitioned (0011) and the partition maintenance can manage it.
         print("Creating database tables...")
-        db.create_all()
+        upgrade()
         print("Database tables created.")
 
-        # --- Load data into pandas DataFrames ---
-        students_df = pd.read_csv(StringIO(students_csv))
-        staff_df = pd.read_csv(StringIO(staff_csv))
-        swipes_df = pd.read_csv(StringIO(swipes_csv))
-        wifi_df = pd.read_csv(StringIO(wifi_csv))
-        library_df = pd.read_csv(StringIO(library_csv))
-
-        # --- Entity Resolution Mappings ---
-        # These dictionaries will help us quickly find an entity's primary key
-        # from a secondary identifier (like an email or card_id).
-        identifier_to_entity_map = {}
-
         # --- 1. Process Entities (Students and Staff) ---
         print("Processing students and staff to create entities...")
+        for source, data in [('students', students_csv), ('staff', staff_csv)]:
+            print(ingest_file(source, StringIO(data)).summary())
 
-        # Process Students
-        for _, row in students_df.iterrows():
-            entity = Entity(
-                name=row['name'],
-                entity_type='student',
-                primary_email=row['email']
-            )
-            db.session.add(entity)
-            db.session.flush() # Flush to get the generated entity.id
-
-            # Create identifiers and map them
-            id_student = Identifier(identifier_type='student_id', value=row['student_id'], entity_id=entity.id)
-            id_email = Identifier(identifier_type='email', value=row['email'], entity_id=entity.id)
-            id_card = Identifier(identifier_type='card_id', value=row['card_id'], entity_id=entity.id)
-            db.session.add_all([id_student, id_email, id_card])
-
-            # Populate the resolution map
-            identifier_to_entity_map[row['student_id']] = entity
-            identifier_to_entity_map[row['email']] = entity
-            identifier_to_entity_map[row['card_id']] = entity
-
-        # Process Staff
-        for _, row in staff_df.iterrows():
-            entity = Entity(
-                name=row['name'],
-                entity_type='staff',
-                primary_email=row['email']
-            )
-            db.session.add(entity)
-            db.session.flush()
-
-            id_staff = Identifier(identifier_type='staff_id', value=row['staff_id'], entity_id=entity.id)
-            id_email = Identifier(identifier_type='email', value=row['email'], entity_id=entity.id)
-            id_card = Identifier(identifier_type='card_id', value=row['card_id'], entity_id=entity.id)
-            db.session.add_all([id_staff, id_email, id_card])
-
-            identifier_to_entity_map[row['staff_id']] = entity
-            identifier_to_entity_map[row['email']] = entity
-            identifier_to_entity_map[row['card_id']] = entity
-
-        db.session.commit()
         print(f"Created {Entity.query.count()} entities.")
         print(f"Created {Identifier.query.count()} identifiers.")
 
         # --- 2. Process Events (Swipes, Wifi, Library) ---
         print("Processing events and linking to entities...")
+        for source, data in [('swipes', swipes_csv), ('wifi', wifi_csv), ('library', library_csv)]:
+            print(ingest_file(source, StringIO(data)).summary())
 
-        # Process Swipes
-        for _, row in swipes_df.iterrows():
-            entity = identifier_to_entity_map.get(row['card_id'])
-            if entity:
-                event = Event(
-                    entity_id=entity.id,
-                    timestamp=datetime.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S'),
-                    location=row['location_name'],
-                    source_type='swipe',
-                    description=f"Card swipe at {row['location_name']}."
-                )
-                db.session.add(event)
-
-        # Process Wifi Logs
-        for _, row in wifi_df.iterrows():
-            entity = identifier_to_entity_map.get(row['user_email'])
-            if entity:
-                event = Event(
-                    entity_id=entity.id,
-                    timestamp=datetime.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S'),
-                    location=row['ap_location'],
-                    source_type='wifi',
-                    description=f"Connected to Wi-Fi AP {row['ap_location']}."
-                )
-                db.session.add(event)
-
-                # Also, add the device hash as a new identifier if not already present
-                if not identifier_to_entity_map.get(row['device_hash']):
-                    id_device = Identifier(identifier_type='device_hash', value=row['device_hash'], entity_id=entity.id)
-                    db.session.add(id_device)
-                    identifier_to_entity_map[row['device_hash']] = entity
-
-        # Process Library Checkouts
-        for _, row in library_df.iterrows():
-            entity = identifier_to_entity_map.get(row['student_id'])
-            if entity:
-                event = Event(
-                    entity_id=entity.id,
-                    timestamp=datetime.strptime(row['checkout_timestamp'], '%Y-%m-%d %H:%M:%S'),
-                    location=row['location'],
-                    source_type='library',
-                    description=f"Checked out book: '{row['book_title']}'."
-                )
-                db.session.add(event)
-
-        db.session.commit()
         print(f"Created {Event.query.count()} events.")
         print("Database seeding complete!")
 
-
 if __name__ == '__main__':
     seed_database()
\ No newline at end of file
@@ -9,6 +9,7 @@ import {
   ListItemIcon,
   Chip,
   CircularProgress,
+  Button,
   Alert as MuiAlert,
 } from '@mui/material';
 import {
@@ -53,16 +54,26 @@ function AlertsPanel() {
   const [error, setError] = useState(null);
 
   useEffect(() => {
+    let stream = null;
+    let cancelled = false;
+
     const fetchAlerts = async () => {
       try {
         setLoading(true);
         // The endpoint is proxied by the development server (see package.json)
-        const response = await fetch('/api/alert/');
+        // Only the newest page of open alerts is needed for the panel.
+        const response = await fetch('/api/alert/?is_acknowledged=false');
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`);
         }
         const data = await response.json();
+        if (cancelled) {
+          return;
+        }
         setAlerts(data.alerts);
+        // With no open alerts there is nothing to resume from; replaying from ID 0 would
+        // send the whole alert history.
+        subscribe(data.alerts.length ? Math.max(...data.alerts.map((alert) => alert.id)) : null);
       } catch (e) {
         setError(e.message);
         console.error("Failed to fetch alerts:", e);
@@ -71,9 +82,47 @@ function AlertsPanel() {
       }
     };
 
+    // After the initial load, new alerts are pushed by the server instead of refetched.
+    // The browser resumes from the last received alert ID when the stream reconnects.
+    const subscribe = (lastId) => {
+      stream = new EventSource(lastId === null ? '/api/alert/stream' : `/api/alert/stream?last_id=${lastId}`);
+      stream.addEventListener('alert', (event) => {
+        const alert = JSON.parse(event.data);
+        // The panel only lists open alerts.
+        if (alert.is_acknowledged) {
+          return;
+        }
+        setAlerts((current) => [alert, ...current.filter((a) => a.id !== alert.id)]);
+      });
+    };
+
     fetchAlerts();
+    return () => {
+      cancelled = true;
+      if (stream) {
+        stream.close();
+      }
+    };
   }, []); // Empty dependency array means this effect runs once on mount
 
+  // Acknowledges every alert currently shown with a single bulk request.
+  const acknowledgeAll = async () => {
+    try {
+      const response = await fetch('/api/alert/bulk', {
+        method: 'PATCH',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ids: alerts.map((alert) => alert.id) }),
+      });
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      setAlerts([]);
+    } catch (e) {
+      setError(e.message);
+      console.error("Failed to acknowledge alerts:", e);
+    }
+  };
+
   const renderContent = () => {
     if (loading) {
       return (
@@ -134,9 +183,16 @@ function AlertsPanel() {
 
   return (
     <Paper sx={{ p: 2, display: 'flex', flexDirection: 'column', borderRadius: 2, maxHeight: '40vh', overflow: 'auto' }}>
-      <Typography variant="h6" gutterBottom>
-        Recent Alerts
-      </Typography>
+      <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
+        <Typography variant="h6" gutterBottom>
+          Recent Alerts
+        </Typography>
+        {alerts.length > 0 && (
+          <Button size="small" onClick={acknowledgeAll}>
+            Acknowledge all
+          </Button>
+        )}
+      </Box>
       {renderContent()}
     </Paper>
   );
@@ -1,92 +1,129 @@
 import React, { useState, useEffect } from 'react';
-import { getEntities } from '../services/api';
+import { searchEntities } from '../services/api';
 import {
-  FormControl,
-  InputLabel,
-  Select,
-  MenuItem,
+  Autocomplete,
+  TextField,
   CircularProgress,
   Box,
   Typography,
 } from '@mui/material';
 
+// Milliseconds to wait after the last keystroke before searching.
+const SEARCH_DEBOUNCE_MS = 200;
+// Queries shorter than this are not sent; the backend ignores them (SEARCH_MIN_QUERY_LENGTH).
+const MIN_QUERY_LENGTH = 2;
+
 /**
- * A dropdown component to select a campus entity.
- * It fetches the list of entities from the API on mount.
+ * A typeahead component to select a campus entity.
+ * It searches the API by name, email or identifier as the user types.
  * @param {object} props - The component props.
  * @param {function(number|null)} props.onEntitySelect - Callback function invoked with the selected entity's ID.
  */
 const EntitySelector = ({ onEntitySelect }) => {
-  const [entities, setEntities] = useState([]);
-  const [selectedEntity, setSelectedEntity] = useState('');
-  const [loading, setLoading] = useState(true);
+  const [query, setQuery] = useState('');
+  const [options, setOptions] = useState([]);
+  const [selectedEntity, setSelectedEntity] = useState(null);
+  const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
 
   useEffect(() => {
-    // Fetch entities when the component mounts
-    const fetchEntities = async () => {
+    if (query.trim().length < MIN_QUERY_LENGTH) {
+      setOptions(selectedEntity ? [selectedEntity] : []);
+      setLoading(false);
+      return undefined;
+    }
+
+    // Search once typing pauses; results of superseded queries are ignored
+    let active = true;
+    const timer = setTimeout(async () => {
       try {
         setLoading(true);
-        const data = await getEntities();
-        setEntities(data);
-        setError(null);
+        const results = await searchEntities(query);
+        if (active) {
+          // Keep the current selection among the options so it stays displayable
+          setOptions(selectedEntity
+            ? [selectedEntity, ...results.filter((entity) => entity.id !== selectedEntity.id)]
+            : results);
+          setError(null);
+        }
       } catch (err) {
-        setError('Failed to load entities. Please try again later.');
+        if (active) {
+          setError('Failed to search entities. Please try again later.');
+        }
         console.error(err);
       } finally {
-        setLoading(false);
+        if (active) {
+          setLoading(false);
+        }
       }
-    };
+    }, SEARCH_DEBOUNCE_MS);
 
-    fetchEntities();
-  }, []); // Empty dependency array ensures this runs only once on mount
+    return () => {
+      active = false;
+      clearTimeout(timer);
+    };
+  }, [query, selectedEntity]);
 
-  const handleChange = (event) => {
-    const entityId = event.target.value;
-    setSelectedEntity(entityId);
+  const handleChange = (event, entity) => {
+    setSelectedEntity(entity);
     // Call the parent component's handler function
     if (onEntitySelect) {
-      onEntitySelect(entityId);
+      onEntitySelect(entity ? entity.id : null);
     }
   };
 
-  if (loading) {
-    return (
-      <Box display="flex" justifyContent="center" alignItems="center" my={4}>
-        <CircularProgress />
-        <Typography ml={2}>Loading Entities...</Typography>
-      </Box>
-    );
-  }
-
-  if (error) {
-    return (
-      <Typography color="error" align="center" my={4}>
-        {error}
-      </Typography>
-    );
-  }
-
   return (
-    <FormControl fullWidth variant="outlined" sx={{ my: 2 }}>
-      <InputLabel id="entity-select-label">Select an Entity</InputLabel>
-      <Select
-        labelId="entity-select-label"
+    <Box sx={{ my: 2 }}>
+      <Autocomplete
         id="entity-select"
+        options={options}
         value={selectedEntity}
-        label="Select an Entity"
         onChange={handleChange}
-      >
-        <MenuItem value="">
-          <em>None</em>
-        </MenuItem>
-        {entities.map((entity) => (
-          <MenuItem key={entity.id} value={entity.id}>
-            {entity.name} ({entity.entity_type})
-          </MenuItem>
-        ))}
-      </Select>
-    </FormControl>
+        onInputChange={(event, value, reason) => {
+          // Selecting an option fills the input with its label; that is not a new query
+          if (reason !== 'reset') {
+            setQuery(value);
+          }
+        }}
+        // Options are already filtered and ranked by the server
+        filterOptions={(x) => x}
+        getOptionLabel={(entity) => `${entity.name} (${entity.entity_type})`}
+        isOptionEqualToValue={(option, value) => option.id === value.id}
+        loading={loading}
+        noOptionsText={query.trim().length < MIN_QUERY_LENGTH ? 'Type a name, email or ID' : 'No matching entities'}
+        renderOption={(props, entity) => (
+          <li {...props} key={entity.id}>
+            <Box>
+              <Typography>{entity.name} ({entity.entity_type})</Typography>
+              {entity.primary_email && (
+                <Typography variant="body2" color="text.secondary">{entity.primary_email}</Typography>
+              )}
+            </Box>
+          </li>
+        )}
+        renderInput={(params) => (
+          <TextField
+            {...params}
+            label="Search for an Entity"
+            variant="outlined"
+            InputProps={{
+              ...params.InputProps,
+              endAdornment: (
+                <>
+                  {loading ? <CircularProgress color="inherit" size={20} /> : null}
+                  {params.InputProps.endAdornment}
+                </>
+              ),
+            }}
+          />
+        )}
+      />
+      {error && (
+        <Typography color="error" align="center" my={2}>
+          {error}
+        </Typography>
+      )}
+    </Box>
   );
 };
 
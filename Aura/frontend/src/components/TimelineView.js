@@ -10,6 +10,7 @@ import {
   CircularProgress,
   Paper,
   Divider,
+  Button,
 } from '@mui/material';
 import {
   CreditCard as SwipeIcon,
@@ -43,7 +44,9 @@ const getEventIcon = (sourceType) => {
  */
 const TimelineView = ({ entityId }) => {
   const [events, setEvents] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
 
   useEffect(() => {
@@ -51,13 +54,15 @@ const TimelineView = ({ entityId }) => {
     const fetchTimeline = async () => {
       if (!entityId) {
         setEvents([]); // Clear events if no entity is selected
+        setNextCursor(null);
         return;
       }
       try {
         setLoading(true);
         setError(null);
-        const data = await getTimeline(entityId);
-        setEvents(data);
+        const page = await getTimeline(entityId);
+        setEvents(page.events);
+        setNextCursor(page.nextCursor);
       } catch (err) {
         setError('Failed to fetch timeline data.');
         console.error(err);
@@ -69,6 +74,21 @@ const TimelineView = ({ entityId }) => {
     fetchTimeline();
   }, [entityId]); // Re-run the effect whenever entityId changes
 
+  // Appends the next page of older events using the cursor from the previous page.
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await getTimeline(entityId, { cursor: nextCursor });
+      setEvents((current) => [...current, ...page.events]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError('Failed to fetch timeline data.');
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (!entityId) {
     return (
       <Paper elevation={2} sx={{ p: 3, textAlign: 'center', mt: 4 }}>
@@ -129,6 +149,13 @@ const TimelineView = ({ entityId }) => {
           ))}
         </List>
       </Paper>
+      {nextCursor && (
+        <Box display="flex" justifyContent="center" my={2}>
+          <Button variant="outlined" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load older events'}
+          </Button>
+        </Box>
+      )}
     </Box>
   );
 };
@@ -26,22 +26,75 @@ export const getEntities = async () => {
 };
 
 /**
- * Fetches the event timeline for a specific entity.
+ * Searches entities by name, email or identifier for typeahead suggestions.
+ * @param {string} query - The text typed so far.
+ * @param {number} [limit] - Maximum number of matches to return.
+ * @returns {Promise<Array>} A promise that resolves to matching entities, most relevant first.
+ * @throws {Error} Throws an error if the API request fails.
+ */
+export const searchEntities = async (query, limit) => {
+  try {
+    const response = await api.get('/entity/search', { params: { q: query, limit } });
+    return response.data.results || [];
+  } catch (error) {
+    console.error(`Error searching entities for "${query}":`, error);
+    throw error;
+  }
+};
+
+/**
+ * Fetches one page of the event timeline for a specific entity.
  * @param {number} entityId - The ID of the entity whose timeline to fetch.
- * @returns {Promise<Array>} A promise that resolves to an array of events.
+ * @param {object} [params] - Optional query parameters.
+ * @param {string} [params.cursor] - The nextCursor returned by the previous page.
+ * @param {number} [params.limit] - Maximum number of events to return.
+ * @param {string} [params.since] - ISO 8601 lower bound (inclusive) on event time.
+ * @param {string} [params.until] - ISO 8601 upper bound (exclusive) on event time.
+ * @returns {Promise<{events: Array, nextCursor: (string|null)}>} A promise that resolves to a page of events.
  * @throws {Error} Throws an error if the API request fails.
  */
-export const getTimeline = async (entityId) => {
+export const getTimeline = async (entityId, params = {}) => {
   if (!entityId) {
-    // Return an empty array if no entityId is provided to prevent unnecessary API calls.
-    return [];
+    // Return an empty page if no entityId is provided to prevent unnecessary API calls.
+    return { events: [], nextCursor: null };
   }
   try {
-    const response = await api.get(`/timeline/${entityId}`);
-    // The data is nested under the 'events' key
-    return response.data.events || [];
+    const response = await api.get(`/timeline/${entityId}`, { params });
+    // The data is nested under the 'events' key, with the cursor for the next page alongside it
+    return {
+      events: response.data.events || [],
+      nextCursor: response.data.next_cursor || null,
+    };
   } catch (error) {
     console.error(`Error fetching timeline for entity ${entityId}:`, error);
     throw error;
   }
 };
+
+/**
+ * Fetches one page of the merged event timeline of several entities, newest first.
+ * Each event carries the entity_id it belongs to.
+ * @param {Array<number>} entityIds - The IDs of the entities whose timelines to merge.
+ * @param {object} [params] - Optional query parameters, as for getTimeline.
+ * @returns {Promise<{events: Array, nextCursor: (string|null)}>} A promise that resolves to a page of events.
+ * @throws {Error} Throws an error if the API request fails.
+ */
+export const getTimelines = async (entityIds, params = {}) => {
+  if (!entityIds || entityIds.length === 0) {
+    return { events: [], nextCursor: null };
+  }
+  try {
+    const response = await api.get('/timeline/batch', {
+      params: { ...params, entity_id: entityIds },
+      // Send entity_id=1&entity_id=2 rather than axios' default entity_id[]=1 form.
+      paramsSerializer: { indexes: null },
+    });
+    return {
+      events: response.data.events || [],
+      nextCursor: response.data.next_cursor || null,
+    };
+  } catch (error) {
+    console.error(`Error fetching timelines for entities ${entityIds.join(', ')}:`, error);
+    throw error;
+  }
+};